@@ -0,0 +1,101 @@
+"""
+Asyncio core for the Skill Reroll Automation tool.
+Runs one event loop on a background thread that schedules every reroll session.
+Blocking work (clicks, captures) runs on a thread pool and OCR runs on a dedicated executor,
+so waits stay precise and can be cancelled.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class AutomationLoop:
+    def __init__(self, ocr_workers=1, io_workers=8):
+        """
+        Initialize the automation event loop (started lazily)
+
+        Args:
+            ocr_workers: Number of threads running OCR calls; one keeps a single shared engine busy
+            io_workers: Number of threads running blocking clicks and screen captures
+        """
+        self.ocr_workers = ocr_workers
+        self.io_workers = io_workers
+        self.loop = None
+        self.thread = None
+        self.ocr_executor = None
+        self.io_executor = None
+        self._lock = threading.Lock()
+
+    def ensure_running(self):
+        """Start the event loop thread if it is not running yet"""
+        with self._lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+
+            self.ocr_executor = ThreadPoolExecutor(max_workers=self.ocr_workers, thread_name_prefix="ocr")
+            self.io_executor = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="io")
+            self.loop = asyncio.new_event_loop()
+            self.loop.set_default_executor(self.io_executor)
+
+            started = threading.Event()
+            self.thread = threading.Thread(target=self._run_loop, args=(started,), daemon=True)
+            self.thread.start()
+            started.wait()
+
+    def set_ocr_workers(self, ocr_workers):
+        """Change how many OCR calls may run at once (takes effect for calls submitted afterwards)"""
+        with self._lock:
+            if ocr_workers == self.ocr_workers:
+                return
+            self.ocr_workers = ocr_workers
+            if self.ocr_executor is not None:
+                # Calls already running finish on the old executor
+                old_executor = self.ocr_executor
+                self.ocr_executor = ThreadPoolExecutor(max_workers=ocr_workers, thread_name_prefix="ocr")
+                old_executor.shutdown(wait=False)
+
+    def _run_loop(self, started):
+        """Event loop thread"""
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(started.set)
+        self.loop.run_forever()
+
+    def in_loop_thread(self):
+        """Check if the caller is running on the event loop thread"""
+        return self.thread is not None and threading.current_thread() is self.thread
+
+    def submit(self, coro):
+        """
+        Schedule a coroutine on the event loop from any thread.
+        Returns a concurrent.futures.Future that can be cancelled from any thread.
+        """
+        self.ensure_running()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, func, *args):
+        """Run a plain function on the event loop thread"""
+        self.ensure_running()
+        self.loop.call_soon_threadsafe(func, *args)
+
+    async def run_blocking(self, func, *args):
+        """Await a blocking function on the I/O thread pool"""
+        return await asyncio.get_running_loop().run_in_executor(self.io_executor, func, *args)
+
+    async def run_ocr(self, func, *args):
+        """Await an OCR call on the OCR executor"""
+        return await asyncio.get_running_loop().run_in_executor(self.ocr_executor, func, *args)
+
+    def shutdown(self):
+        """Stop the event loop and its executors"""
+        with self._lock:
+            if self.loop is None:
+                return
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            if self.thread is not None and not self.in_loop_thread():
+                self.thread.join(timeout=2)
+                if not self.thread.is_alive():
+                    self.loop.close()
+            self.ocr_executor.shutdown(wait=False)
+            self.io_executor.shutdown(wait=False)
+            self.loop = None
+            self.thread = None
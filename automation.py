@@ -3,44 +3,131 @@ Automation module for the Skill Reroll Automation tool.
 This version uses PaddleOCR for more reliable and lightweight text recognition.
 """
 
-import time
+import asyncio
 import threading
 from tkinter import messagebox
-from PIL import ImageGrab
-from paddle_ocr_implementation import PaddleOCRWrapper, parse_detected_text
+from stat_matcher import get_stat_matcher
+from ocr_engine_manager import get_ocr_engine_manager
+from image_preprocessing import parse_pipeline
+from async_core import AutomationLoop
+from reroll_engine import SUCCESS, FAILED
+from reroll_session import RerollSession
 
 class SkillRerollAutomator:
-    def __init__(self, game_connector, status_callback=None):
-        """Initialize the skill reroll automator"""
+    def __init__(self, game_connector, status_callback=None, dialog_callback=None):
+        """
+        Initialize the skill reroll automator
+
+        Args:
+            game_connector: GameConnector for single-client automation
+            status_callback: Function to call with status updates
+            dialog_callback: Optional function (kind, title, message) showing a dialog on the UI thread,
+                             where kind is a tkinter messagebox function name such as "showinfo"
+        """
         self.game_connector = game_connector
         self.status_callback = status_callback
+        self.dialog_callback = dialog_callback
         self.running = False
         self.apply_button_coords = None
         self.change_button_coords = None
         self.detection_region = None
         self.detailed_logging = False
 
-        # Initialize PaddleOCR reader - lazy initialization to speed up startup
+        # Render settle ceilings in seconds - the loop moves on as soon as the panel is stable
+        self.apply_settle_timeout = 0.5
+        self.change_settle_timeout = 0.4
+
+        # The OCR reader comes from the process-wide engine manager, which loads and warms it once
+        # A single reader is shared by every session and every start/stop cycle
+        self.ocr_manager = get_ocr_engine_manager()
         self.reader = None
 
-        # Initialize stat counter for tracking stats across rolls
-        self.stat_counter = {}
+        # Rebuild of a failed OCR engine, shared by every session that notices the failure
+        self.ocr_recovery = None
+
+        # Stat catalog prepared once for matching OCR lines, shared by every session and roll
+        self.stat_matcher = get_stat_matcher()
+
+        # One session per game client; single-client automation uses one session
+        self.sessions = []
+        self.sessions_lock = threading.Lock()
+
+        # Event loop scheduling all sessions; clicks, captures and OCR are awaited on it
+        self.core = AutomationLoop()
 
-        # Initialize unmapped OCR results counter
-        self.unmapped_ocr_counter = {}
+    def preload_ocr(self, persist_cache=True):
+        """
+        Start loading the shared OCR engine in the background so the first start is instant.
+        With persist_cache, OCR results cached in earlier launches are loaded and saved on stop.
+        """
+        if persist_cache:
+            self.ocr_manager.enable_cache_persistence()
+        self.ocr_manager.preload(self.update_status)
 
-        self.update_status("PaddleOCR will be initialized when automation starts")
+    def set_ocr_backend(self, name):
+        """Select the OCR backend ("paddle" or "onnx"); takes effect once the engine is rebuilt on it"""
+        try:
+            self.ocr_manager.set_backend(name)
+        except (ValueError, RuntimeError) as e:
+            self.update_status(str(e))
+            return False
+        self.update_status(f"OCR backend set to {name}")
+        return True
+
+    def set_preprocessing(self, spec):
+        """Set the image preprocessing steps run before OCR, e.g. "grayscale,contrast" ("" for raw frames)"""
+        pipeline = parse_pipeline(spec)
+        self.ocr_manager.set_preprocessing(pipeline if pipeline.steps else None)
+        self.update_status(f"OCR preprocessing set to {pipeline.name}")
 
     def set_detection_region(self, region):
         """Set the region for text detection"""
         self.detection_region = region
         self.update_status(f"Detection region set to {region}")
 
+    def set_render_settle_timeouts(self, apply_timeout=None, change_timeout=None):
+        """Set the maximum time to wait for the panel to redraw after Apply and Change clicks"""
+        if apply_timeout is not None:
+            self.apply_settle_timeout = apply_timeout
+        if change_timeout is not None:
+            self.change_settle_timeout = change_timeout
+
     def update_status(self, message):
         """Update status via callback if available"""
         if self.status_callback:
             self.status_callback(message)
 
+    def show_dialog(self, kind, title, message):
+        """Show a message box without blocking the event loop"""
+        if self.dialog_callback:
+            self.dialog_callback(kind, title, message)
+        else:
+            threading.Thread(target=getattr(messagebox, kind), args=(title, message), daemon=True).start()
+
+    def add_session(self, game_connector, apply_coords, change_coords, detection_region=None,
+                    desired_stats=None, name=None):
+        """
+        Register a game client for multi-session automation.
+        Each session has its own coordinates, region and targets; all sessions share one OCR reader.
+        Returns the new RerollSession.
+        """
+        session = RerollSession(self, game_connector, apply_coords, change_coords,
+                                detection_region, desired_stats, name)
+        with self.sessions_lock:
+            self.sessions.append(session)
+        return session
+
+    def clear_sessions(self):
+        """Remove all registered sessions (only while automation is stopped)"""
+        if self.running:
+            return False
+        with self.sessions_lock:
+            sessions = self.sessions
+            self.sessions = []
+        for session in sessions:
+            session.screen_capture.release()
+        return True
+
     def start(self, apply_coords, change_coords, desired_stats=None, detailed_logging=False):
         """Start the automation with optional detailed logging"""
         # Check if button coordinates are set
@@ -56,32 +143,56 @@ class SkillRerollAutomator:
         # Store button coordinates
         self.apply_button_coords = apply_coords
         self.change_button_coords = change_coords
-        self.detailed_logging = detailed_logging
 
-        # Reset counters for new run
-        self.unmapped_ocr_counter = {}
+        # Single-client automation is one session on our own connector
+        self.clear_sessions()
+        self.add_session(self.game_connector, apply_coords, change_coords, self.detection_region, desired_stats)
+
+        return self.start_sessions(detailed_logging)
+
+    def start_sessions(self, detailed_logging=False):
+        """Start every registered session, sharing one OCR reader between them"""
+        if not self.sessions:
+            messagebox.showerror("Error", "No game clients have been added.")
+            return False
+
+        # Every session needs a connected game client - its own window, not just any game window
+        for session in self.sessions:
+            if not session.game_connector.is_connected():
+                if not session.game_connector.reconnect():
+                    return False
+
+        self.detailed_logging = detailed_logging
 
         # Log startup message
         if detailed_logging:
             self.update_status("Starting automation with detailed logging")
         else:
             self.update_status("Starting automation (minimal logging mode)")
+        if len(self.sessions) > 1:
+            self.update_status(f"Running {len(self.sessions)} game clients with a shared OCR engine")
 
-        # Always reinitialize PaddleOCR reader to ensure a clean state
+        # Reuse the shared, pre-warmed OCR engine; it is only rebuilt if its health check fails
         try:
-            self.update_status("Initializing PaddleOCR...")
-            # First make sure any existing reader is cleaned up
-            self.reader = None
-            # Create a fresh instance
-            self.reader = PaddleOCRWrapper(self.update_status)
+            if not self.ocr_manager.is_ready():
+                self.update_status("Waiting for PaddleOCR to finish loading...")
+            self.reader = self.ocr_manager.get_engine(self.update_status)
         except Exception as e:
             self.update_status(f"Error initializing PaddleOCR: {str(e)}")
             self.reader = None
             return False
 
-        # Start the automation thread
+        # One OCR worker process per session (as far as the CPU allows), so rolls can overlap;
+        # one OCR thread per session, so calls arriving together can be merged into one batch
+        self.ocr_manager.scale_workers(len(self.sessions))
+        self.core.set_ocr_workers(len(self.sessions))
+
+        # Start one reroll task per session; their rolls interleave on the shared reader,
+        # which the manager keeps in place until we stop
+        self.ocr_manager.hold(self)
         self.running = True
-        threading.Thread(target=self.reroll_loop, args=(desired_stats,), daemon=True).start()
+        for session in self.sessions:
+            session.start(self.core, detailed_logging)
 
         return True
 
@@ -89,16 +200,104 @@ class SkillRerollAutomator:
         """Stop the automation, clean up resources, and show stats summary"""
         self.running = False
 
-        # Clean up OCR reader to prevent errors on restart
-        if hasattr(self, 'reader') and self.reader is not None:
-            self.reader = None
+        # Stop every session; each lets its statistics lane finish the queued rolls
+        with self.sessions_lock:
+            sessions = list(self.sessions)
+        for session in sessions:
+            session.stop()
+
+        # Release our reference to the OCR reader; the engine manager keeps it warm for the next start
+        self.reader = None
+        self.ocr_manager.release(self)
 
         self.update_status("⏹️ Automation stopped")
 
+        # Show where the time went and what was rolled, per session
+        for session in sessions:
+            self.show_session_summary(session)
+
+        # Report the line result cache and keep it warm for the next launch
+        cache = self.ocr_manager.result_cache
+        if cache.hits or cache.misses:
+            self.update_status(cache.summary())
+        templates = self.ocr_manager.template_library
+        if templates.matches or templates.fallbacks:
+            self.update_status(templates.summary())
+        value_reader = self.ocr_manager.value_reader
+        if value_reader.reads or value_reader.rejects:
+            self.update_status(value_reader.summary())
+        engine = self.ocr_manager.engine
+        if engine is not None and engine.reocr is not None and engine.reocr.frames_with_candidates:
+            self.update_status(engine.reocr.summary())
+        if engine is not None and engine.batcher.batches:
+            self.update_status(engine.batcher.summary())
+        if engine is not None:
+            self.update_status(engine.latency.summary())
+        if self.stat_matcher.hits or self.stat_matcher.misses:
+            self.update_status(self.stat_matcher.summary())
+        preprocessor = self.ocr_manager.preprocessor
+        if preprocessor is not None:
+            self.update_status(preprocessor.summary())
+        self.ocr_manager.save_cache()
+
+    async def recover_ocr(self, failed_reader):
+        """
+        Rebuild the shared OCR engine after it failed and wait until the new one is in place.
+        The rebuild runs as its own task, so a caller cancelled meanwhile (a state budget or a stop)
+        does not leave the sessions on the closed engine.
+        """
+        if self.ocr_recovery is None or self.ocr_recovery.done():
+            self.ocr_recovery = asyncio.ensure_future(self._rebuild_ocr(failed_reader))
+        await asyncio.shield(self.ocr_recovery)
+
+    async def _rebuild_ocr(self, failed_reader):
+        """Rebuild the engine on the OCR executor so no inference overlaps, then hand it to the sessions"""
+        try:
+            reader = await self.core.run_ocr(self.ocr_manager.rebuild, failed_reader)
+        except Exception as e:
+            self.update_status(f"Error rebuilding OCR engine: {str(e)}")
+            return
+        if self.running:
+            self.reader = reader
+
+    def on_session_finished(self, session, result):
+        """Called from a session's reroll task when its state machine ends"""
+        if result == SUCCESS:
+            session.update_status("🎉🎉🎉 SUCCESS! DESIRED STATS FOUND! 🎉🎉🎉")
+        elif result == FAILED:
+            session.update_status("❌ Automation could not recover from repeated failures")
+        else:
+            # Stopped from outside - stop() takes care of the summary
+            return
+
+        # Stop the whole automation once no other session is still rolling
+        with self.sessions_lock:
+            others_running = any(other.running for other in self.sessions if other is not session)
+
+        if others_running:
+            session.stop()
+            self.show_session_summary(session)
+        else:
+            self.stop()  # Stop automation and clean up resources
+
+        client = f" ({session.name})" if session.name else ""
+        if result == SUCCESS:
+            self.show_dialog("showinfo", "Success", f"Desired stats found{client}! Automation stopped.")
+        else:
+            self.show_dialog("showerror", "Error", f"Automation stopped after repeated failures{client}. Check the game window.")
+
+    def show_session_summary(self, session):
+        """Show the state timings and a summary of the detected stats of one session"""
+        # Show where the time of each roll went
+        if session.engine is not None:
+            session.engine.report_timings()
+            session.engine = None
+        session.report_ocr_stats()
+
         # Show summary of stats if we have any
-        if hasattr(self, 'stat_counter') and self.stat_counter:
-            self.update_status("")
-            self.update_status("SUMMARY OF DETECTED STATS")
+        if session.stat_counter:
+            session.update_status("")
+            session.update_status("SUMMARY OF DETECTED STATS")
 
             # Separate stats by category
             from stats_data import get_offensive_skills, get_defensive_skills, get_base_stat_name
@@ -111,7 +310,7 @@ class SkillRerollAutomator:
             defensive_stats = {}
             other_stats = {}
 
-            for stat_key, count in self.stat_counter.items():
+            for stat_key, count in session.stat_counter.items():
                 # Extract the stat name from the key (format is "stat_name +value")
                 parts = stat_key.split("+")
                 if len(parts) >= 1:
@@ -127,196 +326,55 @@ class SkillRerollAutomator:
 
             # Display offensive stats
             if offensive_stats:
-                self.update_status("Offensive Stats:")
+                session.update_status("Offensive Stats:")
                 for stat_key, count in sorted(offensive_stats.items(), key=lambda x: x[1], reverse=True):
-                    self.update_status(f"  • {stat_key} × {count}")
+                    session.update_status(f"  • {stat_key} × {count}")
 
             # Display defensive stats
             if defensive_stats:
-                self.update_status("Defensive Stats:")
+                session.update_status("Defensive Stats:")
                 for stat_key, count in sorted(defensive_stats.items(), key=lambda x: x[1], reverse=True):
-                    self.update_status(f"  • {stat_key} × {count}")
+                    session.update_status(f"  • {stat_key} × {count}")
 
             # Display other stats
             if other_stats:
-                self.update_status("Other Stats:")
+                session.update_status("Other Stats:")
                 for stat_key, count in sorted(other_stats.items(), key=lambda x: x[1], reverse=True):
-                    self.update_status(f"  • {stat_key} × {count}")
+                    session.update_status(f"  • {stat_key} × {count}")
 
             # Display unmapped OCR results if any
-            if hasattr(self, 'unmapped_ocr_counter') and self.unmapped_ocr_counter:
-                self.update_status("")
-                self.update_status("Unmapped OCR Results:")
+            if session.unmapped_ocr_counter:
+                session.update_status("")
+                session.update_status("Unmapped OCR Results:")
 
                 # Sort by frequency (most common first)
-                sorted_unmapped = sorted(self.unmapped_ocr_counter.items(), key=lambda x: x[1], reverse=True)
+                sorted_unmapped = sorted(session.unmapped_ocr_counter.items(), key=lambda x: x[1], reverse=True)
 
                 # Display top 10 unmapped results
                 for text, count in sorted_unmapped[:10]:
                     if len(text.strip()) > 0:  # Skip empty strings
-                        self.update_status(f"  • '{text}' × {count}")
+                        session.update_status(f"  • '{text}' × {count}")
 
             # Reset the counters for next run
-            self.stat_counter = {}
-            self.unmapped_ocr_counter = {}
+            session.stat_counter.clear()
+            session.unmapped_ocr_counter.clear()
 
-    def capture_screen_region(self):
-        """Capture a screenshot of the detection region or the game window with optimized performance"""
-        if not self.game_connector.is_connected():
-            return None
-
-        # Cache the region to avoid recalculating it on every capture
-        if not hasattr(self, '_cached_region') or self._cached_region is None:
-            # If detection region is set, use it, otherwise capture the full game window
-            if self.detection_region:
-                self._cached_region = self.detection_region
-            else:
-                rect = self.game_connector.get_window_rect()
-                if not rect:
-                    return None
-                self._cached_region = (rect.left, rect.top, rect.right, rect.bottom)
-
-        # Capture the screen region with optimized settings
-        try:
-            # Use all_screens=False for faster capture if we know we're only capturing the primary screen
-            return ImageGrab.grab(bbox=self._cached_region, all_screens=False)
-        except Exception:
-            # Reset cached region on error
-            self._cached_region = None
-            return None
-
-    def detect_text_in_image(self, image):
-        """Simplified method to detect text in the image using PaddleOCR"""
-        if self.reader is None:
-            self.update_status("OCR reader not initialized")
-            return {}
+    def get_target_stat_names(self, desired_stats):
+        """Get the base stat names (as detected by OCR) of the desired stats"""
+        from stats_data import get_base_stat_name
 
-        # Get text from image - error handling is now done in the readtext method
-        results = self.reader.readtext(image)
+        target_stats = set()
+        if desired_stats:
+            for category in ('offensive', 'defensive'):
+                for display_stat_name, _, _ in desired_stats.get(category, []):
+                    target_stats.add(get_base_stat_name(display_stat_name))
+        return target_stats
 
-        # Skip processing if no text was detected
-        if not results:
+    def resolve_target_stats(self, results, target_stats):
+        """Minimal parse of OCR results that only resolves the targeted stats, without logging"""
+        if not results or not target_stats:
             return {}
-
-        # Parse the detected text to find stats and values
-        current_stats = parse_detected_text(
-            results,
-            self.update_status,
-            detailed_logging=self.detailed_logging,
-            unmapped_ocr_counter=self.unmapped_ocr_counter
-        )
-        return current_stats
-
-    def reroll_loop(self, desired_stats):
-        """Optimized main reroll loop that checks for desired stats with fast-path processing"""
-        self.update_status("▶️ Starting automation...")
-
-        # Track iterations for performance optimization
-        iteration_count = 0
-
-        # Initialize stat counter if it doesn't exist
-        if not hasattr(self, 'stat_counter'):
-            self.stat_counter = {}
-
-        # First click the Change button to remove the current option
-        self.game_connector.click_at_position(self.change_button_coords)
-        time.sleep(0.4)  # Reduced from 0.8s to 0.4s
-
-        # Import stats categories once outside the loop
-        from stats_data import get_offensive_skills, get_defensive_skills, get_base_stat_name
-
-        # Pre-compute these sets once outside the loop
-        offensive_base_stats = set(get_base_stat_name(stat) for stat in get_offensive_skills())
-        defensive_base_stats = set(get_base_stat_name(stat) for stat in get_defensive_skills())
-
-        while self.running:
-            iteration_count += 1
-
-            # Click Apply button to apply a new option
-            self.game_connector.click_at_position(self.apply_button_coords)
-            time.sleep(0.5)  # Minimum time needed for the game to update
-
-            # Capture the game screen
-            screenshot = self.capture_screen_region()
-            if screenshot is None:
-                self.update_status("Failed to capture screen, retrying...")
-                time.sleep(0.5)  # Reduced wait time
-                continue
-
-            # Detect text in the screenshot
-            if self.reader:
-                current_stats = self.detect_text_in_image(screenshot)
-
-                # Only log roll information in detailed mode
-                if self.detailed_logging:
-                    self.update_status(f"Roll #{iteration_count}")
-
-                if current_stats:
-                    # Prepare a concise summary of detected stats
-                    off_stats = [(stat, current_stats[stat]) for stat in current_stats if stat in offensive_base_stats]
-                    def_stats = [(stat, current_stats[stat]) for stat in current_stats if stat in defensive_base_stats]
-                    other_stats = [(stat, current_stats[stat]) for stat in current_stats
-                                  if stat not in offensive_base_stats and stat not in defensive_base_stats]
-
-                    # Track stats for summary regardless of logging mode
-
-                    # Track offensive stats
-                    for stat, value in off_stats:
-                        # Track stats for summary with plus sign
-                        stat_key = f"{stat} +{value}"
-                        self.stat_counter[stat_key] = self.stat_counter.get(stat_key, 0) + 1
-
-                    # Track defensive stats
-                    for stat, value in def_stats:
-                        # Track stats for summary with plus sign
-                        stat_key = f"{stat} +{value}"
-                        self.stat_counter[stat_key] = self.stat_counter.get(stat_key, 0) + 1
-
-                    # Track other stats
-                    for stat, value in other_stats:
-                        # Track stats for summary with plus sign
-                        stat_key = f"{stat} +{value}"
-                        self.stat_counter[stat_key] = self.stat_counter.get(stat_key, 0) + 1
-
-                    # Only log stats in detailed mode
-                    if self.detailed_logging:
-                        # Log all stats in a single block
-                        all_stats = []
-
-                        # Add offensive stats
-                        if off_stats:
-                            for stat, value in off_stats:
-                                all_stats.append(f"{stat}: {value}")
-
-                        # Add defensive stats
-                        if def_stats:
-                            for stat, value in def_stats:
-                                all_stats.append(f"{stat}: {value}")
-
-                        # Add other stats
-                        if other_stats:
-                            for stat, value in other_stats:
-                                all_stats.append(f"{stat}: {value}")
-
-                        # Log all stats in a single line if possible
-                        if all_stats:
-                            self.update_status(" | ".join(all_stats))
-                elif self.detailed_logging:
-                    self.update_status("No stats detected")
-            else:
-                current_stats = {}
-                self.update_status("OCR reader not initialized")
-
-            # Check if we have desired stats
-            if self.check_desired_stats(current_stats, desired_stats):
-                self.update_status("🎉🎉🎉 SUCCESS! DESIRED STATS FOUND! 🎉🎉🎉")
-                self.stop()  # Stop automation and clean up resources
-                messagebox.showinfo("Success", "Desired stats found! Automation stopped.")
-                break
-
-            # If desired stats not found, click the Change button to reroll
-            self.game_connector.click_at_position(self.change_button_coords)
-            time.sleep(0.4)  # Minimum time needed for the game to respond
+        return self.stat_matcher.parse(results, target_stats=target_stats)
 
     def check_desired_stats(self, current_stats, desired_stats):
         """
@@ -392,6 +450,6 @@ class SkillRerollAutomator:
             # Use the regular stop method to ensure proper cleanup
             self.stop()
             self.update_status("⚠️ EMERGENCY STOP: Automation stopped by ESC key ⚠️")
-            messagebox.showinfo("Emergency Stop", "Automation stopped by pressing the ESC key")
+            self.show_dialog("showinfo", "Emergency Stop", "Automation stopped by pressing the ESC key")
             return True
         return False
@@ -0,0 +1,180 @@
+"""
+Frame batching for the Skill Reroll Automation tool.
+Several frames are stitched into one canvas so a single detection and recognition pass reads
+all of them, and a micro-batcher merges OCR calls that arrive within a few milliseconds of each
+other (e.g. from several game clients) into one such batch.
+"""
+
+import threading
+import time
+import numpy as np
+
+# Blank rows between stitched frames, so no detected box spans two frames
+STITCH_GAP = 16
+
+# Tallest canvas handed to the detector; taller canvases would be downscaled by it
+MAX_CANVAS_HEIGHT = 960
+
+# Blank rows between crops stacked for a single recognizer request
+CROP_GAP = 4
+
+def stitch_frames(frames, gap=STITCH_GAP, max_height=MAX_CANVAS_HEIGHT):
+    """
+    Stack frames vertically into as few canvases as fit max_height.
+    Returns a list of (canvas, placements) with placements a list of (frame index, y offset, height).
+    """
+    frames = [np.repeat(frame[:, :, np.newaxis], 3, axis=2) if frame.ndim == 2 else frame[:, :, :3]
+              for frame in frames]
+
+    # Group consecutive frames into canvases
+    groups = []
+    height = 0
+    for index, frame in enumerate(frames):
+        frame_height = frame.shape[0]
+        if groups and height + gap + frame_height <= max_height:
+            groups[-1].append(index)
+            height += gap + frame_height
+        else:
+            groups.append([index])
+            height = frame_height
+
+    canvases = []
+    for group in groups:
+        width = max(frames[index].shape[1] for index in group)
+        height = sum(frames[index].shape[0] for index in group) + gap * (len(group) - 1)
+        canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        placements = []
+        y = 0
+        for index in group:
+            frame = frames[index]
+            canvas[y:y + frame.shape[0], :frame.shape[1]] = frame
+            placements.append((index, y, frame.shape[0]))
+            y += frame.shape[0] + gap
+        canvases.append((canvas, placements))
+    return canvases
+
+def stack_crops(crops, gap=CROP_GAP):
+    """
+    Stack crops vertically on one canvas, for recognizers that take an image and strips of it.
+    Returns (canvas, boxes) with boxes the (left, top, right, bottom) strip of each crop.
+    """
+    width = max(crop.shape[1] for crop in crops)
+    height = sum(crop.shape[0] for crop in crops) + gap * (len(crops) - 1)
+    canvas = np.zeros((height, width) + crops[0].shape[2:], dtype=crops[0].dtype)
+    boxes = []
+    y = 0
+    for crop in crops:
+        canvas[y:y + crop.shape[0], :crop.shape[1]] = crop
+        boxes.append((0, y, crop.shape[1], y + crop.shape[0]))
+        y += crop.shape[0] + gap
+    return canvas, boxes
+
+def split_results(detected_items, placements, num_frames):
+    """Assign the results of a stitched canvas back to their frames, in frame coordinates"""
+    per_frame = [[] for _ in range(num_frames)]
+    for box, text, confidence in detected_items:
+        y_center = sum(point[1] for point in box) / len(box)
+        for index, y_offset, height in placements:
+            if y_offset <= y_center < y_offset + height:
+                frame_box = [[x, y - y_offset] for x, y in box]
+                per_frame[index].append((frame_box, text, confidence))
+                break
+    return per_frame
+
+class _Request:
+    __slots__ = ("item", "result", "error", "done")
+
+    def __init__(self, item):
+        self.item = item
+        self.result = None
+        self.error = None
+        self.done = False
+
+class MicroBatcher:
+    def __init__(self, batch_func, window=0.003, max_batch=8):
+        """
+        Merge concurrent calls into batches
+
+        Args:
+            batch_func: Function taking a list of items and returning a list of results in the same order
+            window: Seconds the first caller waits for others to join its batch
+            max_batch: Largest batch; a full batch runs without waiting out the window
+        """
+        self.batch_func = batch_func
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._collecting = False
+        self._condition = threading.Condition()
+
+        # Counters for reporting
+        self.requests = 0
+        self.batches = 0
+
+    def submit(self, item):
+        """Process one item as part of whichever batch it joins; blocks until its result is ready"""
+        request = _Request(item)
+        with self._condition:
+            self._pending.append(request)
+            self.requests += 1
+            self._condition.notify_all()
+
+            while True:
+                if request.done:
+                    if request.error is not None:
+                        raise request.error
+                    return request.result
+
+                # Nobody is collecting a batch for this request - collect one ourselves
+                if not self._collecting and request in self._pending:
+                    batch = self._collect()
+                    self._condition.release()
+                    try:
+                        self._run(batch)
+                    finally:
+                        self._condition.acquire()
+                    continue
+
+                self._condition.wait()
+
+    def _collect(self):
+        """Wait out the window (or until the batch is full) and take the pending requests; lock held"""
+        self._collecting = True
+        deadline = time.monotonic() + self.window
+        while len(self._pending) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._condition.wait(remaining)
+
+        batch = self._pending[:self.max_batch]
+        del self._pending[:self.max_batch]
+        self.batches += 1
+
+        # Let another caller start collecting the next batch while this one runs
+        self._collecting = False
+        self._condition.notify_all()
+        return batch
+
+    def _run(self, batch):
+        """Run one batch outside the lock and hand every caller its result"""
+        try:
+            results = self.batch_func([request.item for request in batch])
+            error = None
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch of {len(batch)} items returned {len(results)} results")
+        except Exception as e:
+            results = [None] * len(batch)
+            error = e
+
+        with self._condition:
+            for request, result in zip(batch, results):
+                request.result = result
+                request.error = error
+                request.done = True
+            self._condition.notify_all()
+
+    def summary(self):
+        """One-line description of how many calls were merged"""
+        average = self.requests / self.batches if self.batches else 0.0
+        return f"OCR micro-batching: {self.requests} calls in {self.batches} batches ({average:.2f} frames per batch)"
@@ -0,0 +1,154 @@
+"""
+Frame utilities for the Skill Reroll Automation tool.
+Provides cheap frame signatures and render-settle detection for the detection region.
+"""
+
+import asyncio
+import hashlib
+import time
+import numpy as np
+from PIL import Image
+
+# Size of the downsampled luma thumbnail used for frame comparison
+SIGNATURE_SIZE = (48, 24)
+
+# ITU-R BT.601 luma weights in BGR channel order
+BGR_LUMA_WEIGHTS = np.array([0.114, 0.587, 0.299], dtype=np.float32)
+
+def frame_signature(image, size=SIGNATURE_SIZE):
+    """
+    Build a cheap signature of a frame: a tiny grayscale thumbnail as a numpy array.
+    Returns None if no image is given.
+    """
+    if image is None:
+        return None
+
+    if isinstance(image, np.ndarray):
+        # Sample a grid of pixels from the BGR frame without touching the rest of it
+        height, width = image.shape[:2]
+        rows = np.linspace(0, height - 1, size[1]).astype(np.intp)
+        cols = np.linspace(0, width - 1, size[0]).astype(np.intp)
+        sample = image[rows[:, np.newaxis], cols[np.newaxis, :], :3].astype(np.float32)
+        return (sample @ BGR_LUMA_WEIGHTS).astype(np.int16)
+
+    # Downsample the luma channel - this is much cheaper than comparing full frames
+    thumbnail = image.convert("L").resize(size, Image.BILINEAR)
+    return np.asarray(thumbnail, dtype=np.int16)
+
+def frame_size(image):
+    """(width, height) of a BGR array or a PIL image"""
+    if isinstance(image, np.ndarray):
+        return (image.shape[1], image.shape[0])
+    return image.size
+
+def to_bgr_array(image):
+    """Frames in the OCR path are BGR arrays; PIL images (RGB) are converted, arrays pass through untouched"""
+    if isinstance(image, np.ndarray):
+        return image
+    return np.ascontiguousarray(np.asarray(image.convert("RGB"))[:, :, ::-1])
+
+def frame_hash(image, size=SIGNATURE_SIZE):
+    """
+    Cheap content hash of a frame: the downsampled luma thumbnail, quantized to ignore
+    tiny brightness noise, then hashed. Returns None if no image is given.
+    """
+    signature = frame_signature(image, size)
+    if signature is None:
+        return None
+    quantized = (signature >> 3).astype(np.uint8)
+    return hashlib.blake2b(quantized.tobytes(), digest_size=8).hexdigest()
+
+def signature_distance(sig1, sig2):
+    """
+    Mean absolute difference between two frame signatures.
+    Returns infinity if either signature is missing or the shapes differ.
+    """
+    if sig1 is None or sig2 is None or sig1.shape != sig2.shape:
+        return float('inf')
+    return float(np.abs(sig1 - sig2).mean())
+
+class RenderSettleDetector:
+    def __init__(self, capture_func, poll_interval=0.03, stable_polls=2, tolerance=1.5):
+        """
+        Initialize the render settle detector
+
+        Args:
+            capture_func: Coroutine function returning a BGR array (or PIL image) of the detection region, or None
+            poll_interval: Seconds to wait between polls
+            stable_polls: Number of consecutive matching polls required to call the panel stable
+            tolerance: Maximum mean luma difference for two polls to count as identical
+        """
+        self.capture_func = capture_func
+        self.poll_interval = poll_interval
+        self.stable_polls = stable_polls
+        self.tolerance = tolerance
+
+        # Signature of the last settled frame, used as the baseline for the next wait
+        self.last_signature = None
+
+        # Whether the last wait saw the panel move away from its baseline at all
+        self.last_wait_changed = False
+
+    def reset(self):
+        """Forget the last settled frame"""
+        self.last_signature = None
+
+    async def capture_baseline(self):
+        """Capture the current panel as the baseline for the next wait"""
+        self.last_signature = frame_signature(await self.capture_func())
+        return self.last_signature is not None
+
+    async def wait_for_settle(self, timeout, should_continue=None):
+        """
+        Poll the detection region until the panel has changed from the baseline and stopped changing.
+        The wait can be cancelled at any poll.
+
+        Args:
+            timeout: Ceiling in seconds; the wait always returns once it is reached
+            should_continue: Optional function returning False to abort the wait early
+
+        Returns: tuple (settled, frame, elapsed) where frame is the last captured image
+        """
+        baseline = self.last_signature
+        start_time = time.perf_counter()
+        deadline = start_time + timeout
+
+        frame = None
+        previous = None
+        stable_count = 0
+        changed = baseline is None
+
+        while True:
+            await asyncio.sleep(self.poll_interval)
+
+            if should_continue is not None and not should_continue():
+                break
+
+            frame = await self.capture_func()
+            signature = frame_signature(frame)
+
+            if signature is not None:
+                # The panel must first move away from the baseline (the click registered)
+                if not changed and signature_distance(signature, baseline) > self.tolerance:
+                    changed = True
+
+                # Then it must stay the same for a few consecutive polls (the redraw finished)
+                if signature_distance(signature, previous) <= self.tolerance:
+                    stable_count += 1
+                else:
+                    stable_count = 0
+                previous = signature
+
+                if changed and stable_count >= self.stable_polls:
+                    self.last_signature = signature
+                    self.last_wait_changed = True
+                    return True, frame, time.perf_counter() - start_time
+
+            if time.perf_counter() >= deadline:
+                break
+
+        # Ceiling reached - remember what we saw so the next wait has a baseline
+        if previous is not None:
+            self.last_signature = previous
+        self.last_wait_changed = changed
+        return False, frame, time.perf_counter() - start_time
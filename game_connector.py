@@ -3,7 +3,7 @@ Game connector module for the Skill Reroll Automation tool.
 Handles connecting to the game window and sending clicks.
 """
 
-from pywinauto import Application
+from pywinauto import Application, findwindows
 from tkinter import messagebox
 import win32gui
 import win32con
@@ -16,11 +16,93 @@ class GameConnector:
         self.game_window = None
         self.status_callback = status_callback
 
+        # Handle of the specific window this connector was attached to (None: any game window)
+        self.window_handle = None
+
     def update_status(self, message):
         """Update status via callback if available"""
         if self.status_callback:
             self.status_callback(message)
 
+    @staticmethod
+    def find_game_windows():
+        """
+        Find every game client window by class name.
+        Returns: list of pywinauto window wrappers (may be empty)
+        """
+        windows = []
+
+        # Each client runs in its own process, so enumerate the window handles of all of them
+        for handle in findwindows.find_windows(class_name="D3D Window"):
+            try:
+                windows.append(GameConnector.window_from_handle(handle))
+            except Exception:
+                continue
+        return windows
+
+    @staticmethod
+    def window_from_handle(handle):
+        """pywinauto window wrapper of a window handle (raises if the window is gone)"""
+        return Application().connect(handle=handle).window(handle=handle).wrapper_object()
+
+    @classmethod
+    def connect_all(cls, status_callback=None):
+        """
+        Create one connector per visible game client window, for multi-session automation.
+        Returns: list of connected GameConnector objects
+        """
+        connectors = []
+        try:
+            windows = cls.find_game_windows()
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not connect to the game. Make sure it's running.\nError: {str(e)}")
+            return connectors
+
+        for window in windows:
+            connector = cls(status_callback)
+            if connector.connect_to_window(window):
+                connectors.append(connector)
+
+        if not connectors:
+            messagebox.showerror("Error", "Could not find any visible game window.")
+        return connectors
+
+    def connect_to_window(self, window):
+        """
+        Attach this connector to a specific game window
+        Returns: bool: True if the window is usable, False otherwise
+        """
+        try:
+            if window.is_visible() and window.is_enabled():
+                self.game_window = window
+                self.window_handle = window.handle
+                return True
+        except Exception as e:
+            self.update_status(f"Could not attach to game window: {str(e)}")
+        return False
+
+    def connect_to_handle(self, handle):
+        """
+        Attach this connector to the game window with the given handle
+        Returns: bool: True if the window still exists and is usable, False otherwise
+        """
+        try:
+            window = self.window_from_handle(handle)
+        except Exception as e:
+            self.update_status(f"Game window {handle} is no longer available: {str(e)}")
+            return False
+        return self.connect_to_window(window)
+
+    def reconnect(self):
+        """
+        Connect again to the window this connector was attached to, or to any game window if it
+        was never attached to a specific one
+        Returns: bool: True if connection successful, False otherwise
+        """
+        if self.window_handle is not None:
+            return self.connect_to_handle(self.window_handle)
+        return self.connect_to_game()
+
     def connect_to_game(self):
         """
         Connect to the game window by class name (most reliable method)
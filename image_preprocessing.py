@@ -0,0 +1,313 @@
+"""
+Image preprocessing pipeline for the Skill Reroll Automation tool.
+Configurable steps (grayscale, contrast stretch, colour-keyed text mask, binarization, downscale)
+run between capture and OCR, each timing its own cost. Pipelines can be compared on a saved
+frame set by latency and accuracy to pick the cheapest one that still reads every stat.
+
+Run as a script to compare pipelines:
+    python image_preprocessing.py <frame_dir> ["grayscale,contrast" "binarize,downscale:0.75" ...]
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import numpy as np
+from PIL import Image
+
+# Text colours of the stats panel (stat names and values), as (R, G, B)
+DEFAULT_TEXT_COLOURS = [(235, 235, 235), (255, 210, 90), (120, 200, 255)]
+
+# ITU-R BT.601 luma weights, in the BGR channel order of captured frames
+LUMA_WEIGHTS = np.array([0.114, 0.587, 0.299], dtype=np.float32)
+
+def to_gray(image):
+    """Luma of a BGR image as uint8 (grayscale images are returned as-is)"""
+    if image.ndim == 2:
+        return image
+    return (image[:, :, :3].astype(np.float32) @ LUMA_WEIGHTS).astype(np.uint8)
+
+def otsu_threshold(gray):
+    """Threshold that best separates the two intensity classes of a grayscale image"""
+    histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = histogram.sum()
+    if not total:
+        return 128
+
+    levels = np.arange(256)
+    weight_low = np.cumsum(histogram)
+    weight_high = total - weight_low
+    sum_low = np.cumsum(histogram * levels)
+    mean_low = sum_low / np.maximum(weight_low, 1)
+    mean_high = (sum_low[-1] - sum_low) / np.maximum(weight_high, 1)
+    between_variance = weight_low * weight_high * (mean_low - mean_high) ** 2
+    return int(np.argmax(between_variance))
+
+class Grayscale:
+    name = "grayscale"
+
+    def __call__(self, image):
+        return to_gray(image)
+
+class ContrastStretch:
+    def __init__(self, low_percentile=2, high_percentile=98):
+        """Stretch intensities so the given percentiles map to 0 and 255"""
+        self.low_percentile = low_percentile
+        self.high_percentile = high_percentile
+        self.name = "contrast"
+
+    def __call__(self, image):
+        low, high = np.percentile(image, (self.low_percentile, self.high_percentile))
+        if high - low < 1:
+            return image
+        stretched = (image.astype(np.float32) - low) * (255.0 / (high - low))
+        return np.clip(stretched, 0, 255).astype(np.uint8)
+
+class ColourKeyMask:
+    def __init__(self, colours=None, tolerance=60):
+        """Keep only pixels within tolerance (per channel) of one of the (R, G, B) text colours; black out the rest"""
+        # Frames are BGR, so compare against the colours in that order
+        self.colours = np.array(colours or DEFAULT_TEXT_COLOURS, dtype=np.int16)[:, ::-1]
+        self.tolerance = tolerance
+        self.name = "colourkey"
+
+    def __call__(self, image):
+        if image.ndim == 2:
+            return image
+        pixels = image[:, :, :3].astype(np.int16)
+        mask = np.zeros(image.shape[:2], dtype=bool)
+        for colour in self.colours:
+            mask |= (np.abs(pixels - colour) <= self.tolerance).all(axis=2)
+        return np.where(mask[:, :, np.newaxis], image, 0).astype(np.uint8)
+
+class Binarize:
+    def __init__(self, threshold=None):
+        """Black-and-white image; threshold None picks one per frame with Otsu's method"""
+        self.threshold = threshold
+        self.name = "binarize"
+
+    def __call__(self, image):
+        gray = to_gray(image)
+        threshold = self.threshold if self.threshold is not None else otsu_threshold(gray)
+        return np.where(gray > threshold, 255, 0).astype(np.uint8)
+
+class Downscale:
+    def __init__(self, scale=0.75):
+        """Resize the frame by scale; OCR boxes are mapped back to full-size coordinates"""
+        self.scale = scale
+        self.name = f"downscale:{scale:g}"
+
+    def __call__(self, image):
+        height, width = image.shape[:2]
+        size = (max(1, round(width * self.scale)), max(1, round(height * self.scale)))
+        return np.asarray(Image.fromarray(image).resize(size, Image.BILINEAR))
+
+# Step names accepted by parse_pipeline; "name:arg" passes a numeric argument
+STEP_FACTORIES = {
+    "grayscale": lambda arg: Grayscale(),
+    "contrast": lambda arg: ContrastStretch() if arg is None else ContrastStretch(arg, 100 - arg),
+    "colourkey": lambda arg: ColourKeyMask() if arg is None else ColourKeyMask(tolerance=arg),
+    "binarize": lambda arg: Binarize(None if arg is None else int(arg)),
+    "downscale": lambda arg: Downscale() if arg is None else Downscale(arg),
+}
+
+class PreprocessingPipeline:
+    def __init__(self, steps=None, name=None):
+        """
+        Initialize a preprocessing pipeline
+
+        Args:
+            steps: Callables taking and returning a numpy image, each with a name attribute
+            name: Display name (defaults to the step names joined by commas)
+        """
+        self.steps = list(steps or [])
+        self.name = name or (",".join(step.name for step in self.steps) or "raw")
+
+        # Per-step timing: name -> [total seconds, calls]
+        self.step_times = {step.name: [0.0, 0] for step in self.steps}
+        self._lock = threading.Lock()
+
+    def apply(self, image):
+        """
+        Run every step on a frame.
+        Returns (image, scale) where image is a C-contiguous uint8 BGR array the OCR engine accepts
+        and scale is the factor the frame was resized by.
+        """
+        image = np.asarray(image)
+        scale = 1.0
+        for step in self.steps:
+            start = time.perf_counter()
+            image = step(image)
+            elapsed = time.perf_counter() - start
+            scale *= getattr(step, "scale", 1.0)
+            with self._lock:
+                timing = self.step_times[step.name]
+                timing[0] += elapsed
+                timing[1] += 1
+
+        # The recognizer expects three channels
+        if image.ndim == 2:
+            image = np.repeat(image[:, :, np.newaxis], 3, axis=2)
+        return np.ascontiguousarray(image, dtype=np.uint8), scale
+
+    def reset_stats(self):
+        """Clear the per-step timings"""
+        with self._lock:
+            self.step_times = {step.name: [0.0, 0] for step in self.steps}
+
+    def step_costs(self):
+        """Average cost per step in milliseconds, in pipeline order"""
+        with self._lock:
+            return [(name, total / calls * 1000 if calls else 0.0)
+                    for name, (total, calls) in self.step_times.items()]
+
+    def summary(self):
+        """One-line description of the per-step costs"""
+        costs = ", ".join(f"{name} {ms:.2f}ms" for name, ms in self.step_costs())
+        return f"Preprocessing [{self.name}]: {costs or 'no steps'}"
+
+def parse_pipeline(spec):
+    """Build a pipeline from a comma-separated spec such as "grayscale,contrast,downscale:0.75" """
+    steps = []
+    for part in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, arg = part.partition(":")
+        if name not in STEP_FACTORIES:
+            raise ValueError(f"Unknown preprocessing step: {name}")
+        steps.append(STEP_FACTORIES[name](float(arg) if arg else None))
+    return PreprocessingPipeline(steps)
+
+def preprocess_frame(pipeline, image):
+    """Apply a pipeline if one is set; returns (image, scale)"""
+    if pipeline is None or not pipeline.steps:
+        return image, 1.0
+    return pipeline.apply(image)
+
+def restore_boxes(detected_items, scale):
+    """Map the boxes of OCR results on a resized frame back to full-size coordinates"""
+    if scale == 1.0:
+        return detected_items
+    return [([[x / scale, y / scale] for x, y in box], text, confidence)
+            for box, text, confidence in detected_items]
+
+def scale_line_boxes(line_boxes, scale):
+    """Map (left, top, right, bottom) strips into the coordinates of a resized frame"""
+    if scale == 1.0:
+        return line_boxes
+    return [tuple(int(round(coord * scale)) for coord in rect) for rect in line_boxes]
+
+# Saved frame sets are a directory of PNG frames plus labels.json mapping file name -> {stat: value}
+LABELS_FILE = "labels.json"
+
+def save_labeled_frame(directory, image, stats, name=None):
+    """Add a BGR frame and the stats it shows to a frame set"""
+    os.makedirs(directory, exist_ok=True)
+    labels_path = os.path.join(directory, LABELS_FILE)
+    labels = {}
+    if os.path.exists(labels_path):
+        with open(labels_path, "r", encoding="utf-8") as f:
+            labels = json.load(f)
+
+    name = name or f"frame_{len(labels):04d}.png"
+    Image.fromarray(np.asarray(image)[:, :, ::-1]).save(os.path.join(directory, name))
+    labels[name] = stats
+    with open(labels_path, "w", encoding="utf-8") as f:
+        json.dump(labels, f, indent=2)
+    return name
+
+def load_frame_set(directory):
+    """Load a frame set as a list of (name, BGR array, expected stats)"""
+    with open(os.path.join(directory, LABELS_FILE), "r", encoding="utf-8") as f:
+        labels = json.load(f)
+    frames = []
+    for name, stats in sorted(labels.items()):
+        image = np.ascontiguousarray(np.asarray(Image.open(os.path.join(directory, name)).convert("RGB"))[:, :, ::-1])
+        frames.append((name, image, stats))
+    return frames
+
+def compare_pipelines(reader, pipelines, frames, status_callback=None):
+    """
+    Run every pipeline over a labeled frame set with the given OCR reader.
+    A frame counts as correct only if every stat and value is read exactly as labeled.
+    Returns a list of dicts (name, mean_ms, max_ms, accuracy, failures, step_costs), one per pipeline.
+    """
+    from paddle_ocr_implementation import parse_detected_text
+
+    previous = reader.preprocessor
+    results = []
+    try:
+        for pipeline in pipelines:
+            reader.preprocessor = pipeline
+            # One untimed pass so the first frame does not pay for warm-up
+            if frames:
+                reader.readtext(frames[0][1])
+            pipeline.reset_stats()
+
+            latencies = []
+            failures = []
+            for name, image, expected in frames:
+                start = time.perf_counter()
+                detected_items = reader.readtext(image)
+                latencies.append((time.perf_counter() - start) * 1000)
+                found = parse_detected_text(detected_items)
+                if found != expected:
+                    failures.append((name, found))
+
+            result = {
+                "name": pipeline.name,
+                "mean_ms": sum(latencies) / len(latencies) if latencies else 0.0,
+                "max_ms": max(latencies) if latencies else 0.0,
+                "accuracy": (len(frames) - len(failures)) / len(frames) if frames else 0.0,
+                "failures": failures,
+                "step_costs": pipeline.step_costs(),
+            }
+            results.append(result)
+            if status_callback:
+                status_callback(f"{result['name']}: {result['mean_ms']:.1f}ms mean, {result['max_ms']:.1f}ms max, "
+                                f"{result['accuracy'] * 100:.1f}% frames correct")
+    finally:
+        reader.preprocessor = previous
+    return results
+
+def best_pipeline(results):
+    """Name of the fastest pipeline that read every frame correctly, or None"""
+    perfect = [result for result in results if result["accuracy"] == 1.0]
+    if not perfect:
+        return None
+    return min(perfect, key=lambda result: result["mean_ms"])["name"]
+
+# Pipelines compared when none are given on the command line
+CANDIDATE_PIPELINES = [
+    "",
+    "grayscale",
+    "grayscale,contrast",
+    "colourkey",
+    "colourkey,binarize",
+    "grayscale,contrast,binarize",
+    "downscale:0.75",
+    "downscale:0.5",
+    "grayscale,contrast,downscale:0.75",
+    "grayscale,contrast,downscale:0.5",
+]
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"Usage: python {os.path.basename(__file__)} <frame_dir> [pipeline spec ...]")
+        sys.exit(1)
+
+    from paddle_ocr_implementation import PaddleOCRWrapper
+
+    frame_set = load_frame_set(sys.argv[1])
+    specs = sys.argv[2:] or CANDIDATE_PIPELINES
+    print(f"Comparing {len(specs)} pipelines on {len(frame_set)} frames")
+
+    ocr_reader = PaddleOCRWrapper(print, warmup_runs=2)
+    comparison = compare_pipelines(ocr_reader, [parse_pipeline(spec) for spec in specs], frame_set, print)
+
+    for entry in comparison:
+        print(f"\n{entry['name']}: " + ", ".join(f"{name} {ms:.2f}ms" for name, ms in entry["step_costs"]))
+        for frame_name, found in entry["failures"]:
+            print(f"  {frame_name}: read {found}")
+
+    best = best_pipeline(comparison)
+    print(f"\nCheapest pipeline reading every frame correctly: {best if best is not None else 'none'}")
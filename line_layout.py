@@ -0,0 +1,168 @@
+"""
+Line layout module for the Skill Reroll Automation tool.
+Learns where the text lines of the stats panel sit inside the detection region, so later rolls
+can skip text detection and send the cropped line strips straight to the recognizer.
+"""
+
+from stat_matcher import get_y_center
+from value_reader import is_value_text
+
+def box_to_rect(box):
+    """Convert a 4-point OCR box to an axis-aligned (x1, y1, x2, y2) rectangle"""
+    xs = [point[0] for point in box]
+    ys = [point[1] for point in box]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+def rect_to_box(rect):
+    """Convert an (x1, y1, x2, y2) rectangle to the 4-point box format used by OCR results"""
+    x1, y1, x2, y2 = rect
+    return [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+
+def group_rows(detected_items, row_tolerance):
+    """
+    Group detected text boxes into rows by their y-center.
+    Returns a list of rows (top to bottom), each a list of (rectangle, text) sorted left to right.
+    """
+    items = sorted(detected_items, key=lambda item: get_y_center(item[0]))
+
+    rows = []
+    row_y = None
+    for box, text, _ in items:
+        y_center = get_y_center(box)
+        if row_y is None or abs(y_center - row_y) > row_tolerance:
+            rows.append([])
+            row_y = y_center
+        rows[-1].append((box_to_rect(box), text))
+
+    return [sorted(row, key=lambda slot: slot[0]) for row in rows]
+
+class LineLayout:
+    def __init__(self, calibration_frames=3, row_tolerance=8, min_confidence=0.8, padding=3):
+        """
+        Initialize the line layout learner
+
+        Args:
+            calibration_frames: Number of consecutive frames with the same row structure needed to learn the layout
+            row_tolerance: Maximum y-center difference (pixels) for two boxes to be on the same row
+            min_confidence: Every recognized line must reach this confidence, otherwise detection runs again
+            padding: Vertical padding (pixels) added around each learned row
+        """
+        self.calibration_frames = calibration_frames
+        self.row_tolerance = row_tolerance
+        self.min_confidence = min_confidence
+        self.padding = padding
+
+        # Learned strips as (left, top, right, bottom) rectangles, and the frame size they belong to
+        self.line_boxes = None
+        self.frame_size = None
+
+        # Per learned strip: whether it held a stat value in every calibration frame
+        self.value_slots = None
+
+        # Row structures seen during calibration
+        self._pending = []
+        self._pending_size = None
+
+        # Counters for reporting
+        self.recognition_only_frames = 0
+        self.detection_frames = 0
+        self.calibrations = 0
+        self.invalidations = 0
+
+    def is_calibrated(self, frame_size):
+        """Check if a layout has been learned for frames of this size"""
+        return self.line_boxes is not None and self.frame_size == frame_size
+
+    def invalidate(self):
+        """Forget the learned layout so it is learned again from new detections"""
+        if self.line_boxes is not None:
+            self.invalidations += 1
+        self.line_boxes = None
+        self.frame_size = None
+        self.value_slots = None
+        self._pending = []
+
+    def observe(self, detected_items, frame_size):
+        """Feed the result of a full detection pass; learns the layout once enough frames agree"""
+        self.detection_frames += 1
+        if self.is_calibrated(frame_size):
+            return
+
+        rows = group_rows(detected_items, self.row_tolerance)
+        if not rows:
+            self._pending = []
+            return
+
+        # Start over if the frame size or the row structure changed
+        structure = [len(row) for row in rows]
+        if self._pending and (frame_size != self._pending_size
+                              or structure != [len(row) for row in self._pending[0]]):
+            self._pending = []
+        self._pending.append(rows)
+        self._pending_size = frame_size
+
+        if len(self._pending) >= self.calibration_frames:
+            frames = self._pending
+            line_boxes = self._build_line_boxes(frames, frame_size)
+            self._pending = []
+            if line_boxes:
+                self.line_boxes = line_boxes
+                self.frame_size = frame_size
+                self.value_slots = [all(is_value_text(rows[r][s][1]) for rows in frames)
+                                    for r in range(len(frames[0])) for s in range(len(frames[0][r]))]
+                self.calibrations += 1
+
+    def _build_line_boxes(self, frames, frame_size):
+        """
+        Merge the rows of the calibration frames into line strips.
+        Rows span the union of their boxes plus padding; within a row, each text slot extends to the
+        midpoint of the gap to its neighbours (and to the region edges), so longer stat names still fit.
+        Returns None if rows or slots overlap and no stable layout can be learned.
+        """
+        width, height = frame_size
+        num_rows = len(frames[0])
+
+        # Vertical extent of every row across all frames
+        row_ranges = []
+        for r in range(num_rows):
+            top = min(rect[1] for rows in frames for rect, _ in rows[r])
+            bottom = max(rect[3] for rows in frames for rect, _ in rows[r])
+            row_ranges.append((top, bottom))
+        for r in range(num_rows - 1):
+            if row_ranges[r][1] >= row_ranges[r + 1][0]:
+                return None
+
+        line_boxes = []
+        for r, (top, bottom) in enumerate(row_ranges):
+            # Pad the row, without crossing the midpoint to the neighbouring rows
+            upper_limit = 0 if r == 0 else (row_ranges[r - 1][1] + top) / 2
+            lower_limit = height if r == num_rows - 1 else (bottom + row_ranges[r + 1][0]) / 2
+            row_top = int(max(upper_limit, top - self.padding))
+            row_bottom = int(min(lower_limit, bottom + self.padding))
+
+            # Horizontal extent of every slot in this row across all frames
+            num_slots = len(frames[0][r])
+            slot_ranges = []
+            for s in range(num_slots):
+                left = min(rows[r][s][0][0] for rows in frames)
+                right = max(rows[r][s][0][2] for rows in frames)
+                slot_ranges.append((left, right))
+            for s in range(num_slots - 1):
+                if slot_ranges[s][1] >= slot_ranges[s + 1][0]:
+                    return None
+
+            for s in range(num_slots):
+                slot_left = 0 if s == 0 else (slot_ranges[s - 1][1] + slot_ranges[s][0]) / 2
+                slot_right = width if s == num_slots - 1 else (slot_ranges[s][1] + slot_ranges[s + 1][0]) / 2
+                line_boxes.append((int(slot_left), row_top, int(slot_right), row_bottom))
+
+        return line_boxes
+
+    def accept(self, results):
+        """Check that recognition-only results are trustworthy; counts the frame if they are"""
+        if not results or len(results) != len(self.line_boxes):
+            return False
+        if any(confidence < self.min_confidence or not text.strip() for _, text, confidence in results):
+            return False
+        self.recognition_only_frames += 1
+        return True
@@ -2,6 +2,7 @@
 Main entry point for the Skill Reroll Automation tool.
 """
 
+import multiprocessing
 import tkinter as tk
 from ui import SkillRerollUI
 
@@ -23,5 +24,7 @@ class SkillRerollApp:
         self.root.mainloop()
 
 if __name__ == "__main__":
+    # Needed for the OCR worker processes in a frozen executable
+    multiprocessing.freeze_support()
     app = SkillRerollApp()
     app.run()
@@ -0,0 +1,196 @@
+"""
+OCR autotuner for the Skill Reroll Automation tool.
+Benchmarks a small grid of CPU thread counts and recognizer batch sizes (then MKL-DNN off for the
+best one) on synthetic panel frames, and remembers the configuration with the highest throughput
+at the expected number of concurrent OCR workers per machine. Tuning runs again when the hardware
+fingerprint (CPU, core count, OS) changes. The engine manager runs it in a separate process while
+automation is idle; a failed run is recorded so it is not retried on every launch.
+
+Run as a script to (re-)tune now:
+    python ocr_autotuner.py [backend]
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+from paddle_ocr_implementation import PaddleOCRWrapper, create_synthetic_panel_frame
+from ocr_worker_pool import THREADS_PER_WORKER, max_worker_count
+
+# Lines of the synthetic frames: enough of them that the recognizer batch size matters
+TUNING_PANEL_LINES = [
+    ("All Skill Amp.", "+16%"), ("Defense Rate", "+400"), ("Crit. DMG", "+12%"),
+    ("Absorb Damage", "1,200"), ("Ignore Penetration", "+60"), ("Resist Crit. DMG", "+8%"),
+    ("Arrival Skill Cool Time decreased.", "12s"), ("HP Auto Heal", "+40"),
+]
+
+# Recognizer batch sizes tried; every configuration loads a model, so the grid stays small
+BATCH_SIZES = (6, 16)
+
+# Most CPU threads tried per worker; more only pays off with a single session on a huge CPU
+MAX_TUNING_THREADS = 8
+
+def hardware_fingerprint():
+    """Short hash of the CPU, core count and OS; tuning results are only valid on the same hardware"""
+    description = "|".join([platform.system(), platform.machine(), platform.processor(), str(os.cpu_count())])
+    return hashlib.blake2b(description.encode(), digest_size=8).hexdigest()
+
+def thread_counts(cpu_count=None, max_threads=MAX_TUNING_THREADS):
+    """Thread counts worth trying on this machine: powers of two up to the core count (capped), and the cap"""
+    limit = min(cpu_count or os.cpu_count() or 1, max_threads)
+    counts = {limit}
+    count = 1
+    while count < limit:
+        counts.add(count)
+        count *= 2
+    return sorted(counts)
+
+def expected_workers(cpu_count=None):
+    """Number of OCR workers expected to run at once: as many as the default thread count allows"""
+    return max(1, (cpu_count or os.cpu_count() or 1) // THREADS_PER_WORKER)
+
+def throughput(ms, cpu_threads, workers):
+    """Frames per second of the workers that fit next to each other with cpu_threads threads each"""
+    active = min(workers, max_worker_count(cpu_threads))
+    return active * 1000.0 / ms
+
+def tuning_grid(backend="paddle"):
+    """Every configuration (backend keyword arguments) of the first tuning pass"""
+    grid = []
+    for cpu_threads, rec_batch_num in itertools.product(thread_counts(), BATCH_SIZES):
+        options = {"cpu_threads": cpu_threads, "rec_batch_num": rec_batch_num}
+        if backend == "paddle":
+            options["enable_mkldnn"] = True
+        grid.append(options)
+    return grid
+
+def synthetic_frames():
+    """A small and a full-height panel, like the detection regions users draw"""
+    return [
+        create_synthetic_panel_frame(),
+        create_synthetic_panel_frame(width=360, height=40 * (len(TUNING_PANEL_LINES) + 1), lines=TUNING_PANEL_LINES),
+    ]
+
+def benchmark(backend, options, frames, runs=3, precision="fp32"):
+    """Mean milliseconds per frame for one configuration (after one untimed warm-up pass)"""
+    reader = PaddleOCRWrapper(backend=backend, precision=precision, backend_options=options, warmup_runs=0)
+    for frame in frames:
+        reader.readtext(frame)
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        for frame in frames:
+            reader.readtext(frame)
+    elapsed = time.perf_counter() - start
+
+    if not reader.is_healthy():
+        raise RuntimeError("OCR failed during the benchmark")
+    return elapsed / (runs * len(frames)) * 1000
+
+def autotune(backend="paddle", status_callback=None, runs=3, precision="fp32", workers=None):
+    """
+    Benchmark the grid, then MKL-DNN off for the best configuration (Paddle only).
+    Configurations are ranked by throughput with workers OCR workers (default: expected_workers())
+    running at once, so per-frame latency bought with every core does not starve the other sessions.
+    Returns a dict with the best options, their latency and throughput and every configuration's results.
+    """
+    workers = workers or expected_workers()
+    frames = synthetic_frames()
+    results = []
+
+    def measure(options, label):
+        try:
+            ms = benchmark(backend, options, frames, runs, precision)
+        except Exception as e:
+            if status_callback:
+                status_callback(f"OCR tuning {label} {options}: failed ({str(e)})")
+            return
+        fps = throughput(ms, options["cpu_threads"], workers)
+        results.append((fps, ms, options))
+        if status_callback:
+            status_callback(f"OCR tuning {label} {options}: {ms:.1f}ms, {fps:.1f} frames/s with {workers} workers")
+
+    grid = tuning_grid(backend)
+    for index, options in enumerate(grid):
+        measure(options, f"{index + 1}/{len(grid)}")
+    if not results:
+        raise RuntimeError("No OCR configuration could be benchmarked")
+
+    if backend == "paddle":
+        best_options = max(results, key=lambda result: (result[0], -result[1]))[2]
+        measure(dict(best_options, enable_mkldnn=False), "MKL-DNN off")
+
+    best_fps, best_ms, best_options = max(results, key=lambda result: (result[0], -result[1]))
+    return {
+        "options": best_options,
+        "ms": best_ms,
+        "fps": best_fps,
+        "workers": workers,
+        "results": [{"options": options, "ms": ms, "fps": fps} for fps, ms, options in results],
+        "tuned_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+def run_tuning_process(backend, precision, path):
+    """Entry point of the tuning process: tune and record the result (models only load in this process)"""
+    try:
+        tuning = autotune(backend, precision=precision)
+    except Exception as e:
+        save_tuning_failure(path, backend, str(e))
+        return
+    save_tuning(path, backend, tuning)
+
+def load_tuning_entry(path, backend="paddle"):
+    """Recorded tuning result (or failure) of this backend on this machine, or None"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("fingerprint") != hardware_fingerprint():
+        return None
+    return data.get("backends", {}).get(backend)
+
+def load_tuning(path, backend="paddle"):
+    """Tuned options for this backend on this machine, or None if it has not been tuned here"""
+    tuning = load_tuning_entry(path, backend)
+    return tuning.get("options") if tuning else None
+
+def tuning_failed(path, backend="paddle"):
+    """Check if tuning this backend already failed on this machine (run the script to try again)"""
+    tuning = load_tuning_entry(path, backend)
+    return bool(tuning) and "failed" in tuning
+
+def save_tuning_failure(path, backend, error):
+    """Record that tuning failed, so it is not started again on every launch"""
+    save_tuning(path, backend, {"failed": error, "failed_at": time.strftime("%Y-%m-%d %H:%M:%S")})
+
+def save_tuning(path, backend, tuning):
+    """Record a tuning result; results of a different machine are discarded"""
+    data = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+
+    fingerprint = hardware_fingerprint()
+    if data.get("fingerprint") != fingerprint:
+        data = {"fingerprint": fingerprint, "backends": {}}
+    data["backends"][backend] = tuning
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+if __name__ == "__main__":
+    from ocr_engine_manager import TUNING_PATH
+
+    backend_name = sys.argv[1] if len(sys.argv) > 1 else "paddle"
+    print(f"Tuning the '{backend_name}' OCR backend on machine {hardware_fingerprint()}")
+    best = autotune(backend_name, print)
+    save_tuning(TUNING_PATH, backend_name, best)
+    print(f"Best configuration: {best['options']} ({best['ms']:.1f}ms per frame, "
+          f"{best['fps']:.1f} frames/s with {best['workers']} workers)")
@@ -0,0 +1,252 @@
+"""
+OCR backends for the Skill Reroll Automation tool.
+An OCR backend runs text detection and recognition on a frame. PaddleOCR is one implementation;
+the ONNX Runtime implementation runs exported PaddleOCR det/rec models on CPU without pulling
+in the paddlepaddle runtime. Every backend returns the same (box, text, confidence) tuples.
+
+ONNX models can be exported from the PaddleOCR inference models with paddle2onnx, e.g.
+    paddle2onnx --model_dir en_PP-OCRv3_det_infer --model_filename inference.pdmodel
+                --params_filename inference.pdiparams --save_file det.onnx
+and placed next to the recognizer's character dictionary in DEFAULT_ONNX_MODEL_DIR.
+
+Both backends can run an INT8-quantized recognition model (precision="int8"): for ONNX,
+rec_int8.onnx produced by quantize_onnx_rec_model; for Paddle, a PaddleSlim post-training
+quantized inference model in DEFAULT_PADDLE_INT8_REC_DIR.
+"""
+
+import math
+import os
+from typing import Protocol
+import numpy as np
+
+# Where the ONNX backend looks for det.onnx, rec.onnx and the character dictionary
+DEFAULT_ONNX_MODEL_DIR = os.path.join(os.path.expanduser("~"), ".arrival_skill", "onnx_models")
+
+# Where the Paddle backend looks for its INT8-quantized recognition inference model
+DEFAULT_PADDLE_INT8_REC_DIR = os.path.join(os.path.expanduser("~"), ".arrival_skill", "paddle_models", "en_rec_int8")
+
+# Recognition model precisions a backend can run
+PRECISIONS = ("fp32", "int8")
+
+class OCRBackend(Protocol):
+    """Text detection and recognition engine used by the OCR wrapper"""
+
+    # Short name used to select the backend
+    name = "backend"
+
+    def detect_and_recognize(self, image):
+        """Find and read every text line of a BGR frame; returns a list of (box, text, confidence)"""
+        ...
+
+    def recognize(self, crops):
+        """Read already cropped text lines; returns a list of (text, confidence), one per crop"""
+        ...
+
+class PaddleBackend:
+    name = "paddle"
+
+    def __init__(self, cpu_threads=4, rec_batch_num=6, enable_mkldnn=True, precision="fp32",
+                 int8_rec_model_dir=DEFAULT_PADDLE_INT8_REC_DIR):
+        """Load PaddleOCR (imported here so other backends never load the paddlepaddle runtime)"""
+        from paddleocr import PaddleOCR
+
+        # The default recognizer is FP32; INT8 uses the quantized inference model
+        rec_model_dir = int8_rec_model_dir if precision == "int8" else None
+        if rec_model_dir is not None and not os.path.isdir(rec_model_dir):
+            raise FileNotFoundError(f"INT8 recognition model not found in {rec_model_dir}")
+        self.precision = precision
+
+        # Initialize with minimal settings for speed and lightweight operation
+        self.ocr = PaddleOCR(
+            use_angle_cls=False,           # Disable angle classification for speed
+            lang='en',                     # English language
+            use_gpu=False,                 # Use CPU-only mode for smaller executable size
+            show_log=False,                # Disable logs
+            enable_mkldnn=enable_mkldnn,   # Enable Intel MKL-DNN acceleration
+            rec_batch_num=rec_batch_num,   # Increase batch size for faster processing
+            rec_model_dir=rec_model_dir,   # Default model unless the INT8 model is requested
+            det_model_dir=None,            # Use default model to avoid loading time
+            cpu_threads=cpu_threads        # Use more CPU threads for parallel processing
+        )
+
+    def detect_and_recognize(self, image):
+        result = self.ocr.ocr(image, cls=False)  # Disable classifier for speed
+
+        # Paddle returns [None] when no text was found
+        detected_items = []
+        if result and result[0]:
+            for line in result[0]:
+                if len(line) >= 2:
+                    detected_items.append((line[0], line[1][0], line[1][1]))
+        return detected_items
+
+    def recognize(self, crops):
+        rec_results, _ = self.ocr.text_recognizer(crops)
+        return rec_results
+
+class OnnxBackend:
+    name = "onnx"
+
+    # Detection: longest side limit, and the ImageNet normalization the det model was trained with
+    DET_MAX_SIDE = 960
+    DET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+    DET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+    # Recognition input height and the widest input relative to it
+    REC_HEIGHT = 48
+    REC_MAX_RATIO = 25
+
+    def __init__(self, model_dir=DEFAULT_ONNX_MODEL_DIR, det_model="det.onnx", rec_model="rec.onnx",
+                 dict_file="en_dict.txt", cpu_threads=4, rec_batch_num=6, det_threshold=0.3,
+                 box_threshold=0.6, unclip_ratio=1.5, precision="fp32", int8_rec_model="rec_int8.onnx"):
+        """
+        Load the exported detection and recognition models on the CPU execution provider
+
+        Args:
+            model_dir: Directory holding the models and the character dictionary
+            det_model: Detection model file name
+            rec_model: Recognition model file name
+            dict_file: Recognizer character dictionary (one character per line)
+            cpu_threads: Intra-op threads per ONNX Runtime session
+            rec_batch_num: Maximum number of lines per recognizer call
+            det_threshold: Text probability above which a pixel belongs to a text region
+            box_threshold: Minimum mean probability of a kept text region
+            unclip_ratio: How far a text region is grown to cover the whole line
+            precision: "fp32" for rec_model, "int8" for the quantized int8_rec_model
+            int8_rec_model: Quantized recognition model file name
+        """
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = cpu_threads
+        providers = ["CPUExecutionProvider"]
+        if precision == "int8":
+            rec_model = int8_rec_model
+        self.precision = precision
+        self.det_session = onnxruntime.InferenceSession(os.path.join(model_dir, det_model), options,
+                                                        providers=providers)
+        self.rec_session = onnxruntime.InferenceSession(os.path.join(model_dir, rec_model), options,
+                                                        providers=providers)
+        self.det_input = self.det_session.get_inputs()[0].name
+        self.rec_input = self.rec_session.get_inputs()[0].name
+
+        # CTC index 0 is the blank; the dictionary follows, then the space character
+        with open(os.path.join(model_dir, dict_file), "r", encoding="utf-8") as f:
+            characters = [line.rstrip("\r\n") for line in f]
+        self.characters = [""] + characters + [" "]
+
+        self.rec_batch_num = rec_batch_num
+        self.det_threshold = det_threshold
+        self.box_threshold = box_threshold
+        self.unclip_ratio = unclip_ratio
+
+    def detect(self, image):
+        """Text line boxes of a frame as 4-point boxes, top to bottom and left to right"""
+        import cv2
+
+        height, width = image.shape[:2]
+
+        # Resize so both sides are multiples of 32 and the longest side fits the limit
+        ratio = min(1.0, self.DET_MAX_SIDE / max(height, width))
+        resized_h = max(32, int(round(height * ratio / 32)) * 32)
+        resized_w = max(32, int(round(width * ratio / 32)) * 32)
+        resized = cv2.resize(image, (resized_w, resized_h))
+
+        tensor = (resized.astype(np.float32) / 255.0 - self.DET_MEAN) / self.DET_STD
+        tensor = tensor.transpose(2, 0, 1)[np.newaxis, :, :, :]
+        probability = self.det_session.run(None, {self.det_input: tensor})[0][0, 0]
+
+        # Connected text regions of the probability map, each grown to cover the whole line
+        bitmap = (probability > self.det_threshold).astype(np.uint8)
+        contours, _ = cv2.findContours(bitmap, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        scale_x = width / resized_w
+        scale_y = height / resized_h
+
+        rects = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if min(w, h) < 3:
+                continue
+            if float(probability[y:y + h, x:x + w][bitmap[y:y + h, x:x + w] > 0].mean()) < self.box_threshold:
+                continue
+
+            # Same growth distance as Paddle's DB post-processing: area * ratio / perimeter
+            distance = w * h * self.unclip_ratio / (2 * (w + h))
+            left = max(0, (x - distance) * scale_x)
+            top = max(0, (y - distance) * scale_y)
+            right = min(width, (x + w + distance) * scale_x)
+            bottom = min(height, (y + h + distance) * scale_y)
+            rects.append((int(left), int(top), int(math.ceil(right)), int(math.ceil(bottom))))
+
+        rects.sort(key=lambda rect: (rect[1], rect[0]))
+        return [[[left, top], [right, top], [right, bottom], [left, bottom]] for left, top, right, bottom in rects]
+
+    def detect_and_recognize(self, image):
+        boxes = self.detect(image)
+        crops = [image[box[0][1]:box[2][1], box[0][0]:box[2][0]] for box in boxes]
+        return [(box, text, confidence) for box, (text, confidence) in zip(boxes, self.recognize(crops))]
+
+    def recognize(self, crops):
+        import cv2
+
+        results = [("", 0.0)] * len(crops)
+
+        # Empty crops have nothing to read; batch the other lines by similar width, as PaddleOCR does
+        readable = [index for index in range(len(crops)) if crops[index].size]
+        order = sorted(readable, key=lambda index: crops[index].shape[1] / crops[index].shape[0])
+        for start in range(0, len(order), self.rec_batch_num):
+            batch = order[start:start + self.rec_batch_num]
+            max_ratio = max(crops[index].shape[1] / crops[index].shape[0] for index in batch)
+            batch_width = int(self.REC_HEIGHT * min(max(max_ratio, 320 / self.REC_HEIGHT), self.REC_MAX_RATIO))
+
+            tensor = np.zeros((len(batch), 3, self.REC_HEIGHT, batch_width), dtype=np.float32)
+            for row, index in enumerate(batch):
+                crop = crops[index]
+                if crop.ndim == 2:
+                    crop = np.repeat(crop[:, :, np.newaxis], 3, axis=2)
+                ratio = crop.shape[1] / crop.shape[0]
+                resized_w = min(batch_width, int(math.ceil(self.REC_HEIGHT * ratio)))
+                resized = cv2.resize(crop, (resized_w, self.REC_HEIGHT)).astype(np.float32)
+                tensor[row, :, :, :resized_w] = ((resized / 255.0 - 0.5) / 0.5).transpose(2, 0, 1)
+
+            probabilities = self.rec_session.run(None, {self.rec_input: tensor})[0]
+            for row, index in enumerate(batch):
+                results[index] = self.ctc_decode(probabilities[row])
+        return results
+
+    def ctc_decode(self, probabilities):
+        """Greedy CTC decoding of one line: drop repeats and blanks, confidence is the mean kept probability"""
+        indices = probabilities.argmax(axis=1)
+        scores = probabilities.max(axis=1)
+        keep = indices != 0
+        keep[1:] &= indices[1:] != indices[:-1]
+
+        text = "".join(self.characters[index] for index in indices[keep] if index < len(self.characters))
+        confidence = float(scores[keep].mean()) if keep.any() else 0.0
+        return text, confidence
+
+def quantize_onnx_rec_model(model_dir=DEFAULT_ONNX_MODEL_DIR, rec_model="rec.onnx", int8_rec_model="rec_int8.onnx"):
+    """Write a dynamically INT8-quantized copy of the ONNX recognition model; returns its path"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    output_path = os.path.join(model_dir, int8_rec_model)
+    quantize_dynamic(os.path.join(model_dir, rec_model), output_path, weight_type=QuantType.QInt8)
+    return output_path
+
+def int8_rec_model_path(name):
+    """Path of the INT8 recognition model a backend loads with precision="int8" """
+    if name == OnnxBackend.name:
+        return os.path.join(DEFAULT_ONNX_MODEL_DIR, "rec_int8.onnx")
+    return DEFAULT_PADDLE_INT8_REC_DIR
+
+# Backends selectable by name
+BACKENDS = {
+    PaddleBackend.name: PaddleBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+def create_backend(name="paddle", **kwargs):
+    """Build an OCR backend by name; raises ValueError for unknown names"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown OCR backend '{name}' (available: {', '.join(BACKENDS)})")
+    return BACKENDS[name](**kwargs)
@@ -0,0 +1,156 @@
+"""
+OCR result cache for the Skill Reroll Automation tool.
+A bounded LRU cache keyed by a hash of each cropped text line's pixels, storing the recognized
+(text, confidence). The same stat names and values render identically roll after roll,
+so repeated renders skip inference entirely. The cache can be saved to disk between launches.
+Entries are kept per engine profile (backend, precision, preprocessing), so a result read by one
+engine is never served after switching to another.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+class OCRResultCache:
+    def __init__(self, max_entries=4096, min_confidence=0.8, path=None, profile="default"):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Size cap; the least recently used entry is evicted beyond it
+            min_confidence: Only results at least this confident are cached
+            path: Optional JSON file the cache is loaded from and saved to
+            profile: Name of the engine configuration the entries belong to
+        """
+        self.max_entries = max_entries
+        self.min_confidence = min_confidence
+        self.path = path
+        self.profile = profile
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Entries of the other profiles, oldest first, as loaded or set aside on a profile switch
+        self.stored_profiles = {}
+
+        # Counters for reporting
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(crop):
+        """Content hash of a cropped line (pixels and shape)"""
+        crop = np.ascontiguousarray(crop)
+        digest = hashlib.blake2b(crop.tobytes(), digest_size=16)
+        digest.update(str(crop.shape).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the cached (text, confidence) for a key, or None"""
+        with self._lock:
+            result = self.entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, text, confidence):
+        """Store a recognition result if it is confident enough"""
+        if confidence < self.min_confidence:
+            return
+        with self._lock:
+            self.entries[key] = (text, confidence)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self.entries.clear()
+
+    def set_profile(self, profile):
+        """Switch to the entries of another engine profile, setting the current ones aside"""
+        with self._lock:
+            if profile == self.profile:
+                return
+            self.stored_profiles[self.profile] = list(self.entries.items())
+            self.profile = profile
+            self.entries = OrderedDict(self.stored_profiles.pop(profile, []))
+
+    def stored_entries(self):
+        """Number of entries over every profile"""
+        with self._lock:
+            return len(self.entries) + sum(len(entries) for entries in self.stored_profiles.values())
+
+    def hit_rate(self):
+        """Fraction of lookups served from the cache"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def summary(self):
+        """One-line description of the cache counters"""
+        return (f"OCR cache: {self.hit_rate() * 100:.1f}% hit rate ({self.hits} hits, {self.misses} misses), "
+                f"{len(self.entries)}/{self.max_entries} entries, {self.evictions} evicted")
+
+    def load(self, path=None):
+        """Load entries from disk; returns True if a cache file was read"""
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            profiles = data.get("profiles") if isinstance(data, dict) else None
+            if not isinstance(profiles, dict):
+                return False
+            loaded = {profile: _valid_entries(entries) for profile, entries in profiles.items()}
+        except (OSError, ValueError):
+            return False
+
+        with self._lock:
+            # Entries are stored oldest first, so the LRU order survives the round trip
+            for key, result in loaded.pop(self.profile, []):
+                self.entries[key] = result
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.stored_profiles.update(loaded)
+        return True
+
+    def save(self, path=None):
+        """Save entries to disk; returns True on success"""
+        path = path or self.path
+        if not path:
+            return False
+        with self._lock:
+            profiles = dict(self.stored_profiles)
+            profiles[self.profile] = list(self.entries.items())
+            data = {"profiles": {profile: [[key, list(result)] for key, result in entries[-self.max_entries:]]
+                                 for profile, entries in profiles.items()}}
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+        except OSError:
+            return False
+        return True
+
+def _valid_entries(entries):
+    """(key, (text, confidence)) pairs of a saved entry list; malformed entries are skipped"""
+    if not isinstance(entries, list):
+        return []
+    valid = []
+    for entry in entries:
+        try:
+            key, (text, confidence) = entry
+        except (TypeError, ValueError):
+            continue
+        if isinstance(key, str) and isinstance(text, str) and isinstance(confidence, (int, float)):
+            valid.append((key, (text, float(confidence))))
+    return valid
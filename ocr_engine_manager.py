@@ -0,0 +1,373 @@
+"""
+OCR engine manager for the Skill Reroll Automation tool.
+Keeps one process-wide, pre-warmed OCR engine that is loaded in the background at launch,
+shared by every session and start/stop cycle, and only rebuilt after a failed health check.
+The engine is either an in-process PaddleOCRWrapper or a pool of OCR worker processes.
+"""
+
+import os
+import threading
+import multiprocessing
+from paddle_ocr_implementation import PaddleOCRWrapper
+from ocr_backends import BACKENDS, PRECISIONS
+from quantization_gate import gate_passed
+from ocr_autotuner import load_tuning, run_tuning_process, save_tuning_failure, tuning_failed
+from ocr_worker_pool import OCRWorkerPool, THREADS_PER_WORKER, max_worker_count
+from ocr_cache import OCRResultCache
+from template_library import TemplateLibrary
+from value_reader import ValueReader
+
+# Per-user directory for files that persist between launches
+APP_DATA_DIR = os.path.join(os.path.expanduser("~"), ".arrival_skill")
+DEFAULT_CACHE_PATH = os.path.join(APP_DATA_DIR, "ocr_cache.json")
+
+# OCR backend used unless another one is selected at runtime
+DEFAULT_BACKEND = os.environ.get("ARRIVAL_SKILL_OCR_BACKEND", "paddle")
+
+# Outcome of the INT8 accuracy gate per backend (written by quantization_gate.py)
+INT8_GATE_PATH = os.path.join(APP_DATA_DIR, "int8_gate.json")
+
+# Fastest OCR configuration per backend on this machine (written by the autotuner)
+TUNING_PATH = os.path.join(APP_DATA_DIR, "ocr_tuning.json")
+
+class OCREngineManager:
+    def __init__(self, warmup_runs=2, cache_entries=4096, use_worker_processes=True, worker_count=1,
+                 backend=DEFAULT_BACKEND, precision=None, autotune=True):
+        """
+        Initialize the engine manager (nothing is loaded until preload or get_engine is called)
+
+        Args:
+            warmup_runs: Number of synthetic-frame inferences run after loading the model
+            cache_entries: Size cap of the line result cache shared by every engine
+            use_worker_processes: Run OCR in worker processes instead of this process
+            worker_count: Number of worker processes to start with
+            backend: Name of the OCR backend engines are built on ("paddle" or "onnx")
+            precision: Recognition model precision ("fp32" or "int8"); None uses INT8 only if its gate passed
+            autotune: Benchmark thread/batch configurations in a background process on a new machine,
+                      once the engine is loaded and while no automation runs
+        """
+        self.warmup_runs = warmup_runs
+        self.use_worker_processes = use_worker_processes
+        self.worker_count = worker_count
+        self.backend = backend
+        self.precision = precision
+        self.autotune = autotune
+
+        # Backend keyword arguments (cpu_threads, rec_batch_num, ...) and precision of the current engine
+        self.backend_options = None
+        self.loaded_precision = None
+        self.result_cache = OCRResultCache(max_entries=cache_entries)
+        self.template_library = TemplateLibrary()
+        self.value_reader = ValueReader()
+        self.preprocessor = None
+        self.status_callback = None
+        self.engine = None
+        self.load_error = None
+
+        # Incremented every time a new engine is built
+        self.generation = 0
+
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._loading = False
+
+        # Owners (running automators) holding the current engine; it is not switched under them
+        self.holders = set()
+
+        # Background process benchmarking OCR configurations (first run on a machine only), and the
+        # event telling its watcher that it was aborted rather than failed
+        self.tuning_process = None
+        self.tuning_aborted = None
+
+    def update_status(self, message):
+        """Update status via callback if available"""
+        if self.status_callback:
+            self.status_callback(message)
+
+    def is_ready(self):
+        """Check if a loaded engine is available right now"""
+        return self.engine is not None and not self._loading
+
+    def preload(self, status_callback=None):
+        """Start loading and warming the engine in the background (no-op if already loaded or loading)"""
+        if status_callback:
+            self.status_callback = status_callback
+
+        with self._lock:
+            if self.engine is not None or self._loading:
+                return
+            self._loading = True
+            self._ready.clear()
+
+        threading.Thread(target=self._load, daemon=True).start()
+
+    def resolve_precision(self):
+        """Precision engines are built with: the chosen one, else INT8 only when its accuracy gate passed"""
+        if self.precision is not None:
+            return self.precision
+        return "int8" if gate_passed(INT8_GATE_PATH, self.backend) else "fp32"
+
+    def tuned_options(self):
+        """Tuned backend configuration for this machine, or None (default settings) if it was never tuned here"""
+        return load_tuning(TUNING_PATH, self.backend)
+
+    def maybe_start_tuning(self):
+        """
+        Tune in the background if this machine was never tuned (nor failed to tune), but only once the
+        engine is loaded and no automation runs, so the timings are not taken under contention
+        """
+        if not self.autotune or self.engine is None or self.holders:
+            return
+        if load_tuning(TUNING_PATH, self.backend) is not None or tuning_failed(TUNING_PATH, self.backend):
+            return
+        self.start_tuning(self.loaded_precision)
+
+    def start_tuning(self, precision):
+        """Benchmark OCR configurations in a separate process (no-op while one is running or automation runs)"""
+        with self._lock:
+            if self.holders or (self.tuning_process is not None and self.tuning_process.is_alive()):
+                return
+            # Models are only built in the child, so tuning never blocks or loads Paddle here
+            process = multiprocessing.get_context("spawn").Process(
+                target=run_tuning_process, args=(self.backend, precision, TUNING_PATH), daemon=True)
+            aborted = threading.Event()
+            self.tuning_process = process
+            self.tuning_aborted = aborted
+
+        self.update_status("Tuning OCR threads and batch size in the background (first run only)...")
+        process.start()
+        threading.Thread(target=self._watch_tuning, args=(process, aborted, self.backend), daemon=True).start()
+
+    def stop_tuning(self):
+        """Abort a running tuning process; it starts over the next time automation is idle"""
+        with self._lock:
+            process = self.tuning_process
+            if process is None or not process.is_alive():
+                return
+            self.tuning_aborted.set()
+        process.terminate()
+
+    def _watch_tuning(self, process, aborted, backend):
+        """Report the outcome of a tuning process once it exits, recording a crash as a failure"""
+        process.join()
+        if aborted.is_set():
+            self.update_status("OCR tuning paused while automation runs")
+            return
+        options = load_tuning(TUNING_PATH, backend)
+        if options is not None:
+            self.update_status(f"OCR tuned: {options} (used from the next engine load)")
+            return
+
+        if not tuning_failed(TUNING_PATH, backend):
+            try:
+                save_tuning_failure(TUNING_PATH, backend, f"tuning process exited with code {process.exitcode}")
+            except OSError:
+                pass
+        self.update_status("OCR tuning failed, keeping the default settings "
+                           "(run ocr_autotuner.py to try again)")
+
+    def cache_profile(self, precision):
+        """Name of the engine configuration cached OCR results belong to"""
+        preprocessing = self.preprocessor.name if self.preprocessor is not None else "raw"
+        return f"{self.backend}/{precision}/{preprocessing}"
+
+    def _load(self):
+        """Build and warm a new engine, then publish it"""
+        engine = None
+        try:
+            precision = self.resolve_precision()
+            self.loaded_precision = precision
+            self.result_cache.set_profile(self.cache_profile(precision))
+            try:
+                self.backend_options = self.tuned_options()
+            except Exception as e:
+                self.backend_options = None
+                self.update_status(f"OCR tuning failed, using default settings: {str(e)}")
+            self.update_status("Loading OCR engine in the background...")
+            if self.use_worker_processes:
+                engine = OCRWorkerPool(self.worker_count, self.update_status, warmup_runs=self.warmup_runs,
+                                       backend=self.backend, precision=precision,
+                                       backend_options=self.backend_options)
+            else:
+                engine = PaddleOCRWrapper(self.update_status, backend=self.backend, precision=precision,
+                                          backend_options=self.backend_options, warmup_runs=self.warmup_runs)
+            engine.result_cache = self.result_cache
+            engine.template_library = self.template_library
+            engine.value_reader = self.value_reader
+            engine.preprocessor = self.preprocessor
+            self.load_error = None
+        except Exception as e:
+            engine = None
+            self.load_error = e
+            self.update_status(f"Error initializing OCR engine: {str(e)}")
+        finally:
+            with self._lock:
+                self.engine = engine
+                if engine is not None:
+                    self.generation += 1
+                self._loading = False
+                self._ready.set()
+
+        if engine is not None:
+            self.update_status("OCR engine ready")
+            self.update_status(engine.latency.summary())
+            self.maybe_start_tuning()
+
+    def enable_cache_persistence(self, path=DEFAULT_CACHE_PATH):
+        """Load the line result cache from disk and save it there from now on"""
+        self.result_cache.path = path
+        if self.result_cache.load():
+            self.update_status(f"Loaded {self.result_cache.stored_entries()} cached OCR results")
+
+    def save_cache(self):
+        """Save the line result cache if persistence is enabled"""
+        return self.result_cache.save()
+
+    def hold(self, owner):
+        """
+        Mark the engine as in use by owner, so the backend and precision cannot be switched under it.
+        A running tuning process is aborted so it does not slow the automation down.
+        """
+        with self._lock:
+            self.holders.add(owner)
+        self.stop_tuning()
+
+    def release(self, owner):
+        """Drop owner's hold on the engine; tuning may run again once nobody holds it"""
+        with self._lock:
+            self.holders.discard(owner)
+        self.maybe_start_tuning()
+
+    def _check_switchable(self):
+        """Refuse to rebuild the engine on other settings while running sessions still use it"""
+        if self.holders:
+            raise RuntimeError("Stop the automation before switching the OCR engine")
+
+    def set_backend(self, name):
+        """
+        Switch the OCR backend; a loaded engine is rebuilt on the new backend in the background.
+        Raises RuntimeError while automation is using the engine.
+        """
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown OCR backend '{name}' (available: {', '.join(BACKENDS)})")
+        if name == self.backend:
+            return
+        self._check_switchable()
+        self.backend = name
+
+        engine = self.engine
+        if engine is not None:
+            threading.Thread(target=self.rebuild, args=(engine, f"Switching OCR backend to '{name}'..."),
+                             daemon=True).start()
+
+    def set_precision(self, precision):
+        """
+        Force a recognition model precision ("fp32" or "int8"), or None to follow the INT8 gate.
+        Raises RuntimeError while automation is using the engine.
+        """
+        if precision is not None and precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision '{precision}' (available: {', '.join(PRECISIONS)})")
+        self._check_switchable()
+        self.precision = precision
+
+        engine = self.engine
+        if engine is not None:
+            threading.Thread(target=self.rebuild, args=(engine, "Reloading the OCR engine..."),
+                             daemon=True).start()
+
+    def set_preprocessing(self, pipeline):
+        """Use a PreprocessingPipeline (or None for raw frames) on every engine from now on"""
+        self.preprocessor = pipeline
+        engine = self.engine
+        if engine is not None:
+            self.result_cache.set_profile(self.cache_profile(self.loaded_precision))
+            engine.preprocessor = pipeline
+
+    def scale_workers(self, sessions):
+        """Grow the worker pool to one worker per session, capped by the machine's CPU cores"""
+        threads = (self.backend_options or {}).get("cpu_threads", THREADS_PER_WORKER)
+        target = min(sessions, max_worker_count(threads))
+        if target <= self.worker_count:
+            return self.worker_count
+        self.worker_count = target
+
+        engine = self.engine
+        if isinstance(engine, OCRWorkerPool):
+            engine.resize(target)
+        return self.worker_count
+
+    def get_engine(self, status_callback=None, timeout=None):
+        """
+        Get the shared engine, waiting for a background load if one is in progress.
+        Raises RuntimeError if the engine could not be loaded.
+        """
+        if status_callback:
+            self.status_callback = status_callback
+
+        # Load now if nobody preloaded the engine
+        self.preload()
+        if not self._ready.wait(timeout):
+            raise RuntimeError("Timed out waiting for the OCR engine to load")
+
+        engine = self.engine
+        if engine is None:
+            raise RuntimeError(f"OCR engine failed to load: {self.load_error}")
+
+        # Only rebuild after a real failure
+        if not self.health_check(engine):
+            engine = self.rebuild(engine)
+        return engine
+
+    def health_check(self, engine=None):
+        """Check that the engine is loaded and its recent inferences succeeded"""
+        engine = engine or self.engine
+        return engine is not None and engine.is_healthy()
+
+    def rebuild(self, failed_engine=None, reason="OCR engine failed its health check, rebuilding..."):
+        """
+        Replace a failed engine with a freshly loaded one and return it.
+        If another caller already replaced failed_engine, the current engine is returned instead.
+        """
+        with self._lock:
+            already_replaced = failed_engine is not None and self.engine is not failed_engine
+            if not already_replaced and not self._loading:
+                self.update_status(reason)
+                self.engine = None
+                self._loading = True
+                self._ready.clear()
+                rebuild_here = True
+            else:
+                rebuild_here = False
+
+        if rebuild_here:
+            if failed_engine is not None and hasattr(failed_engine, 'close'):
+                failed_engine.close()
+            self._load()
+        else:
+            self._ready.wait()
+
+        if self.engine is None:
+            raise RuntimeError(f"OCR engine failed to load: {self.load_error}")
+        return self.engine
+
+    def shutdown(self):
+        """Release the engine (stops worker processes and any tuning in progress)"""
+        with self._lock:
+            engine = self.engine
+            self.engine = None
+            self._ready.clear()
+        if engine is not None and hasattr(engine, 'close'):
+            engine.close()
+        self.stop_tuning()
+
+# Process-wide manager shared by every automator
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_ocr_engine_manager():
+    """Get the process-wide OCR engine manager"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = OCREngineManager()
+        return _manager
@@ -0,0 +1,345 @@
+"""
+Out-of-process OCR worker pool for the Skill Reroll Automation tool.
+Runs the OCR backend in separate worker processes so long inferences never stall the Tk main loop
+or the reroll timing. Frames are handed over through multiprocessing.shared_memory buffers
+instead of being pickled; requests and results travel over a Pipe per worker.
+The pool exposes the same interface as PaddleOCRWrapper.
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from paddle_ocr_implementation import LatencyStats, SelectiveReOCR, readtext_frames, recognize_line_crops
+from image_preprocessing import preprocess_frame, restore_boxes, scale_line_boxes
+from frame_batching import MicroBatcher, stack_crops
+from frame_utils import to_bgr_array
+
+# Initial shared frame buffer per worker; grown on demand for larger detection regions
+DEFAULT_FRAME_BYTES = 1280 * 720 * 3
+
+# CPU threads each worker's OCR backend uses unless the autotuner picked another count
+THREADS_PER_WORKER = 4
+
+def max_worker_count(threads_per_worker=THREADS_PER_WORKER):
+    """Largest useful number of workers on this machine"""
+    return max(1, (os.cpu_count() or 1) // threads_per_worker)
+
+def _worker_main(conn, shm_name, warmup_runs, backend, precision, backend_options):
+    """Worker process: load the OCR backend once, then serve requests from the parent"""
+    # Import here so the parent process never builds a model for the workers
+    from paddle_ocr_implementation import PaddleOCRWrapper
+
+    messages = []
+    try:
+        reader = PaddleOCRWrapper(messages.append, backend=backend, precision=precision,
+                                  backend_options=backend_options, warmup_runs=warmup_runs)
+    except Exception as e:
+        conn.send(("error", str(e), messages))
+        return
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    # The parent keeps the warm-up latencies with its own statistics
+    conn.send(("ready", reader.latency_stats()["cold_ms"], messages))
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request[0] == "stop":
+            break
+
+        command, request_shm_name, shape, dtype, boxes = request
+        messages = []
+        reader.status_callback = messages.append
+
+        # The parent moved to a larger buffer for this frame
+        if request_shm_name != shm.name:
+            shm.close()
+            shm = shared_memory.SharedMemory(name=request_shm_name)
+
+        # View the frame in shared memory without copying it
+        frame = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        try:
+            if command == "detect":
+                result = reader.detect(frame)
+            else:
+                result = reader.recognize_boxes(frame, boxes)
+            conn.send(("ok", result, messages))
+        except Exception as e:
+            conn.send(("error", str(e), messages))
+        finally:
+            del frame
+
+    shm.close()
+
+class _Worker:
+    def __init__(self, context, warmup_runs, frame_bytes, backend, precision, backend_options):
+        """Spawn one worker process with its own shared frame buffer"""
+        self.shm = shared_memory.SharedMemory(create=True, size=frame_bytes)
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main,
+                                       args=(child_conn, self.shm.name, warmup_runs, backend, precision,
+                                             backend_options),
+                                       daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def write_frame(self, frame):
+        """Copy a frame into this worker's shared buffer, growing the buffer if needed"""
+        if frame.nbytes > self.shm.size:
+            old_shm = self.shm
+            self.shm = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+            old_shm.close()
+            old_shm.unlink()
+        target = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self.shm.buf)
+        target[...] = frame
+        del target
+
+    def close(self):
+        """Stop the process and free the shared buffer"""
+        try:
+            if self.process.is_alive():
+                self.conn.send(("stop",))
+                self.process.join(timeout=2)
+            if self.process.is_alive():
+                self.process.terminate()
+        except (OSError, EOFError):
+            pass
+        self.conn.close()
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+class OCRWorkerPool:
+    def __init__(self, num_workers=1, status_callback=None, warmup_runs=2, request_timeout=10.0,
+                 max_consecutive_errors=3, frame_bytes=DEFAULT_FRAME_BYTES, backend="paddle",
+                 precision="fp32", backend_options=None):
+        """
+        Start a pool of OCR worker processes and wait until the first one is ready
+
+        Args:
+            num_workers: Number of worker processes to start
+            status_callback: Function to call with status updates
+            warmup_runs: Synthetic-frame inferences each worker runs after loading its model
+            request_timeout: Seconds to wait for a worker reply before the worker is restarted
+            max_consecutive_errors: Failed requests in a row after which the pool reports itself unhealthy
+            frame_bytes: Initial size of each worker's shared frame buffer
+            backend: Name of the OCR backend each worker loads
+            precision: Recognition model precision of the workers ("fp32" or "int8")
+            backend_options: Extra keyword arguments for each worker's backend (cpu_threads, rec_batch_num, ...)
+        """
+        self.status_callback = status_callback
+        self.warmup_runs = warmup_runs
+        self.request_timeout = request_timeout
+        self.max_consecutive_errors = max_consecutive_errors
+        self.frame_bytes = frame_bytes
+        self.backend = backend
+        self.precision = precision
+        self.backend_options = backend_options
+        self.consecutive_errors = 0
+        self.last_results = None
+
+        # Optional OCRResultCache, TemplateLibrary and ValueReader, used in this process before asking a worker
+        self.result_cache = None
+        self.template_library = None
+        self.value_reader = None
+
+        # Low-confidence lines get a second, enlarged look instead of being dropped
+        self.reocr = SelectiveReOCR()
+
+        # Merges concurrent readtext_merged calls into readtext_batch calls while only one worker is live
+        self.batcher = MicroBatcher(self.readtext_batch)
+
+        # Warm-up latencies reported by the workers (cold) and request round trips measured here (warm)
+        self.latency = LatencyStats()
+
+        # Optional PreprocessingPipeline, run here so workers receive the smaller processed frame
+        self.preprocessor = None
+
+        # Spawn (not fork) so workers start clean on every platform
+        self.context = multiprocessing.get_context("spawn")
+        self.workers = []
+        self.idle_workers = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # The first worker is started synchronously so a broken install fails loudly here
+        worker = self._start_worker()
+        if worker is None:
+            raise RuntimeError("OCR worker process failed to start")
+        for _ in range(num_workers - 1):
+            self._start_worker_async()
+
+    @property
+    def size(self):
+        """Number of live workers"""
+        with self._lock:
+            return sum(1 for worker in self.workers if worker.is_alive())
+
+    def update_status(self, message):
+        """Update status via callback if available"""
+        if self.status_callback:
+            self.status_callback(message)
+
+    def _start_worker(self):
+        """Start one worker and wait for its model to load; returns the worker or None"""
+        worker = _Worker(self.context, self.warmup_runs, self.frame_bytes, self.backend, self.precision,
+                         self.backend_options)
+        kind, payload, messages = worker.conn.recv() if worker.conn.poll(120) else ("error", "timed out", [])
+        for message in messages:
+            self.update_status(message)
+
+        if kind != "ready":
+            self.update_status(f"OCR worker failed to start: {payload}")
+            worker.close()
+            return None
+        self.latency.add_cold(payload)
+
+        with self._lock:
+            if self._closed:
+                worker.close()
+                return None
+            self.workers.append(worker)
+        self.idle_workers.put(worker)
+        return worker
+
+    def _start_worker_async(self):
+        """Start one worker in the background; it joins the pool once its model is loaded"""
+        threading.Thread(target=self._start_worker, daemon=True).start()
+
+    def resize(self, num_workers):
+        """Grow the pool to num_workers live workers (workers are never stopped while running)"""
+        missing = num_workers - self.size
+        for _ in range(missing):
+            self._start_worker_async()
+        if missing > 0:
+            self.update_status(f"Starting {missing} more OCR worker process(es)")
+
+    def _request(self, command, image, boxes=None):
+        """Send one frame to an idle worker and wait for its result"""
+        frame = np.ascontiguousarray(image)
+        worker = self.idle_workers.get(timeout=self.request_timeout)
+        try:
+            worker.write_frame(frame)
+            worker.conn.send((command, worker.shm.name, frame.shape, frame.dtype.str, boxes))
+            if not worker.conn.poll(self.request_timeout):
+                raise TimeoutError("OCR worker did not answer")
+            kind, result, messages = worker.conn.recv()
+        except Exception:
+            # The worker is stuck or gone - replace it
+            self._replace_worker(worker)
+            raise
+
+        self.idle_workers.put(worker)
+        for message in messages:
+            self.update_status(message)
+        if kind != "ok":
+            raise RuntimeError(result)
+        return result
+
+    def _replace_worker(self, worker):
+        """Drop a broken worker and start a new one in the background"""
+        with self._lock:
+            if worker in self.workers:
+                self.workers.remove(worker)
+            closed = self._closed
+        worker.close()
+        if not closed:
+            self._start_worker_async()
+
+    def readtext(self, image):
+        """Full detection and recognition of a frame in a worker process"""
+        try:
+            detected_items = readtext_frames([image], self._detect, self._recognize_crops,
+                                             self.preprocessor, self.reocr)[0]
+            self.last_results = detected_items
+            self.consecutive_errors = 0
+            return detected_items
+        except Exception as e:
+            self.consecutive_errors += 1
+            self.update_status(f"OCR error: {str(e)}")
+            return []
+
+    def readtext_batch(self, frames):
+        """Read several frames stitched into shared canvases, in one worker request per canvas"""
+        try:
+            results = readtext_frames(frames, self._detect, self._recognize_crops, self.preprocessor, self.reocr)
+            self.consecutive_errors = 0
+            return results
+        except Exception as e:
+            self.consecutive_errors += 1
+            self.update_status(f"OCR error: {str(e)}")
+            return [[] for _ in frames]
+
+    def readtext_merged(self, image):
+        """
+        readtext that merges with calls from other threads arriving within the micro-batching window.
+        Only a single worker merges; with several, each frame goes to its own idle worker in parallel.
+        """
+        if self.size > 1:
+            return self.readtext(image)
+        return self.batcher.submit(image)
+
+    def _detect(self, image):
+        start = time.perf_counter()
+        result = self._request("detect", image)
+        self.latency.record((time.perf_counter() - start) * 1000)
+        return result
+
+    def _recognize_boxes(self, image, boxes):
+        start = time.perf_counter()
+        result = self._request("recognize_boxes", image, boxes)
+        self.latency.record((time.perf_counter() - start) * 1000)
+        return result
+
+    def _recognize_crops(self, crops):
+        # Crops travel to the worker as one shared-memory canvas
+        canvas, boxes = stack_crops(crops)
+        return self._recognize_boxes(canvas, boxes)
+
+    def recognize_lines(self, image, line_boxes, value_slots=None):
+        """Recognition-only pass over learned line strips; cache, templates and glyphs are checked in this process"""
+        try:
+            image, scale = preprocess_frame(self.preprocessor, to_bgr_array(image))
+            detected_items = recognize_line_crops(
+                image, scale_line_boxes(line_boxes, scale),
+                self._recognize_boxes,
+                self.result_cache, self.template_library, self.value_reader, value_slots)
+            detected_items = restore_boxes(detected_items, scale)
+            self.consecutive_errors = 0
+            return detected_items
+        except Exception as e:
+            self.consecutive_errors += 1
+            self.update_status(f"OCR error: {str(e)}")
+            return []
+
+    def warm_up(self, runs=1):
+        """Workers warm themselves up when they start; only report health here"""
+        return self.is_healthy()
+
+    def latency_stats(self):
+        """Cold (worker warm-up) and warm (request round trip) latency in milliseconds"""
+        return self.latency.snapshot()
+
+    def is_healthy(self):
+        """Check that at least one worker is alive and recent requests succeeded"""
+        return not self._closed and self.size > 0 and self.consecutive_errors < self.max_consecutive_errors
+
+    def close(self):
+        """Stop every worker process and free the shared buffers"""
+        with self._lock:
+            self._closed = True
+            workers = list(self.workers)
+            self.workers = []
+        for worker in workers:
+            worker.close()
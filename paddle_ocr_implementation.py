@@ -1,39 +1,227 @@
 """
 Ultra-lightweight PaddleOCR implementation for the Skill Reroll Automation tool.
+The wrapper runs on a pluggable OCR backend (PaddleOCR by default, or ONNX Runtime).
 """
 
 import numpy as np
-from PIL import Image
-import re
-from paddleocr import PaddleOCR
+from PIL import Image, ImageDraw, ImageFont
+import threading
+import time
+from collections import deque
+from ocr_backends import create_backend
+from image_preprocessing import preprocess_frame, restore_boxes, scale_line_boxes
+from stat_matcher import get_stat_matcher
+from frame_batching import MicroBatcher, split_results, stitch_frames
+from frame_utils import to_bgr_array
+
+# Lines drawn on the synthetic panel used to warm up and health-check the OCR engine
+SYNTHETIC_PANEL_LINES = [("All Skill Amp.", "+16%"), ("Defense Rate", "+400")]
+
+def create_synthetic_panel_frame(width=320, height=80, lines=SYNTHETIC_PANEL_LINES):
+    """Draw a small panel that looks like the stats region, as a BGR numpy array like captured frames"""
+    image = Image.new("RGB", (width, height), (20, 20, 28))
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+
+    line_height = height // (len(lines) + 1)
+    for index, (stat_name, value) in enumerate(lines):
+        y = line_height * index + line_height // 2
+        draw.text((10, y), stat_name, fill=(235, 235, 235), font=font)
+        draw.text((width - 60, y), value, fill=(235, 235, 235), font=font)
+
+    return np.ascontiguousarray(np.asarray(image)[:, :, ::-1])
+
+class LatencyStats:
+    def __init__(self, window=256):
+        """
+        Inference latencies, with the cold (warm-up) calls kept apart from the steady-state ones
+
+        Args:
+            window: Number of recent warm latencies kept for percentiles
+        """
+        self.cold_ms = []
+        self.warm_ms = deque(maxlen=window)
+        self.warm_count = 0
+        self.warm_total_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, ms, cold=False):
+        """Record one inference"""
+        with self._lock:
+            if cold:
+                self.cold_ms.append(ms)
+            else:
+                self.warm_ms.append(ms)
+                self.warm_count += 1
+                self.warm_total_ms += ms
+
+    def add_cold(self, cold_ms):
+        """Record warm-up latencies measured elsewhere (e.g. in a worker process)"""
+        with self._lock:
+            self.cold_ms.extend(cold_ms)
+
+    def snapshot(self):
+        """Cold and warm latency figures in milliseconds as a dict"""
+        with self._lock:
+            cold = list(self.cold_ms)
+            recent = sorted(self.warm_ms)
+            warm_count = self.warm_count
+            warm_total = self.warm_total_ms
+
+        warm_mean = warm_total / warm_count if warm_count else None
+        return {
+            "cold_ms": cold,
+            "first_ms": cold[0] if cold else None,
+            "warm_count": warm_count,
+            "warm_mean_ms": warm_mean,
+            "warm_p50_ms": recent[len(recent) // 2] if recent else None,
+            "warm_p95_ms": recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else None,
+            "cold_to_warm_ratio": cold[0] / warm_mean if cold and warm_mean else None,
+        }
+
+    def summary(self):
+        """One-line description of cold and warm latency"""
+        stats = self.snapshot()
+        cold = ", ".join(f"{ms:.0f}" for ms in stats["cold_ms"]) or "none"
+        if stats["warm_count"]:
+            warm = (f"warm {stats['warm_mean_ms']:.1f}ms mean, {stats['warm_p50_ms']:.1f}ms p50, "
+                    f"{stats['warm_p95_ms']:.1f}ms p95 over {stats['warm_count']} inferences")
+        else:
+            warm = "no warm inferences yet"
+        return f"OCR latency: cold [{cold}]ms, {warm}"
+
+class SelectiveReOCR:
+    def __init__(self, lower=0.3, upper=0.5, upscale=2.0):
+        """
+        Second recognition tier for lines whose confidence falls between two bounds
+
+        Args:
+            lower: Lines at or below this confidence are not worth a second look
+            upper: Lines at or below this confidence are re-recognized (readtext keeps lines above it)
+            upscale: Factor the line crops are enlarged by before recognizing them again
+        """
+        self.lower = lower
+        self.upper = upper
+        self.upscale = upscale
+        self._lock = threading.Lock()
+        self.reset_counters()
+
+    def reset_counters(self):
+        """Zero the reporting counters (warm-up frames are not real rolls)"""
+        with self._lock:
+            self.frames = 0
+            self.frames_with_candidates = 0
+            self.lines = 0
+            self.rescued_lines = 0
+            self.frames_with_rescues = 0
+
+    def apply(self, image, detected_items, recognize_crops):
+        """
+        Re-recognize the low-confidence lines of a detection pass, enlarged, in one recognize_crops(crops) batch.
+        Lines whose second reading clears the upper bound replace the first reading.
+        """
+        candidates = [index for index, (_, _, confidence) in enumerate(detected_items)
+                      if self.lower < confidence <= self.upper]
+        with self._lock:
+            self.frames += 1
+        if not candidates:
+            return detected_items
+
+        height, width = image.shape[:2]
+        crops = []
+        for index in candidates:
+            box = detected_items[index][0]
+            left = max(0, int(min(point[0] for point in box)))
+            top = max(0, int(min(point[1] for point in box)))
+            right = min(width, int(np.ceil(max(point[0] for point in box))))
+            bottom = min(height, int(np.ceil(max(point[1] for point in box))))
+            crop = Image.fromarray(np.ascontiguousarray(image[top:bottom, left:right]))
+            crop = crop.resize((max(1, round(crop.width * self.upscale)), max(1, round(crop.height * self.upscale))),
+                               Image.BICUBIC)
+            crops.append(np.asarray(crop))
+
+        rescued = 0
+        detected_items = list(detected_items)
+        for index, (text, confidence) in zip(candidates, recognize_crops(crops)):
+            if confidence > self.upper and confidence > detected_items[index][2]:
+                detected_items[index] = (detected_items[index][0], text, confidence)
+                rescued += 1
+
+        with self._lock:
+            self.frames_with_candidates += 1
+            self.lines += len(candidates)
+            self.rescued_lines += rescued
+            if rescued:
+                self.frames_with_rescues += 1
+        return detected_items
+
+    def summary(self):
+        """One-line description of how often re-OCR rescued a line"""
+        rate = self.frames_with_rescues / self.frames * 100 if self.frames else 0.0
+        return (f"Re-OCR: rescued lines in {self.frames_with_rescues}/{self.frames} frames ({rate:.1f}%), "
+                f"{self.rescued_lines}/{self.lines} low-confidence lines rescued")
 
 class PaddleOCRWrapper:
-    def __init__(self, status_callback=None):
+    def __init__(self, status_callback=None, max_consecutive_errors=3, backend="paddle", precision="fp32",
+                 backend_options=None, warmup_runs=2):
+        """
+        Initialize the OCR reader and warm it up
+
+        Args:
+            status_callback: Function to call with status updates
+            max_consecutive_errors: Failed inferences in a row after which the reader reports itself unhealthy
+            backend: OCR backend name ("paddle" or "onnx") or an already built OCRBackend
+            precision: Recognition model precision of a backend built by name ("fp32" or "int8")
+            backend_options: Extra keyword arguments for a backend built by name (cpu_threads, rec_batch_num, ...)
+            warmup_runs: Synthetic-frame inferences run before the constructor returns, so the first real
+                         roll does not pay for MKL-DNN primitive creation and lazy allocations
+        """
         self.status_callback = status_callback
         self.last_results = None  # Cache for last OCR results
 
-        # Initialize with minimal settings for speed and lightweight operation
+        # Health tracking - a few failed inferences in a row mark the engine as broken
+        self.max_consecutive_errors = max_consecutive_errors
+        self.consecutive_errors = 0
+
+        # Optional OCRResultCache, TemplateLibrary and ValueReader for line crops, attached by the engine manager
+        self.result_cache = None
+        self.template_library = None
+        self.value_reader = None
+
+        # Optional PreprocessingPipeline run on every frame before OCR
+        self.preprocessor = None
+
+        # Low-confidence lines get a second, enlarged look instead of being dropped
+        self.reocr = SelectiveReOCR()
+
+        # Merges concurrent readtext_merged calls into readtext_batch calls
+        self.batcher = MicroBatcher(self.readtext_batch)
+
+        # Inference latency, with warm-up calls recorded as cold
+        self.latency = LatencyStats()
+        self._warming = False
+
+        # Predictors are not thread-safe; sessions sharing this reader take turns
+        self.lock = threading.Lock()
+
         try:
-            self.ocr = PaddleOCR(
-                use_angle_cls=False,  # Disable angle classification for speed
-                lang='en',            # English language
-                use_gpu=False,        # Use CPU-only mode for smaller executable size
-                show_log=False,       # Disable logs
-                enable_mkldnn=True,   # Enable Intel MKL-DNN acceleration
-                rec_batch_num=6,      # Increase batch size for faster processing
-                rec_model_dir=None,   # Use default model to avoid loading time
-                det_model_dir=None,   # Use default model to avoid loading time
-                cpu_threads=4         # Use more CPU threads for parallel processing
-            )
+            if isinstance(backend, str):
+                self.ocr = create_backend(backend, precision=precision, **(backend_options or {}))
+            else:
+                self.ocr = backend
             if status_callback:
-                status_callback("PaddleOCR initialized successfully")
+                status_callback(f"OCR backend '{self.ocr.name}' ({self.ocr.precision.upper()}) "
+                                f"initialized successfully")
         except Exception as e:
             if status_callback:
-                status_callback(f"Error initializing PaddleOCR: {str(e)}")
+                status_callback(f"Error initializing OCR backend '{backend}': {str(e)}")
             raise  # Re-raise the exception to be handled by the caller
 
+        if warmup_runs:
+            self.warm_up(warmup_runs)
+
     def readtext(self, image):
-        """Convert image to text using PaddleOCR with caching for performance and error handling"""
+        """Convert image to text using the OCR backend with caching for performance and error handling"""
         # Check if OCR is initialized
         if not hasattr(self, 'ocr') or self.ocr is None:
             if self.status_callback:
@@ -41,204 +229,213 @@ class PaddleOCRWrapper:
             return []
 
         try:
-            # Convert PIL Image to numpy array if needed
-            if isinstance(image, Image.Image):
-                image = np.array(image)
-
-            # Run OCR
-            result = self.ocr.ocr(image, cls=False)  # Disable classifier for speed
-            detected_items = []
-
-            # Process results
-            if result and len(result) > 0:
-                for line in result[0]:
-                    if len(line) >= 2:
-                        box = line[0]
-                        text = line[1][0]
-                        confidence = line[1][1]
-                        # Only include results with reasonable confidence
-                        if confidence > 0.5:
-                            detected_items.append((box, text, confidence))
+            detected_items = readtext_frames([image], self.detect, self.recognize_crops,
+                                             self.preprocessor, self.reocr)[0]
 
             # Cache the results
             self.last_results = detected_items
+            self.consecutive_errors = 0
             return detected_items
 
         except Exception as e:
+            self.consecutive_errors += 1
             if self.status_callback:
                 self.status_callback(f"OCR error: {str(e)}")
             # Return empty list on error
             return []
 
-def normalize_text(text):
-    """Normalize text by converting to lowercase and removing spaces and dots"""
-    return text.lower().replace(" ", "").replace(".", "")
+    def readtext_batch(self, frames):
+        """Read several frames with one batched detection and recognition pass; returns per-frame results in order"""
+        if not hasattr(self, 'ocr') or self.ocr is None:
+            if self.status_callback:
+                self.status_callback("OCR not initialized")
+            return [[] for _ in frames]
+
+        try:
+            results = readtext_frames(frames, self.detect, self.recognize_crops, self.preprocessor, self.reocr)
+            self.consecutive_errors = 0
+            return results
+        except Exception as e:
+            self.consecutive_errors += 1
+            if self.status_callback:
+                self.status_callback(f"OCR error: {str(e)}")
+            return [[] for _ in frames]
+
+    def readtext_merged(self, image):
+        """readtext that merges with calls from other threads arriving within the micro-batching window"""
+        return self.batcher.submit(image)
+
+    def recognize_lines(self, image, line_boxes, value_slots=None):
+        """
+        Recognition-only pass: crop the given (left, top, right, bottom) strips and send them
+        to the recognizer as one batch, skipping the text detection network.
+        value_slots flags the strips that hold a value (see recognize_line_crops).
+        Returns a list of (box, text, confidence) tuples, one per strip, without confidence filtering.
+        """
+        # Check if OCR is initialized
+        if not hasattr(self, 'ocr') or self.ocr is None:
+            if self.status_callback:
+                self.status_callback("OCR not initialized")
+            return []
+
+        try:
+            # Captured frames are BGR arrays already; PIL images are converted
+            image, scale = preprocess_frame(self.preprocessor, to_bgr_array(image))
+
+            detected_items = recognize_line_crops(image, scale_line_boxes(line_boxes, scale), self.recognize_boxes,
+                                                  self.result_cache, self.template_library, self.value_reader,
+                                                  value_slots)
+            detected_items = restore_boxes(detected_items, scale)
+            self.consecutive_errors = 0
+            return detected_items
 
-def calculate_string_similarity(str1, str2):
+        except Exception as e:
+            self.consecutive_errors += 1
+            if self.status_callback:
+                self.status_callback(f"OCR error: {str(e)}")
+            return []
+
+    def detect(self, image):
+        """Full detection and recognition pass; returns every (box, text, confidence) without filtering"""
+        with self.lock:
+            start = time.perf_counter()
+            result = self.ocr.detect_and_recognize(image)
+            self.latency.record((time.perf_counter() - start) * 1000, self._warming)
+        return result
+
+    def recognize_boxes(self, image, boxes):
+        """Run the recognizer alone on the given strips of an image; returns (text, confidence) per strip"""
+        return self.recognize_crops([image[top:bottom, left:right] for left, top, right, bottom in boxes])
+
+    def recognize_crops(self, crops):
+        """Run the recognizer alone on image crops; returns (text, confidence) per crop"""
+        with self.lock:
+            start = time.perf_counter()
+            result = self.ocr.recognize(crops)
+            self.latency.record((time.perf_counter() - start) * 1000, self._warming)
+        return result
+
+    def warm_up(self, runs=1):
+        """Run inference on a synthetic frame so the first real roll is at steady-state speed"""
+        frame = create_synthetic_panel_frame()
+        self._warming = True
+        try:
+            for _ in range(runs):
+                self.readtext(frame)
+        finally:
+            self._warming = False
+            # Only real rolls count in the re-OCR summary
+            self.reocr.reset_counters()
+        return self.is_healthy()
+
+    def latency_stats(self):
+        """Cold (warm-up) and warm inference latency in milliseconds, see LatencyStats.snapshot"""
+        return self.latency.snapshot()
+
+    def is_healthy(self):
+        """Check that the engine is loaded and has not failed repeatedly"""
+        return getattr(self, 'ocr', None) is not None and self.consecutive_errors < self.max_consecutive_errors
+
+def readtext_frames(frames, detect, recognize_crops, preprocessor=None, reocr=None):
     """
-    Calculate similarity between two strings based on character matching and length.
-    Returns a score between 0 and 1, where 1 is a perfect match.
+    Read frames with as few detect(image) passes as possible by stitching them into shared canvases.
+    Low-confidence lines of each frame get a second look through reocr and recognize_crops(crops),
+    then only confident lines are kept.
+    Returns one list of (box, text, confidence) tuples per frame, in the coordinates of that frame.
     """
-    # If either string is empty, return 0
-    if not str1 or not str2:
-        return 0
-
-    # If strings are identical, return 1
-    if str1 == str2:
-        return 1
-
-    # Calculate character-by-character matches
-    char_matches = 0
-    for char in str1:
-        if char in str2:
-            char_matches += 1
-
-    # Calculate similarity based on:
-    # 1. Percentage of matching characters
-    # 2. Length difference penalty
-    max_length = max(len(str1), len(str2))
-
-    # Basic character similarity
-    char_similarity = char_matches / max_length
-
-    # Length difference penalty - penalize matches where lengths are very different
-    # This helps distinguish between "Defense" and "Defense Rate"
-    length_diff = abs(len(str1) - len(str2)) / max(len(str1), len(str2))
-    length_penalty = length_diff * 0.5  # Apply 50% weight to length difference
-
-    # Final similarity score
-    similarity = char_similarity - length_penalty
-
-    # Ensure the result is between 0 and 1
-    return max(0, min(similarity, 1))
-
-def get_y_center(box):
-    """Calculate the y-center of a bounding box"""
-    # Box format is [[x1,y1],[x2,y1],[x2,y2],[x1,y2]]
-    if not box or len(box) != 4:
-        return 0
-    return (box[0][1] + box[2][1]) / 2
-
-def parse_detected_text(detected_items, status_callback=None, detailed_logging=False, unmapped_ocr_counter=None):
+    images = []
+    scales = []
+    for image in frames:
+        # Captured frames are BGR arrays already and are not copied; PIL images are converted
+        image, scale = preprocess_frame(preprocessor, to_bgr_array(image))
+        images.append(image)
+        scales.append(scale)
+
+    # A single frame is read as-is; several share canvases
+    if len(images) == 1:
+        canvases = [(images[0], [(0, 0, images[0].shape[0])])]
+    else:
+        canvases = stitch_frames(images)
+
+    per_frame = [[] for _ in images]
+    for canvas, placements in canvases:
+        for index, items in enumerate(split_results(detect(canvas), placements, len(images))):
+            per_frame[index].extend(items)
+
+    min_confidence = reocr.upper if reocr is not None else 0.5
+    results = []
+    for image, scale, result in zip(images, scales, per_frame):
+        # Re-recognize the lines that just missed the confidence bar
+        if reocr is not None:
+            result = reocr.apply(image, result, recognize_crops)
+
+        # Only include results with reasonable confidence
+        detected_items = [(box, text, confidence) for box, text, confidence in result if confidence > min_confidence]
+
+        # Boxes are reported in the coordinates of the captured frame
+        results.append(restore_boxes(detected_items, scale))
+    return results
+
+def recognize_line_crops(image, line_boxes, recognize_boxes, result_cache=None, template_library=None,
+                         value_reader=None, value_slots=None):
     """
-    Enhanced parser to find stats and values using y-coordinates for matching.
-    Includes optional detailed logging of OCR detection and mapping process.
-    detected_items: List of tuples (box, text, confidence) from OCR
-    status_callback: Function to call with status updates
-    detailed_logging: Whether to log detailed information
-    unmapped_ocr_counter: Dictionary to track unmapped OCR results
+    Recognize the (left, top, right, bottom) strips of an image, cheapest source first:
+    the pixel-hash result cache, then the template library, then the glyph-level value reader
+    (only on the strips value_slots flags as values; every strip if it is None),
+    then recognize_boxes(image, boxes) for whatever is left, in one batch.
+    Returns a list of (box, text, confidence) tuples, one per strip.
     """
-    found_stats = {}
-
-    # Get stat names from stats_data module
-    from stats_data import get_all_skills, get_base_stat_name
-
-    # Get the base stat names for OCR detection
-    stat_names = get_all_skills()
-
-    # Create normalized versions of stat names for matching
-    normalized_stats = {normalize_text(stat): stat for stat in stat_names}
-
-    # Only log detailed information if detailed_logging is enabled
-    if detailed_logging and status_callback:
-        status_callback(f"OCR detected {len(detected_items)} text elements")
-
-    # Identify stats and values with their y-coordinates
-    stats_with_y = []  # (y_center, text, stat_name, similarity)
-    values_with_y = []  # (y_center, text, value)
-
-    # Track raw OCR text for unmapped results
-    raw_ocr_texts = []
-
-    for box, text, _ in detected_items:
-        # Add to raw OCR texts for tracking unmapped results
-        raw_ocr_texts.append(text)
-
-        # Get the y-center of this text
-        y_center = get_y_center(box)
-
-        # Special case for "Arrival skill Cool time decreased" which often gets detected with its value
-        # Check for various possible OCR variations of this text
-        if "arrival" in text.lower() and "cool" in text.lower() and "time" in text.lower():
-            # Extract the stat name part
-            stat_name = "Arrival Skill Cool Time decreased."
-
-            # Try to extract the value part
-            value_match = re.search(r'(\d+)[s]?', text)
-            if value_match:
-                value = int(value_match.group(1))
-
-                # Add both the stat and its value
-                stats_with_y.append((y_center, text, stat_name, 1.0))  # Perfect match
-                values_with_y.append((y_center, text, value))
-
-                if detailed_logging and status_callback:
-                    status_callback(f"Special case: Split '{text}' into stat '{stat_name}' and value {value}")
-                continue
-
-        # Check if this text contains a value - improved pattern to catch more variations
-        # Including % for percentage values and s for seconds (used in Arrival Skill Cool Time)
-        value_match = re.search(r'[+]?(\d+)(?:[%s])?', text)
-        if value_match:
-            value = int(value_match.group(1))
-            values_with_y.append((y_center, text, value))
-            if detailed_logging and status_callback:
-                status_callback(f"Found value: {value} in '{text}'")
-            continue
-
-        # Normalize the detected text
-        norm_text = normalize_text(text)
-
-        # Find the best matching stat based on string similarity
-        best_match = None
-        best_similarity = 0.0
-
-        # Skip detailed matching logs for performance
-        for norm_stat, original_stat in normalized_stats.items():
-            # Calculate similarity between normalized detected text and normalized stat
-            similarity = calculate_string_similarity(norm_text, norm_stat)
-
-            # If this is the best match so far, remember it
-            if similarity > best_similarity:
-                best_similarity = similarity
-                best_match = original_stat
-
-        # Only consider it a match if similarity is above a threshold (0.6)
-        # This threshold is adjusted for our simplified similarity function
-        if best_match and best_similarity >= 0.6:
-            stats_with_y.append((y_center, text, best_match, best_similarity))
-            if detailed_logging and status_callback:
-                status_callback(f"Matched '{text}' to '{best_match}' (similarity: {best_similarity:.2f})")
-        else:
-            # Track unmapped OCR text
-            if unmapped_ocr_counter is not None:
-                unmapped_ocr_counter[text] = unmapped_ocr_counter.get(text, 0) + 1
-
-            if detailed_logging and status_callback:
-                status_callback(f"No match found for '{text}'")
-
-    # For each stat, find the value with the closest y-coordinate
-
-    for stat_y, _, stat_name, _ in stats_with_y:
-        closest_value = None
-        min_distance = float('inf')
-
-        for value_y, _, value in values_with_y:
-            # Calculate vertical distance between stat and value
-            distance = abs(stat_y - value_y)
-
-            # If this is the closest value so far, remember it
-            if distance < min_distance:
-                min_distance = distance
-                closest_value = value
-
-        # If we found a value within a reasonable distance (e.g., 50 pixels)
-        if closest_value is not None and min_distance < 50:
-            found_stats[stat_name] = closest_value
-            if detailed_logging and status_callback:
-                status_callback(f"Paired '{stat_name}' with {closest_value}")
-        else:
-            if detailed_logging and status_callback:
-                status_callback(f"Could not find a value for '{stat_name}'")
-
-    return found_stats
+    crops = [image[top:bottom, left:right] for left, top, right, bottom in line_boxes]
+
+    # Serve repeated renders from the cache; only the misses go further
+    rec_results = [None] * len(crops)
+    keys = [None] * len(crops)
+    misses = []
+    for index, crop in enumerate(crops):
+        if result_cache is not None:
+            keys[index] = result_cache.key_for(crop)
+            rec_results[index] = result_cache.get(keys[index])
+        if rec_results[index] is None:
+            misses.append(index)
+
+    # Next, try the template library on the cache misses
+    if misses and template_library is not None and len(template_library):
+        matched = template_library.match([crops[index] for index in misses])
+        for index, match in zip(misses, matched):
+            rec_results[index] = match
+        misses = [index for index in misses if rec_results[index] is None]
+
+    # Values never seen as a whole line can still be read glyph by glyph
+    value_misses = [index for index in misses if value_slots is None or value_slots[index]]
+    if value_misses and value_reader is not None and len(value_reader):
+        read = value_reader.read([crops[index] for index in value_misses])
+        for index, result in zip(value_misses, read):
+            rec_results[index] = result
+        misses = [index for index in misses if rec_results[index] is None]
+
+    # Run the recognizer alone on all remaining strips at once
+    if misses:
+        miss_results = recognize_boxes(image, [line_boxes[index] for index in misses])
+        for index, (text, confidence) in zip(misses, miss_results):
+            rec_results[index] = (text, confidence)
+            if result_cache is not None:
+                result_cache.put(keys[index], text, confidence)
+            if template_library is not None:
+                template_library.learn(crops[index], text, confidence)
+            if value_reader is not None:
+                value_reader.learn(crops[index], text, confidence)
+
+    detected_items = []
+    for (left, top, right, bottom), (text, confidence) in zip(line_boxes, rec_results):
+        box = [[left, top], [right, top], [right, bottom], [left, bottom]]
+        detected_items.append((box, text, confidence))
+    return detected_items
+
+def parse_detected_text(detected_items, status_callback=None, detailed_logging=False, unmapped_ocr_counter=None,
+                        target_stats=None, matcher=None):
+    """
+    Find stats and values in OCR results using y-coordinates for matching (see StatMatcher.parse).
+    matcher: StatMatcher to use; defaults to the process-wide one so the catalog is only prepared once
+    """
+    matcher = matcher or get_stat_matcher()
+    return matcher.parse(detected_items, status_callback, detailed_logging, unmapped_ocr_counter, target_stats)
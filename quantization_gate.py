@@ -0,0 +1,124 @@
+"""
+INT8 accuracy gate for the Skill Reroll Automation tool.
+Runs the FP32 and the INT8-quantized recognition model over a saved corpus of panel frames,
+reports the latency ratio and every stat or value the two disagree on, and records the outcome.
+The quantized model only becomes the default once the gate passes with zero disagreements.
+
+Run as a script:
+    python quantization_gate.py <frame_dir> [backend]
+"""
+
+import json
+import os
+import sys
+import time
+from paddle_ocr_implementation import PaddleOCRWrapper, parse_detected_text
+from ocr_backends import int8_rec_model_path
+
+def model_fingerprint(path):
+    """Size and modification time of a model file or directory, so a replaced model needs a new gate run"""
+    if not os.path.exists(path):
+        return None
+    paths = [path]
+    if os.path.isdir(path):
+        paths = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+    return ";".join(f"{os.path.basename(p)}:{os.path.getsize(p)}:{int(os.path.getmtime(p))}" for p in paths)
+
+def compare_stats(fp32_stats, int8_stats):
+    """List of (stat, fp32 value, int8 value) for every stat the two readings disagree on"""
+    return [(stat, fp32_stats.get(stat), int8_stats.get(stat))
+            for stat in sorted(set(fp32_stats) | set(int8_stats))
+            if fp32_stats.get(stat) != int8_stats.get(stat)]
+
+def time_reader(reader, image):
+    """OCR a frame and return (parsed stats, milliseconds)"""
+    start = time.perf_counter()
+    detected_items = reader.readtext(image)
+    elapsed = (time.perf_counter() - start) * 1000
+    return parse_detected_text(detected_items), elapsed
+
+def run_gate(frames, backend="paddle", status_callback=None, warmup_runs=2):
+    """
+    Run both precisions over frames (a list of (name, BGR array, ...) tuples, e.g. from load_frame_set).
+    Returns a dict with the frame count, mean latencies, the INT8/FP32 latency ratio,
+    the disagreements as (frame name, stat, fp32 value, int8 value) and whether the gate passed.
+    """
+    fp32_reader = PaddleOCRWrapper(status_callback, backend=backend, precision="fp32", warmup_runs=warmup_runs)
+    int8_reader = PaddleOCRWrapper(status_callback, backend=backend, precision="int8", warmup_runs=warmup_runs)
+
+    fp32_ms = []
+    int8_ms = []
+    disagreements = []
+    for frame in frames:
+        name, image = frame[0], frame[1]
+        fp32_stats, fp32_elapsed = time_reader(fp32_reader, image)
+        int8_stats, int8_elapsed = time_reader(int8_reader, image)
+        fp32_ms.append(fp32_elapsed)
+        int8_ms.append(int8_elapsed)
+
+        for stat, fp32_value, int8_value in compare_stats(fp32_stats, int8_stats):
+            disagreements.append((name, stat, fp32_value, int8_value))
+            if status_callback:
+                status_callback(f"{name}: '{stat}' FP32 read {fp32_value}, INT8 read {int8_value}")
+
+    fp32_mean = sum(fp32_ms) / len(fp32_ms) if fp32_ms else 0.0
+    int8_mean = sum(int8_ms) / len(int8_ms) if int8_ms else 0.0
+    return {
+        "backend": backend,
+        "model": model_fingerprint(int8_rec_model_path(backend)),
+        "frames": len(frames),
+        "fp32_ms": fp32_mean,
+        "int8_ms": int8_mean,
+        "latency_ratio": int8_mean / fp32_mean if fp32_mean else 0.0,
+        "disagreements": disagreements,
+        "passed": bool(frames) and not disagreements,
+    }
+
+def save_gate_result(path, result):
+    """Record a gate result for its backend"""
+    results = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                results = json.load(f)
+        except (OSError, ValueError):
+            results = {}
+    results[result["backend"]] = result
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+def gate_passed(path, backend):
+    """Check that the recorded gate for this backend passed on the INT8 model that is installed now"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            result = json.load(f).get(backend)
+    except (OSError, ValueError):
+        return False
+    if not result or not result.get("passed") or result.get("disagreements"):
+        return False
+    return result.get("model") is not None and result.get("model") == model_fingerprint(int8_rec_model_path(backend))
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"Usage: python {os.path.basename(__file__)} <frame_dir> [backend]")
+        sys.exit(1)
+
+    from image_preprocessing import load_frame_set
+    from ocr_engine_manager import INT8_GATE_PATH
+
+    frame_set = load_frame_set(sys.argv[1])
+    backend_name = sys.argv[2] if len(sys.argv) > 2 else "paddle"
+    print(f"Running the INT8 gate for '{backend_name}' on {len(frame_set)} frames")
+
+    gate = run_gate(frame_set, backend_name, print)
+    save_gate_result(INT8_GATE_PATH, gate)
+
+    print(f"FP32 {gate['fp32_ms']:.1f}ms, INT8 {gate['int8_ms']:.1f}ms per frame "
+          f"(latency ratio {gate['latency_ratio']:.2f})")
+    print(f"{len(gate['disagreements'])} stat/value disagreements")
+    if gate["passed"]:
+        print("Gate passed: INT8 recognition becomes the default")
+    else:
+        print("Gate failed: FP32 recognition stays the default")
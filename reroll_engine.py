@@ -0,0 +1,405 @@
+"""
+Reroll engine for the Skill Reroll Automation tool.
+Runs the Apply/Change reroll cycle as an explicit state machine with per-state
+timeouts, retry budgets and timing counters. Every state is a coroutine, so one event loop
+can interleave many engines and cancel any wait.
+"""
+
+import asyncio
+import time
+from frame_utils import frame_hash
+
+# Engine states
+APPLY = "APPLY"
+WAIT_RENDER = "WAIT_RENDER"
+CAPTURE = "CAPTURE"
+RECOGNIZE = "RECOGNIZE"
+DECIDE = "DECIDE"
+CHANGE = "CHANGE"
+WAIT_CLEAR = "WAIT_CLEAR"
+
+# Terminal states
+SUCCESS = "SUCCESS"
+STOPPED = "STOPPED"
+FAILED = "FAILED"
+
+# Order used when reporting state timings
+STATE_ORDER = [APPLY, WAIT_RENDER, CAPTURE, RECOGNIZE, DECIDE, CHANGE, WAIT_CLEAR]
+
+# Render waits end at their own ceiling; every other state is cut off at its time budget
+WAIT_STATES = (WAIT_RENDER, WAIT_CLEAR)
+
+# State to recover to once a state has used up its retries on timeouts. A slow RECOGNIZE keeps
+# waiting for the same OCR call: an option that was never read must not be changed.
+TIMEOUT_FALLBACKS = {APPLY: APPLY, CAPTURE: APPLY, RECOGNIZE: RECOGNIZE, DECIDE: CHANGE, CHANGE: CHANGE}
+
+# RECOGNIZE's budget in multiples of the OCR engine's warm p95 latency (its policy timeout is the floor);
+# one roll can take several inferences (detection, recognition, re-OCR)
+RECOGNIZE_LATENCY_FACTOR = 4
+
+def discard_result(task):
+    """Done callback retrieving the outcome of a task nobody awaits, so its errors are not reported as lost"""
+    if not task.cancelled():
+        task.exception()
+
+class StatePolicy:
+    def __init__(self, timeout, max_retries=0, retry_delay=0.0):
+        """
+        Timeout and retry policy of one engine state
+
+        Args:
+            timeout: Time budget in seconds; waits use it as their ceiling, other states are cancelled
+                     and retried when they exceed it (RECOGNIZE: the lowest budget, see state_timeout)
+            max_retries: Number of times the state may be retried before the engine recovers
+            retry_delay: Seconds to wait before a retry
+        """
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+class StateStats:
+    def __init__(self):
+        """Timing and outcome counters of one engine state"""
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.timeouts = 0
+        self.retries = 0
+        self.failures = 0
+
+    def record(self, elapsed, timed_out=False):
+        """Record one visit of the state"""
+        self.count += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        if timed_out:
+            self.timeouts += 1
+
+    def average_ms(self):
+        """Average time per visit in milliseconds"""
+        return (self.total_time / self.count) * 1000 if self.count else 0.0
+
+def default_state_policies(apply_settle_timeout=0.5, change_settle_timeout=0.4):
+    """Build the default policy table; render waits use the configured settle ceilings"""
+    return {
+        APPLY: StatePolicy(timeout=0.5, max_retries=2, retry_delay=0.1),
+        WAIT_RENDER: StatePolicy(timeout=apply_settle_timeout, max_retries=2),
+        CAPTURE: StatePolicy(timeout=0.5, max_retries=3, retry_delay=0.1),
+        RECOGNIZE: StatePolicy(timeout=1.5, max_retries=1),
+        DECIDE: StatePolicy(timeout=0.05),
+        CHANGE: StatePolicy(timeout=0.5, max_retries=2, retry_delay=0.1),
+        WAIT_CLEAR: StatePolicy(timeout=change_settle_timeout, max_retries=1),
+    }
+
+class RerollEngine:
+    def __init__(self, session, policies=None, max_consecutive_failures=20, max_duplicate_reclicks=2):
+        """
+        Initialize the reroll engine
+
+        Args:
+            session: RerollSession providing clicks, captures, the settle detector and OCR
+            policies: Optional dictionary mapping states to StatePolicy objects
+            max_consecutive_failures: Number of recoveries in a row after which the engine gives up
+            max_duplicate_reclicks: Number of duplicate frames in a row that are re-clicked before
+                                    the frame is recognized anyway (the same option can roll twice)
+        """
+        self.session = session
+        self.policies = policies or default_state_policies(
+            session.apply_settle_timeout, session.change_settle_timeout)
+        self.max_consecutive_failures = max_consecutive_failures
+        self.max_duplicate_reclicks = max_duplicate_reclicks
+
+        self.handlers = {
+            APPLY: self.handle_apply,
+            WAIT_RENDER: self.handle_wait_render,
+            CAPTURE: self.handle_capture,
+            RECOGNIZE: self.handle_recognize,
+            DECIDE: self.handle_decide,
+            CHANGE: self.handle_change,
+            WAIT_CLEAR: self.handle_wait_clear,
+        }
+
+        # Per-state counters and retry bookkeeping
+        self.stats = {state: StateStats() for state in STATE_ORDER}
+        self.attempts = {state: 0 for state in STATE_ORDER}
+        self.consecutive_failures = 0
+        self.timed_out = False
+
+        # OCR call of the current frame; it outlives a RECOGNIZE timeout and the retry waits on it again
+        self.pending_ocr = None
+
+        # Data passed between states within one roll
+        self.roll_count = 0
+        self.roll_open = False
+        self.roll_started = None
+        self.roll_time_total = 0.0
+        self.frame = None
+        self.results = None
+        self.current_stats = {}
+        self.desired_stats = None
+        self.target_stats = set()
+        self.initial_clear = False
+
+        # Frame-hash short-circuit: hash of the last recognized frame, whether the render wait of this
+        # roll saw the panel change, and skip counters
+        self.last_roll_hash = None
+        self.render_changed = False
+        self.duplicate_streak = 0
+        self.duplicate_frames = 0
+
+    def update_status(self, message):
+        """Update status via the session"""
+        self.session.update_status(message)
+
+    async def run(self, desired_stats):
+        """
+        Run the reroll cycle until the desired stats are found, automation is stopped or recovery fails.
+        Returns the terminal state (SUCCESS, STOPPED or FAILED).
+        """
+        self.desired_stats = desired_stats
+        self.target_stats = self.session.get_target_stat_names(desired_stats)
+
+        # Capture the panel before the first click so the settle detector can see it change
+        detector = self.session.settle_detector
+        detector.reset()
+        await detector.capture_baseline()
+
+        # First click the Change button to remove the current option
+        self.initial_clear = True
+        state = CHANGE
+
+        try:
+            while state not in (SUCCESS, FAILED):
+                if not self.session.running:
+                    return STOPPED
+
+                self.timed_out = False
+                started = time.perf_counter()
+                if state in WAIT_STATES:
+                    next_state = await self.handlers[state]()
+                else:
+                    # A hung click, capture or OCR call must not stall the engine
+                    try:
+                        next_state = await asyncio.wait_for(self.handlers[state](), self.state_timeout(state))
+                    except asyncio.TimeoutError:
+                        self.timed_out = True
+                        next_state = await self.handle_timeout(state)
+                elapsed = time.perf_counter() - started
+
+                self.stats[state].record(elapsed, self.timed_out)
+                state = next_state
+
+            return state
+        finally:
+            # An OCR call left running when the engine ends is not awaited by anyone
+            if self.pending_ocr is not None:
+                self.pending_ocr.add_done_callback(discard_result)
+
+    def ocr_pending(self):
+        """Check if an OCR call of this engine is still running"""
+        return self.pending_ocr is not None and not self.pending_ocr.done()
+
+    def state_timeout(self, state):
+        """Time budget of a state; RECOGNIZE's grows with the measured warm latency of the OCR engine"""
+        timeout = self.policies[state].timeout
+        reader = self.session.reader
+        if state == RECOGNIZE and reader is not None:
+            p95_ms = reader.latency_stats()["warm_p95_ms"]
+            if p95_ms:
+                timeout = max(timeout, RECOGNIZE_LATENCY_FACTOR * p95_ms / 1000)
+        return timeout
+
+    async def retry(self, state, fallback):
+        """
+        Retry a state within its budget, otherwise count a failure and recover to the fallback state.
+        Returns the next state.
+        """
+        policy = self.policies[state]
+        self.attempts[state] += 1
+
+        if self.attempts[state] <= policy.max_retries:
+            self.stats[state].retries += 1
+            if policy.retry_delay:
+                await asyncio.sleep(policy.retry_delay)
+            return state
+
+        # Retry budget exhausted - recover instead of stalling
+        self.stats[state].failures += 1
+        self.attempts[state] = 0
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.max_consecutive_failures:
+            self.update_status(f"❌ {state} kept failing, giving up after {self.consecutive_failures} recoveries")
+            return FAILED
+        return fallback
+
+    async def handle_timeout(self, state):
+        """
+        Retry a state that exceeded its time budget, or recover once its retries are used up.
+        A timed-out RECOGNIZE goes on waiting for the OCR call of its frame until it answers or the
+        engine gives up, so the roll is never changed unread.
+        """
+        return await self.retry(state, TIMEOUT_FALLBACKS[state])
+
+    def succeed(self, state, next_state):
+        """Reset the retry budget of a state and move on"""
+        self.attempts[state] = 0
+        return next_state
+
+    async def handle_apply(self):
+        """Click the Apply button to apply a new option"""
+        if not self.roll_open:
+            self.roll_open = True
+            self.roll_count += 1
+            self.roll_started = time.perf_counter()
+
+        if not await self.session.click(self.session.apply_button_coords):
+            return await self.retry(APPLY, APPLY)
+        return self.succeed(APPLY, WAIT_RENDER)
+
+    async def handle_wait_render(self):
+        """Wait until the new option has been drawn; the last polled frame becomes the roll's frame"""
+        detector = self.session.settle_detector
+        settled, frame, _ = await detector.wait_for_settle(self.policies[WAIT_RENDER].timeout,
+                                                           lambda: self.session.running)
+        self.frame = frame
+        self.timed_out = not settled
+        self.render_changed = detector.last_wait_changed
+
+        # The panel never changed - the Apply click was most likely missed, so click again
+        if not settled and not detector.last_wait_changed:
+            next_state = await self.retry(WAIT_RENDER, CAPTURE)
+            return APPLY if next_state == WAIT_RENDER else next_state
+        return self.succeed(WAIT_RENDER, CAPTURE)
+
+    async def handle_capture(self):
+        """Make sure we have a frame of the detection region"""
+        if self.frame is None:
+            self.frame = await self.session.capture_frame()
+
+        if self.frame is None:
+            next_state = await self.retry(CAPTURE, APPLY)
+            if next_state == APPLY:
+                self.update_status("Failed to capture screen, retrying...")
+            return next_state
+        return self.succeed(CAPTURE, RECOGNIZE)
+
+    async def handle_recognize(self):
+        """Run OCR on the frame and hand the results to the statistics lane"""
+        if self.pending_ocr is None:
+            if self.session.reader is None:
+                self.update_status("OCR reader not initialized")
+                self.results = []
+                return DECIDE
+            if self.is_stale_frame():
+                self.frame = None
+                return CHANGE
+
+            # OCR runs as its own task, so a timeout only stops waiting for it and the retry waits
+            # on the same call instead of queueing another one behind it on the OCR thread
+            self.pending_ocr = asyncio.ensure_future(self.session.recognize(self.frame))
+
+        task = self.pending_ocr
+        try:
+            self.results = await asyncio.shield(task)
+        finally:
+            if task.done():
+                self.pending_ocr = None
+
+        # Nothing recognized - the panel may still have been redrawing, so recapture once
+        if not self.results:
+            next_state = await self.retry(RECOGNIZE, DECIDE)
+            if next_state == RECOGNIZE:
+                self.frame = None
+                return CAPTURE
+            if next_state == FAILED:
+                return FAILED
+
+        # Statistics lane: full parsing, counters and logging happen in the background
+        self.last_roll_hash = frame_hash(self.frame)
+        self.session.stats_recorder.submit(self.roll_count, self.results)
+        return self.succeed(RECOGNIZE, DECIDE)
+
+    def is_stale_frame(self):
+        """
+        Check if the frame should be re-clicked instead of recognized.
+        The same pixels as the last recognized roll while the render wait saw nothing move mean the
+        previous option is still shown (a missed click or a lagging client) - re-click instead of
+        paying for OCR on a stale frame. If the panel did redraw, the roll simply repeated its result.
+        """
+        current_hash = frame_hash(self.frame)
+        if current_hash is not None and current_hash == self.last_roll_hash and not self.render_changed:
+            if self.duplicate_streak < self.max_duplicate_reclicks:
+                self.duplicate_streak += 1
+                self.duplicate_frames += 1
+                return True
+        self.duplicate_streak = 0
+        return False
+
+    async def handle_decide(self):
+        """Resolve the targeted stats and check them against the desired stats"""
+        self.current_stats = self.session.resolve_target_stats(self.results, self.target_stats)
+        self.frame = None
+        self.results = None
+
+        # A roll completed, so any earlier failures have been recovered from
+        self.consecutive_failures = 0
+
+        if self.session.check_desired_stats(self.current_stats, self.desired_stats):
+            self.finish_roll()
+            return SUCCESS
+        return CHANGE
+
+    async def handle_change(self):
+        """Click the Change button to reroll"""
+        if not await self.session.click(self.session.change_button_coords):
+            return await self.retry(CHANGE, CHANGE)
+        return self.succeed(CHANGE, WAIT_CLEAR)
+
+    async def handle_wait_clear(self):
+        """Wait until the Change click has been processed"""
+        detector = self.session.settle_detector
+        settled, _, _ = await detector.wait_for_settle(self.policies[WAIT_CLEAR].timeout,
+                                                       lambda: self.session.running)
+        self.timed_out = not settled
+
+        # The first Change may legitimately do nothing if no option was applied yet
+        if self.initial_clear:
+            self.initial_clear = False
+            return APPLY
+
+        self.finish_roll()
+
+        # The panel never changed - the Change click was most likely missed, so click again
+        if not settled and not detector.last_wait_changed:
+            next_state = await self.retry(WAIT_CLEAR, APPLY)
+            return CHANGE if next_state == WAIT_CLEAR else next_state
+        return self.succeed(WAIT_CLEAR, APPLY)
+
+    def finish_roll(self):
+        """Add the time of the current roll to the roll total"""
+        if self.roll_started is not None:
+            self.roll_time_total += time.perf_counter() - self.roll_started
+            self.roll_started = None
+        self.roll_open = False
+
+    def report_timings(self):
+        """Log where the time of each roll went, per state"""
+        if not self.roll_count:
+            return
+
+        self.update_status("")
+        self.update_status("STATE TIMINGS")
+        self.update_status(f"Rolls: {self.roll_count} | avg {self.roll_time_total / self.roll_count * 1000:.0f} ms per roll")
+        for state in STATE_ORDER:
+            stats = self.stats[state]
+            if not stats.count:
+                continue
+            self.update_status(
+                f"  • {state}: avg {stats.average_ms():.0f} ms, max {stats.max_time * 1000:.0f} ms, "
+                f"timeouts {stats.timeouts}, retries {stats.retries}, failures {stats.failures}"
+            )
+        if self.duplicate_frames:
+            self.update_status(
+                f"Duplicate frames re-clicked without OCR: {self.duplicate_frames} "
+                f"({self.duplicate_frames / self.roll_count * 100:.1f}% of rolls)"
+            )
@@ -0,0 +1,196 @@
+"""
+Reroll session module for the Skill Reroll Automation tool.
+A session drives one game client: its own connector, button coordinates, detection region,
+targets, settle detector, statistics and reroll engine. All sessions share the automator's OCR reader
+and run as tasks on the automator's event loop.
+"""
+
+import asyncio
+from frame_utils import RenderSettleDetector, frame_size
+from screen_capture import ScreenCapture
+from line_layout import LineLayout
+from stats_recorder import RollStatsRecorder
+from reroll_engine import RerollEngine, STOPPED, FAILED
+
+class RerollSession:
+    def __init__(self, automator, game_connector, apply_coords, change_coords,
+                 detection_region=None, desired_stats=None, name=None):
+        """
+        Initialize a reroll session
+
+        Args:
+            automator: SkillRerollAutomator owning the event loop, the shared OCR reader and settings
+            game_connector: GameConnector attached to this session's game client
+            apply_coords: Apply button coordinates relative to the window
+            change_coords: Change button coordinates relative to the window
+            detection_region: Screen region (left, top, right, bottom) with the stats, or None for the whole window
+            desired_stats: Desired stats dictionary with 'offensive' and 'defensive' lists
+            name: Optional name used to prefix status messages
+        """
+        self.automator = automator
+        self.game_connector = game_connector
+        self.apply_button_coords = apply_coords
+        self.change_button_coords = change_coords
+        self.detection_region = detection_region
+        self.desired_stats = desired_stats
+        self.name = name
+        self.running = False
+        self.future = None
+        self._cached_region = None
+        self.screen_capture = ScreenCapture()
+
+        # Per-session statistics
+        self.stat_counter = {}
+        self.unmapped_ocr_counter = {}
+        self.stats_recorder = None
+
+        # Per-session render detection and state machine
+        self.settle_detector = RenderSettleDetector(self.capture_frame)
+        self.engine = None
+
+        # Learned text line layout of this client's panel, for recognition-only OCR
+        self.line_layout = LineLayout()
+
+    @property
+    def reader(self):
+        """The OCR reader shared by all sessions"""
+        return self.automator.reader
+
+    @property
+    def apply_settle_timeout(self):
+        """Render settle ceiling after Apply clicks, configured on the automator"""
+        return self.automator.apply_settle_timeout
+
+    @property
+    def change_settle_timeout(self):
+        """Render settle ceiling after Change clicks, configured on the automator"""
+        return self.automator.change_settle_timeout
+
+    def update_status(self, message):
+        """Update status via the automator, prefixed with the session name if set"""
+        if self.name and message:
+            message = f"[{self.name}] {message}"
+        self.automator.update_status(message)
+
+    def start(self, core, detailed_logging=False):
+        """Start the statistics lane and schedule the reroll task of this session on the event loop"""
+        self._cached_region = None
+
+        # Start the statistics lane that does bookkeeping off the decision path
+        self.stats_recorder = RollStatsRecorder(self.stat_counter, self.unmapped_ocr_counter, self.update_status,
+                                               self.automator.stat_matcher)
+        self.stats_recorder.start(detailed_logging)
+
+        self.running = True
+        self.future = core.submit(self.run())
+
+    def stop(self):
+        """Cancel the reroll task and let the statistics lane finish the queued rolls"""
+        self.running = False
+
+        # Cancelling interrupts whatever the task is awaiting (a render wait, a click, OCR)
+        if self.future is not None and not self.future.done():
+            self.future.cancel()
+
+        if self.stats_recorder is not None:
+            self.stats_recorder.stop()
+
+    async def run(self):
+        """Reroll task: run the state machine and report the result to the automator"""
+        self.update_status("▶️ Starting automation...")
+
+        self.engine = RerollEngine(self)
+        try:
+            result = await self.engine.run(self.desired_stats)
+        except asyncio.CancelledError:
+            result = STOPPED
+        except Exception as e:
+            self.update_status(f"Automation error: {str(e)}")
+            result = FAILED
+
+        # An OCR call still running reads a capture buffer; it must not be overwritten under it
+        if self.engine.ocr_pending():
+            self.screen_capture.detach_frames()
+        self.automator.on_session_finished(self, result)
+
+    async def click(self, coords):
+        """Click at window coordinates without blocking the event loop"""
+        return await self.automator.core.run_blocking(self.game_connector.click_at_position, coords)
+
+    async def capture_frame(self):
+        """Capture the detection region without blocking the event loop"""
+        return await self.automator.core.run_blocking(self.capture_screen_region)
+
+    async def recognize(self, frame):
+        """Run OCR on a frame through the shared OCR executor, rebuilding the engine if it keeps failing"""
+        reader = self.reader
+        core = self.automator.core
+        layout = self.line_layout
+
+        # Once the panel layout is known, only run the recognizer on the learned line strips
+        size = frame_size(frame)
+        if layout.is_calibrated(size):
+            results = await core.run_ocr(reader.recognize_lines, frame, layout.line_boxes, layout.value_slots)
+            if layout.accept(results):
+                return results
+
+            # Confidence dropped (the panel moved or the window was resized) - detect and learn again
+            layout.invalidate()
+
+        # With several clients, full passes arriving together are merged into one batched inference
+        # (a pool with several workers reads them in parallel instead)
+        readtext = reader.readtext_merged if len(self.automator.sessions) > 1 else reader.readtext
+        results = await core.run_ocr(readtext, frame)
+        layout.observe(results, size)
+
+        if not reader.is_healthy():
+            await self.automator.recover_ocr(reader)
+        return results
+
+    def report_ocr_stats(self):
+        """Log how often the learned line layout let OCR skip text detection"""
+        layout = self.line_layout
+        total = layout.recognition_only_frames + layout.detection_frames
+        if not total:
+            return
+        self.update_status(
+            f"Recognition-only frames: {layout.recognition_only_frames}/{total} "
+            f"({layout.recognition_only_frames / total * 100:.1f}%), "
+            f"layout learned {layout.calibrations}x, re-detected {layout.invalidations}x"
+        )
+
+    def capture_screen_region(self):
+        """Capture a screenshot of the detection region or the game window with optimized performance"""
+        if not self.game_connector.is_connected():
+            return None
+
+        # Cache the region to avoid recalculating it on every capture
+        if self._cached_region is None:
+            # If detection region is set, use it, otherwise capture the full game window
+            if self.detection_region:
+                self._cached_region = self.detection_region
+            else:
+                rect = self.game_connector.get_window_rect()
+                if not rect:
+                    return None
+                self._cached_region = (rect.left, rect.top, rect.right, rect.bottom)
+
+        # Capture straight into this session's preallocated BGR frame buffers
+        try:
+            return self.screen_capture.capture(self._cached_region)
+        except Exception:
+            # Reset cached region on error
+            self._cached_region = None
+            return None
+
+    def get_target_stat_names(self, desired_stats):
+        """Get the base stat names of the desired stats"""
+        return self.automator.get_target_stat_names(desired_stats)
+
+    def resolve_target_stats(self, results, target_stats):
+        """Resolve only the targeted stats from OCR results"""
+        return self.automator.resolve_target_stats(results, target_stats)
+
+    def check_desired_stats(self, current_stats, desired_stats):
+        """Check if the current stats meet the desired criteria"""
+        return self.automator.check_desired_stats(current_stats, desired_stats)
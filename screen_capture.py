@@ -0,0 +1,161 @@
+"""
+Screen capture module for the Skill Reroll Automation tool.
+Copies a screen region with GDI straight into preallocated, C-contiguous NumPy buffers in the
+BGR layout the OCR backends expect, so a frame reaches preprocessing and OCR without any PIL
+image, intermediate copy or per-roll allocation.
+"""
+
+import ctypes
+from ctypes import wintypes
+import numpy as np
+from PIL import ImageGrab
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+SRCCOPY = 0x00CC0020
+DIB_RGB_COLORS = 0
+BI_RGB = 0
+
+class BITMAPINFOHEADER(ctypes.Structure):
+    _fields_ = [
+        ("biSize", wintypes.DWORD),
+        ("biWidth", wintypes.LONG),
+        ("biHeight", wintypes.LONG),
+        ("biPlanes", wintypes.WORD),
+        ("biBitCount", wintypes.WORD),
+        ("biCompression", wintypes.DWORD),
+        ("biSizeImage", wintypes.DWORD),
+        ("biXPelsPerMeter", wintypes.LONG),
+        ("biYPelsPerMeter", wintypes.LONG),
+        ("biClrUsed", wintypes.DWORD),
+        ("biClrImportant", wintypes.DWORD),
+    ]
+
+def _load_gdi():
+    """user32 and gdi32 with handle-sized return types, or (None, None) off Windows"""
+    windll = getattr(ctypes, "windll", None)
+    if windll is None:
+        return None, None
+    user32 = windll.user32
+    gdi32 = windll.gdi32
+
+    user32.GetDC.restype = wintypes.HDC
+    user32.GetDC.argtypes = [wintypes.HWND]
+    user32.ReleaseDC.argtypes = [wintypes.HWND, wintypes.HDC]
+    gdi32.CreateCompatibleDC.restype = wintypes.HDC
+    gdi32.CreateCompatibleDC.argtypes = [wintypes.HDC]
+    gdi32.CreateCompatibleBitmap.restype = wintypes.HBITMAP
+    gdi32.CreateCompatibleBitmap.argtypes = [wintypes.HDC, ctypes.c_int, ctypes.c_int]
+    gdi32.SelectObject.restype = wintypes.HGDIOBJ
+    gdi32.SelectObject.argtypes = [wintypes.HDC, wintypes.HGDIOBJ]
+    gdi32.BitBlt.argtypes = [wintypes.HDC, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                             wintypes.HDC, ctypes.c_int, ctypes.c_int, wintypes.DWORD]
+    gdi32.GetDIBits.argtypes = [wintypes.HDC, wintypes.HBITMAP, wintypes.UINT, wintypes.UINT,
+                                ctypes.c_void_p, ctypes.c_void_p, wintypes.UINT]
+    gdi32.DeleteObject.argtypes = [wintypes.HGDIOBJ]
+    gdi32.DeleteDC.argtypes = [wintypes.HDC]
+    return user32, gdi32
+
+_user32, _gdi32 = _load_gdi()
+
+class ScreenCapture:
+    def __init__(self, buffers=2):
+        """
+        Initialize the capturer (GDI objects and buffers are created on the first capture)
+
+        Args:
+            buffers: Number of output frames rotated between captures, so the previous frame stays
+                     valid while the next one is captured
+        """
+        self.num_buffers = buffers
+        self.region = None
+        self.frames = []
+        self.next_frame = 0
+        self.bgra = None
+        self.header = None
+        self.screen_dc = None
+        self.memory_dc = None
+        self.bitmap = None
+        self.previous_bitmap = None
+
+    def _allocate(self, region):
+        """Create the GDI bitmap and the NumPy buffers for a region"""
+        self.release()
+        left, top, right, bottom = region
+        width, height = right - left, bottom - top
+
+        self.screen_dc = _user32.GetDC(None)
+        self.memory_dc = _gdi32.CreateCompatibleDC(self.screen_dc)
+        self.bitmap = _gdi32.CreateCompatibleBitmap(self.screen_dc, width, height)
+        self.previous_bitmap = _gdi32.SelectObject(self.memory_dc, self.bitmap)
+
+        # Top-down 32-bit DIB, so rows arrive in NumPy order
+        self.header = BITMAPINFOHEADER()
+        self.header.biSize = ctypes.sizeof(BITMAPINFOHEADER)
+        self.header.biWidth = width
+        self.header.biHeight = -height
+        self.header.biPlanes = 1
+        self.header.biBitCount = 32
+        self.header.biCompression = BI_RGB
+
+        self.bgra = np.empty((height, width, 4), dtype=np.uint8)
+        self.frames = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(self.num_buffers)]
+        self.next_frame = 0
+        self.region = region
+
+    def capture(self, region):
+        """
+        Capture a (left, top, right, bottom) screen region into the next preallocated buffer.
+        Returns a C-contiguous BGR uint8 array, valid until the buffer comes round again, or None on failure.
+        """
+        if _gdi32 is None:
+            return self._capture_fallback(region)
+
+        if region != self.region:
+            self._allocate(region)
+
+        left, top, right, bottom = region
+        width, height = right - left, bottom - top
+        if not _gdi32.BitBlt(self.memory_dc, 0, 0, width, height, self.screen_dc, left, top, SRCCOPY):
+            return None
+        if not _gdi32.GetDIBits(self.memory_dc, self.bitmap, 0, height, self.bgra.ctypes.data,
+                                ctypes.byref(self.header), DIB_RGB_COLORS):
+            return None
+
+        # Drop the unused alpha byte into the next output buffer
+        frame = self.frames[self.next_frame]
+        self.next_frame = (self.next_frame + 1) % len(self.frames)
+        if cv2 is not None:
+            cv2.cvtColor(self.bgra, cv2.COLOR_BGRA2BGR, dst=frame)
+        else:
+            np.copyto(frame, self.bgra[:, :, :3])
+        return frame
+
+    def detach_frames(self):
+        """
+        Leave the current output buffers to whoever still reads them (an OCR call that outlived its
+        session) - later captures go into new buffers instead of overwriting those frames
+        """
+        self.frames = [np.empty_like(frame) for frame in self.frames]
+        self.next_frame = 0
+
+    def _capture_fallback(self, region):
+        """Capture through PIL where GDI is not available"""
+        image = ImageGrab.grab(bbox=region, all_screens=False)
+        return np.ascontiguousarray(np.asarray(image.convert("RGB"))[:, :, ::-1])
+
+    def release(self):
+        """Free the GDI objects (buffers are dropped with them)"""
+        if self.memory_dc:
+            if self.previous_bitmap:
+                _gdi32.SelectObject(self.memory_dc, self.previous_bitmap)
+            _gdi32.DeleteDC(self.memory_dc)
+        if self.bitmap:
+            _gdi32.DeleteObject(self.bitmap)
+        if self.screen_dc:
+            _user32.ReleaseDC(None, self.screen_dc)
+        self.screen_dc = self.memory_dc = self.bitmap = self.previous_bitmap = None
+        self.region = None
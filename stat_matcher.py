@@ -0,0 +1,453 @@
+"""
+Stat matcher for the Skill Reroll Automation tool.
+Maps OCR text lines to stat names and pairs them with the values on the same row. Everything
+that only depends on the stat catalog (normalized names, special-case rules) is built once, so
+parsing a roll only costs work proportional to the number of OCR lines. The panel shows the same
+few strings roll after roll, so the resolution of each raw OCR text is memoized in a bounded LRU.
+New texts are only scored against the few names a trigram index proposes, with a bounded edit distance,
+or all at once against the whole catalog with the original character-count similarity in NumPy.
+Stats and values are paired one-to-one with a sweep over their y-sorted positions.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+import numpy as np
+from value_reader import parse_value
+
+# Lines that often come back from OCR merged with their value, as (required keywords, stat name)
+SPECIAL_CASE_RULES = [
+    (("arrival", "cool", "time"), "Arrival Skill Cool Time decreased."),
+]
+
+# Minimum similarity for a line to count as a stat name
+MATCH_THRESHOLD = 0.6
+
+# Maximum vertical distance in pixels between a stat and its value
+PAIR_DISTANCE = 50
+
+# Number of catalog names the trigram index proposes for a line
+MAX_CANDIDATES = 8
+
+# Ways of scoring a line against the catalog: indexed edit distance, or the vectorized
+# character-count similarity of calculate_string_similarity
+SCORING_METHODS = ("edit", "charcount")
+
+def normalize_text(text):
+    """Normalize text by converting to lowercase and removing spaces and dots"""
+    return text.lower().replace(" ", "").replace(".", "")
+
+def calculate_string_similarity(str1, str2):
+    """
+    Calculate similarity between two strings based on character matching and length.
+    Returns a score between 0 and 1, where 1 is a perfect match.
+    """
+    # If either string is empty, return 0
+    if not str1 or not str2:
+        return 0
+
+    # If strings are identical, return 1
+    if str1 == str2:
+        return 1
+
+    # Calculate character-by-character matches
+    char_matches = 0
+    for char in str1:
+        if char in str2:
+            char_matches += 1
+
+    # Calculate similarity based on:
+    # 1. Percentage of matching characters
+    # 2. Length difference penalty
+    max_length = max(len(str1), len(str2))
+
+    # Basic character similarity
+    char_similarity = char_matches / max_length
+
+    # Length difference penalty - penalize matches where lengths are very different
+    # This helps distinguish between "Defense" and "Defense Rate"
+    length_diff = abs(len(str1) - len(str2)) / max(len(str1), len(str2))
+    length_penalty = length_diff * 0.5  # Apply 50% weight to length difference
+
+    # Final similarity score
+    similarity = char_similarity - length_penalty
+
+    # Ensure the result is between 0 and 1
+    return max(0, min(similarity, 1))
+
+def trigrams(text):
+    """Set of character trigrams of a text, padded so the first and last characters get their own"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def edit_distance(str1, str2, max_distance):
+    """
+    Levenshtein distance between two strings, or max_distance + 1 as soon as it is known to exceed max_distance
+    """
+    if abs(len(str1) - len(str2)) > max_distance:
+        return max_distance + 1
+    if len(str1) < len(str2):
+        str1, str2 = str2, str1
+
+    previous = list(range(len(str2) + 1))
+    for i, char1 in enumerate(str1, 1):
+        current = [i]
+        for j, char2 in enumerate(str2, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char1 != char2)))
+        # Every path runs through this row, so its minimum bounds the final distance
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return min(previous[-1], max_distance + 1)
+
+def edit_similarity(str1, str2, min_similarity=0.0):
+    """
+    Similarity between 0 and 1 from the edit distance (1 - distance / longer length).
+    Pairs that cannot reach min_similarity score 0 without computing the full distance.
+    """
+    if not str1 or not str2:
+        return 0.0
+    max_length = max(len(str1), len(str2))
+    max_distance = int((1.0 - min_similarity) * max_length)
+    distance = edit_distance(str1, str2, max_distance)
+    if distance > max_distance:
+        return 0.0
+    return 1.0 - distance / max_length
+
+class TrigramIndex:
+    def __init__(self, names):
+        """
+        Inverted index from trigram to the names containing it
+
+        Args:
+            names: Strings to index (already normalized), in priority order for ties
+        """
+        self.names = list(names)
+        self.postings = {}
+        for position, name in enumerate(self.names):
+            for gram in trigrams(name):
+                self.postings.setdefault(gram, []).append(position)
+
+    def candidates(self, text, limit=MAX_CANDIDATES):
+        """Up to limit indexed names sharing the most trigrams with text, in index order"""
+        shared = {}
+        for gram in trigrams(text):
+            for position in self.postings.get(gram, ()):
+                shared[position] = shared.get(position, 0) + 1
+        best = sorted(shared, key=lambda position: (-shared[position], position))[:limit]
+        return [self.names[position] for position in sorted(best)]
+
+class CharCountMatrix:
+    def __init__(self, names):
+        """
+        Character counts of catalog names, for scoring many texts at once with calculate_string_similarity
+
+        Args:
+            names: Strings to score against (already normalized), in priority order for ties
+        """
+        self.names = list(names)
+        self.alphabet = np.array(sorted(set("".join(self.names))), dtype="<U1")
+        self.lengths = np.array([len(name) for name in self.names], dtype=np.float64)
+
+        # presence[m, c] is 1 where name m contains character c
+        counts = self.count_characters(self.names)
+        self.presence = (counts > 0).astype(np.float64)
+
+    def count_characters(self, texts):
+        """Matrix of per-text counts of every alphabet character (characters outside it are not counted)"""
+        counts = np.zeros((len(texts), len(self.alphabet)), dtype=np.float64)
+        chars = np.array(list("".join(texts)), dtype="<U1")
+        if not len(chars) or not len(self.alphabet):
+            return counts
+
+        rows = np.repeat(np.arange(len(texts)), [len(text) for text in texts])
+        columns = np.searchsorted(self.alphabet, chars).clip(max=len(self.alphabet) - 1)
+        known = self.alphabet[columns] == chars
+        np.add.at(counts, (rows[known], columns[known]), 1)
+        return counts
+
+    def similarity(self, texts):
+        """
+        Matrix of calculate_string_similarity(text, name) for every text (rows) and name (columns).
+        A character of a text matches if the name contains it at all, so the matches are one matrix product.
+        """
+        lengths = np.array([len(text) for text in texts], dtype=np.float64)[:, np.newaxis]
+        matches = self.count_characters(texts) @ self.presence.T
+        max_lengths = np.maximum(np.maximum(lengths, self.lengths), 1)
+        length_penalty = np.abs(lengths - self.lengths) / max_lengths * 0.5
+        return np.clip(matches / max_lengths - length_penalty, 0, 1)
+
+    def best_matches(self, texts):
+        """Best (name, similarity) per text, the first name winning ties; (None, 0.0) where nothing scores"""
+        if not texts or not self.names:
+            return [(None, 0.0)] * len(texts)
+        scores = self.similarity(texts)
+        best = scores.argmax(axis=1)
+        return [(self.names[column], float(scores[row, column])) if scores[row, column] > 0 else (None, 0.0)
+                for row, column in enumerate(best)]
+
+def pair_rows(stat_ys, value_ys, max_distance=PAIR_DISTANCE):
+    """
+    Pair stats with values on the same row, every value going to at most one stat.
+    Each stat only looks at the values of its y-window (found by bisecting the sorted value positions),
+    and the closest pairs are assigned first.
+    Returns a list of (stat index, value index, distance); unpaired stats are left out.
+    """
+    order = sorted(range(len(value_ys)), key=lambda index: value_ys[index])
+    sorted_ys = [value_ys[index] for index in order]
+
+    candidates = []
+    for stat_index, stat_y in enumerate(stat_ys):
+        start = bisect_right(sorted_ys, stat_y - max_distance)
+        end = bisect_left(sorted_ys, stat_y + max_distance)
+        for position in range(start, end):
+            candidates.append((abs(sorted_ys[position] - stat_y), stat_index, order[position]))
+    candidates.sort()
+
+    pairs = []
+    paired_stats = set()
+    paired_values = set()
+    for distance, stat_index, value_index in candidates:
+        if stat_index in paired_stats or value_index in paired_values:
+            continue
+        paired_stats.add(stat_index)
+        paired_values.add(value_index)
+        pairs.append((stat_index, value_index, distance))
+    return pairs
+
+def get_y_center(box):
+    """Calculate the y-center of a bounding box"""
+    # Box format is [[x1,y1],[x2,y1],[x2,y2],[x1,y2]]
+    if not box or len(box) != 4:
+        return 0
+    return (box[0][1] + box[2][1]) / 2
+
+class StatMatcher:
+    def __init__(self, stat_names=None, special_cases=SPECIAL_CASE_RULES, threshold=MATCH_THRESHOLD,
+                 pair_distance=PAIR_DISTANCE, max_memo_entries=1024, max_candidates=MAX_CANDIDATES, scoring="edit"):
+        """
+        Initialize the matcher from the stat catalog
+
+        Args:
+            stat_names: Stat names OCR lines are matched against (defaults to every known skill)
+            special_cases: List of (keywords, stat name); a line containing every keyword is that stat,
+                           with its value read from the same line
+            threshold: Minimum similarity for a line to count as a stat name
+            pair_distance: Maximum vertical distance in pixels between a stat and its value
+            max_memo_entries: Size cap of the text resolution memo; the least recently used text is
+                              evicted beyond it
+            max_candidates: Number of catalog names the trigram index proposes for scoring
+            scoring: "edit" for the indexed edit distance, or "charcount" to score every line of a frame
+                     against the whole catalog at once with the character-count similarity
+        """
+        if scoring not in SCORING_METHODS:
+            raise ValueError(f"Unknown stat scoring method: {scoring}")
+        if stat_names is None:
+            from stats_data import get_all_skills
+            stat_names = get_all_skills()
+
+        # Normalized name -> stat name, in catalog order (the first best match wins ties)
+        self.normalized_stats = {normalize_text(stat): stat for stat in stat_names}
+        self.index = TrigramIndex(self.normalized_stats)
+        self.max_candidates = max_candidates
+        self.scoring = scoring
+        self.char_counts = CharCountMatrix(self.normalized_stats) if scoring == "charcount" else None
+        self.special_cases = [(tuple(keyword.lower() for keyword in keywords), stat)
+                              for keywords, stat in special_cases]
+        self.threshold = threshold
+        self.pair_distance = pair_distance
+
+        # Raw OCR text -> (stat name or None, similarity), least recently used first
+        self.max_memo_entries = max_memo_entries
+        self.memo = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Counters for reporting
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def special_case(self, text):
+        """Stat name of the special-case rule a line falls under, or None"""
+        lowered = text.lower()
+        for keywords, stat_name in self.special_cases:
+            if all(keyword in lowered for keyword in keywords):
+                return stat_name
+        return None
+
+    def match(self, text):
+        """Best matching stat name of a line and its similarity, or (None, 0.0); memoized per raw text"""
+        return self.match_many([text])[text]
+
+    def match_many(self, texts):
+        """Resolve several lines at once; returns {text: (stat name or None, similarity)}"""
+        results = {}
+        missing = []
+        with self._lock:
+            for text in dict.fromkeys(texts):
+                result = self.memo.get(text)
+                if result is None:
+                    self.misses += 1
+                    missing.append(text)
+                    continue
+                self.memo.move_to_end(text)
+                self.hits += 1
+                results[text] = result
+
+        if not missing:
+            return results
+
+        resolved = self.resolve_many(missing)
+        with self._lock:
+            for text, result in zip(missing, resolved):
+                self.memo[text] = result
+                self.memo.move_to_end(text)
+            while len(self.memo) > self.max_memo_entries:
+                self.memo.popitem(last=False)
+                self.evictions += 1
+        results.update(zip(missing, resolved))
+        return results
+
+    def resolve(self, text):
+        """Score a line against the catalog, without the memo"""
+        return self.resolve_many([text])[0]
+
+    def resolve_many(self, texts):
+        """Score lines against the catalog, without the memo; returns a (stat name or None, similarity) per text"""
+        norm_texts = [normalize_text(text) for text in texts]
+        if self.char_counts is None:
+            return [self.resolve_indexed(norm_text) for norm_text in norm_texts]
+        return [(self.normalized_stats[name] if name is not None else None, similarity)
+                for name, similarity in self.char_counts.best_matches(norm_texts)]
+
+    def resolve_indexed(self, norm_text):
+        """Score a normalized line against the names the trigram index proposes"""
+
+        # An exact normalized name cannot be beaten
+        stat_name = self.normalized_stats.get(norm_text)
+        if stat_name is not None:
+            return stat_name, 1.0
+
+        # Edit distance keeps "Defense" apart from "Defense Rate": the extra characters all count
+        best_match = None
+        best_similarity = 0.0
+        for norm_stat in self.index.candidates(norm_text, self.max_candidates):
+            similarity = edit_similarity(norm_text, norm_stat, self.threshold)
+            if similarity > best_similarity:
+                best_similarity = similarity
+                best_match = self.normalized_stats[norm_stat]
+        return best_match, best_similarity
+
+    def hit_rate(self):
+        """Fraction of text resolutions served from the memo"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def summary(self):
+        """One-line description of the memo counters"""
+        return (f"Stat matcher: {self.hit_rate() * 100:.1f}% hit rate ({self.hits} hits, {self.misses} misses), "
+                f"{len(self.memo)}/{self.max_memo_entries} texts memoized, {self.evictions} evicted")
+
+    def parse(self, detected_items, status_callback=None, detailed_logging=False, unmapped_ocr_counter=None,
+              target_stats=None):
+        """
+        Find stats and values, pairing them by y-coordinate; returns {stat name: value}.
+        See parse_rows for the arguments.
+        """
+        rows = self.parse_rows(detected_items, status_callback, detailed_logging, unmapped_ocr_counter, target_stats)
+        return {stat_name: value for stat_name, value, _ in rows}
+
+    def parse_rows(self, detected_items, status_callback=None, detailed_logging=False, unmapped_ocr_counter=None,
+                   target_stats=None):
+        """
+        Find stats and values, pairing them one-to-one by y-coordinate.
+        Includes optional detailed logging of OCR detection and mapping process.
+        detected_items: List of tuples (box, text, confidence) from OCR
+        status_callback: Function to call with status updates
+        detailed_logging: Whether to log detailed information
+        unmapped_ocr_counter: Dictionary to track unmapped OCR results
+        target_stats: Optional collection of base stat names; when given, only rows of these stats are
+                      returned (used by the decision lane of the reroll loop). Every stat line still takes
+                      part in the pairing, so a target never takes the value of a neighbouring row.
+        Returns a list of (stat name, value, confidence) rows from top to bottom, where confidence
+        (0 to 1) combines the name similarity, the OCR confidence of both lines and their vertical offset.
+        """
+        log = status_callback if detailed_logging else None
+
+        if log:
+            log(f"OCR detected {len(detected_items)} text elements")
+
+        # Identify stats and values with their y-coordinates
+        rows = []  # (y_center, stat_name, value, confidence) of lines holding both
+        stats_with_y = []  # (y_center, text, stat_name, similarity * OCR confidence)
+        values_with_y = []  # (y_center, text, value, OCR confidence)
+
+        # Split off the values first, so every name line of the frame is resolved in one batch
+        lines = []  # (y_center, text, OCR confidence, special-case stat name or None, value or None)
+        for box, text, confidence in detected_items:
+            # Lines such as "Arrival skill Cool time decreased" often get detected with their value
+            stat_name = self.special_case(text)
+
+            # Values include % for percentages, s for seconds and thousands separators ("1,200" is 1200)
+            lines.append((get_y_center(box), text, confidence, stat_name, parse_value(text)))
+        matches = self.match_many([text for _, text, _, _, value in lines if value is None])
+
+        for y_center, text, confidence, stat_name, value in lines:
+            # A special-case line is its own row, so its value is never offered to another stat
+            if stat_name is not None and value is not None:
+                rows.append((y_center, stat_name, value, confidence))
+                if log:
+                    log(f"Special case: Split '{text}' into stat '{stat_name}' and value {value}")
+                continue
+
+            if value is not None:
+                values_with_y.append((y_center, text, value, confidence))
+                if log:
+                    log(f"Found value: {value} in '{text}'")
+                continue
+
+            best_match, best_similarity = matches[text]
+            if best_match and best_similarity >= self.threshold:
+                stats_with_y.append((y_center, text, best_match, best_similarity * confidence))
+                if log:
+                    log(f"Matched '{text}' to '{best_match}' (similarity: {best_similarity:.2f})")
+            else:
+                if unmapped_ocr_counter is not None:
+                    unmapped_ocr_counter[text] = unmapped_ocr_counter.get(text, 0) + 1
+                if log:
+                    log(f"No match found for '{text}'")
+
+        # Give each stat the closest value on its row that no closer stat has taken
+        pairs = pair_rows([stat[0] for stat in stats_with_y], [value[0] for value in values_with_y],
+                          self.pair_distance)
+        for stat_index, value_index, distance in pairs:
+            stat_y, _, stat_name, stat_score = stats_with_y[stat_index]
+            _, _, value, value_confidence = values_with_y[value_index]
+            confidence = stat_score * value_confidence * (1.0 - distance / self.pair_distance)
+            rows.append((stat_y, stat_name, value, confidence))
+            if log:
+                log(f"Paired '{stat_name}' with {value} (confidence: {confidence:.2f})")
+
+        if log:
+            paired = {stat_index for stat_index, _, _ in pairs}
+            for stat_index, (_, _, stat_name, _) in enumerate(stats_with_y):
+                if stat_index not in paired:
+                    log(f"Could not find a value for '{stat_name}'")
+
+        # Drop stats that are not targeted only now - their best match is computed against the whole
+        # catalog and they claim their own values, so neither near-duplicate names nor neighbouring
+        # rows get mistaken for a target
+        rows.sort(key=lambda row: row[0])
+        return [(stat_name, value, confidence) for _, stat_name, value, confidence in rows
+                if target_stats is None or stat_name in target_stats]
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+def get_stat_matcher():
+    """Get the process-wide stat matcher, built from the stat catalog on first use"""
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None:
+            _matcher = StatMatcher()
+        return _matcher
@@ -0,0 +1,110 @@
+"""
+Statistics lane for the Skill Reroll Automation tool.
+Parses full OCR results, updates stat counters and logs rolls on a background thread,
+so the reroll loop never waits on bookkeeping before clicking Change.
+"""
+
+import queue
+import threading
+from stat_matcher import get_stat_matcher
+from stats_data import get_offensive_skills, get_defensive_skills, get_base_stat_name
+
+class RollStatsRecorder:
+    def __init__(self, stat_counter, unmapped_ocr_counter, status_callback=None, stat_matcher=None):
+        """
+        Initialize the statistics recorder
+
+        Args:
+            stat_counter: Dictionary updated with "stat +value" counts
+            unmapped_ocr_counter: Dictionary updated with unmapped OCR text counts
+            status_callback: Function to call with status updates
+            stat_matcher: StatMatcher used to parse rolls (defaults to the process-wide one)
+        """
+        self.stat_counter = stat_counter
+        self.unmapped_ocr_counter = unmapped_ocr_counter
+        self.status_callback = status_callback
+        self.stat_matcher = stat_matcher or get_stat_matcher()
+        self.detailed_logging = False
+
+        self.queue = queue.Queue()
+        self.thread = None
+
+        # Pre-compute the stat categories once
+        self.offensive_base_stats = set(get_base_stat_name(stat) for stat in get_offensive_skills())
+        self.defensive_base_stats = set(get_base_stat_name(stat) for stat in get_defensive_skills())
+
+    def update_status(self, message):
+        """Update status via callback if available"""
+        if self.status_callback:
+            self.status_callback(message)
+
+    def start(self, detailed_logging=False):
+        """Start the background worker thread"""
+        self.detailed_logging = detailed_logging
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._worker, daemon=True)
+            self.thread.start()
+
+    def submit(self, roll_number, detected_items):
+        """Queue the OCR results of one roll for full parsing and bookkeeping"""
+        self.queue.put((roll_number, detected_items))
+
+    def stop(self):
+        """Process everything still queued, then stop the worker thread"""
+        if self.thread is None:
+            return
+
+        # A None item tells the worker to exit after the queued rolls
+        self.queue.put(None)
+        if self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+
+    def _worker(self):
+        """Background loop consuming queued rolls"""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+
+            roll_number, detected_items = item
+            try:
+                self.record_roll(roll_number, detected_items)
+            except Exception as e:
+                self.update_status(f"Stats recording error: {str(e)}")
+
+    def record_roll(self, roll_number, detected_items):
+        """Fully parse one roll, update the counters and log it"""
+        # Only log roll information in detailed mode
+        if self.detailed_logging:
+            self.update_status(f"Roll #{roll_number}")
+
+        current_stats = {}
+        if detected_items:
+            current_stats = self.stat_matcher.parse(
+                detected_items,
+                self.update_status,
+                detailed_logging=self.detailed_logging,
+                unmapped_ocr_counter=self.unmapped_ocr_counter
+            )
+
+        if not current_stats:
+            if self.detailed_logging:
+                self.update_status("No stats detected")
+            return
+
+        # Order stats as offensive, defensive, then other
+        off_stats = [(stat, current_stats[stat]) for stat in current_stats if stat in self.offensive_base_stats]
+        def_stats = [(stat, current_stats[stat]) for stat in current_stats if stat in self.defensive_base_stats]
+        other_stats = [(stat, current_stats[stat]) for stat in current_stats
+                       if stat not in self.offensive_base_stats and stat not in self.defensive_base_stats]
+        ordered_stats = off_stats + def_stats + other_stats
+
+        # Track stats for summary with plus sign regardless of logging mode
+        for stat, value in ordered_stats:
+            stat_key = f"{stat} +{value}"
+            self.stat_counter[stat_key] = self.stat_counter.get(stat_key, 0) + 1
+
+        # Only log stats in detailed mode, all in a single line
+        if self.detailed_logging:
+            self.update_status(" | ".join(f"{stat}: {value}" for stat, value in ordered_stats))
@@ -0,0 +1,160 @@
+"""
+Template library for the Skill Reroll Automation tool.
+Builds binarized reference bitmaps of stat names and values from lines PaddleOCR already read
+with high confidence, and matches new line crops against all of them at once with vectorized
+NumPy correlation. Only lines without a confident match need to go to the recognizer.
+"""
+
+import threading
+import numpy as np
+from PIL import Image
+
+# Every binarized line is resampled to this canvas (width, height) before correlation
+TEMPLATE_SIZE = (96, 16)
+
+def binarize_line(crop):
+    """
+    Binarize a line crop and trim it to its text.
+    Returns (bitmap, (height, width)) with bitmap as a float32 array of TEMPLATE_SIZE,
+    or (None, None) if the crop contains no text pixels.
+    """
+    crop = np.asarray(crop)
+    gray = crop.mean(axis=2) if crop.ndim == 3 else crop.astype(np.float32)
+
+    # Threshold halfway between the background and the brightest text pixels
+    low, high = np.percentile(gray, 5), gray.max()
+    if high - low < 30:
+        return None, None
+    mask = gray > (low + high) / 2
+
+    # Trim to the bounding box of the text
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if len(rows) == 0 or len(cols) == 0:
+        return None, None
+    trimmed = mask[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+
+    bitmap = Image.fromarray((trimmed * 255).astype(np.uint8)).resize(TEMPLATE_SIZE, Image.BILINEAR)
+    return np.asarray(bitmap, dtype=np.float32) / 255.0, trimmed.shape
+
+def normalize_vector(bitmap):
+    """Zero-mean, unit-norm vector of a bitmap so a dot product is the correlation coefficient"""
+    vector = bitmap.ravel() - bitmap.mean()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class TemplateLibrary:
+    def __init__(self, learn_confidence=0.95, match_threshold=0.95, min_margin=0.03,
+                 size_tolerance=1, max_templates=512, variants_per_text=3):
+        """
+        Initialize an empty template library
+
+        Args:
+            learn_confidence: Minimum recognizer confidence for a line to become a template
+            match_threshold: Minimum correlation for a template match
+            min_margin: Required correlation lead over the best template of a different text
+            size_tolerance: Maximum difference (pixels) between the trimmed text sizes
+            max_templates: Size cap of the library
+            variants_per_text: Maximum number of bitmaps kept for the same text
+        """
+        self.learn_confidence = learn_confidence
+        self.match_threshold = match_threshold
+        self.min_margin = min_margin
+        self.size_tolerance = size_tolerance
+        self.max_templates = max_templates
+        self.variants_per_text = variants_per_text
+
+        # Parallel template arrays: texts, correlation vectors (K x D) and trimmed sizes (K x 2)
+        self.texts = []
+        self.vectors = np.zeros((0, TEMPLATE_SIZE[0] * TEMPLATE_SIZE[1]), dtype=np.float32)
+        self.sizes = np.zeros((0, 2), dtype=np.int32)
+        self._lock = threading.Lock()
+
+        # Counters for reporting
+        self.matches = 0
+        self.fallbacks = 0
+
+    def __len__(self):
+        return len(self.texts)
+
+    def learn(self, crop, text, confidence):
+        """Add a confidently recognized line as a template"""
+        if confidence < self.learn_confidence or not text.strip():
+            return False
+        if len(self.texts) >= self.max_templates or self.texts.count(text) >= self.variants_per_text:
+            return False
+
+        bitmap, size = binarize_line(crop)
+        if bitmap is None:
+            return False
+
+        vector = normalize_vector(bitmap)
+        with self._lock:
+            # Skip near-identical variants of a text we already know
+            for index, known_text in enumerate(self.texts):
+                if known_text == text and float(self.vectors[index] @ vector) > 0.99:
+                    return False
+            self.texts.append(text)
+            self.vectors = np.vstack([self.vectors, vector[np.newaxis, :]])
+            self.sizes = np.vstack([self.sizes, np.array(size, dtype=np.int32)[np.newaxis, :]])
+        return True
+
+    def match(self, crops):
+        """
+        Match line crops against every template in one matrix product.
+        Returns a list with (text, score) for confident matches and None for the rest.
+        """
+        results = [None] * len(crops)
+        if not self.texts or not crops:
+            self.fallbacks += len(crops)
+            return results
+
+        bitmaps = []
+        sizes = []
+        indices = []
+        for index, crop in enumerate(crops):
+            bitmap, size = binarize_line(crop)
+            if bitmap is not None:
+                bitmaps.append(normalize_vector(bitmap))
+                sizes.append(size)
+                indices.append(index)
+
+        if bitmaps:
+            with self._lock:
+                texts = list(self.texts)
+                vectors = self.vectors
+                template_sizes = self.sizes
+
+            # Correlation of every crop with every template (N x K)
+            scores = np.stack(bitmaps) @ vectors.T
+
+            # Templates whose trimmed text size differs cannot match ("Defense" vs "Defense Rate")
+            size_diff = np.abs(np.array(sizes, dtype=np.int32)[:, np.newaxis, :] - template_sizes[np.newaxis, :, :])
+            scores[(size_diff > self.size_tolerance).any(axis=2)] = -1.0
+
+            best = scores.argmax(axis=1)
+            text_array = np.array(texts, dtype=object)
+            for row, index in enumerate(indices):
+                best_index = best[row]
+                best_score = float(scores[row, best_index])
+                if best_score < self.match_threshold:
+                    continue
+
+                # The best template must clearly beat every template of a different text
+                best_text = texts[best_index]
+                other_mask = text_array != best_text
+                if other_mask.any() and best_score - float(scores[row, other_mask].max()) < self.min_margin:
+                    continue
+                results[index] = (best_text, best_score)
+
+        matched = sum(1 for result in results if result is not None)
+        self.matches += matched
+        self.fallbacks += len(crops) - matched
+        return results
+
+    def summary(self):
+        """One-line description of the library counters"""
+        total = self.matches + self.fallbacks
+        rate = self.matches / total * 100 if total else 0.0
+        return (f"Template matches: {rate:.1f}% of lines ({self.matches} matched, {self.fallbacks} sent to OCR), "
+                f"{len(self.texts)} templates")
@@ -0,0 +1,14 @@
+"""
+Shared test setup: the application modules live at the repository root.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def box(y, height=10, left=0, right=100):
+    """4-point OCR box of a line whose y-center is y"""
+    top = y - height / 2
+    bottom = y + height / 2
+    return [[left, top], [right, top], [right, bottom], [left, bottom]]
@@ -0,0 +1,31 @@
+import asyncio
+import time
+import pytest
+from automation import SkillRerollAutomator
+
+class SlowRebuildManager:
+    def __init__(self, delay):
+        self.delay = delay
+        self.rebuilds = []
+
+    def rebuild(self, failed_engine):
+        self.rebuilds.append(failed_engine)
+        time.sleep(self.delay)
+        return "new engine"
+
+def test_rebuild_slower_than_the_recognize_budget_still_replaces_the_engine():
+    automator = SkillRerollAutomator(None)
+    automator.ocr_manager = SlowRebuildManager(delay=0.3)
+    automator.running = True
+    automator.reader = "failed engine"
+
+    async def scenario():
+        # The session's RECOGNIZE budget runs out while the engine is being rebuilt
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(automator.recover_ocr("failed engine"), 0.05)
+        # Another session noticing the same failure joins the rebuild instead of starting one
+        await automator.recover_ocr("failed engine")
+
+    asyncio.run(scenario())
+    assert automator.reader == "new engine"
+    assert automator.ocr_manager.rebuilds == ["failed engine"]
@@ -0,0 +1,91 @@
+import threading
+import numpy as np
+import pytest
+from frame_batching import MicroBatcher, stack_crops, stitch_frames, split_results
+
+def frame(height, width=20, value=1):
+    return np.full((height, width, 3), value, dtype=np.uint8)
+
+def test_stitch_frames_places_every_frame():
+    frames = [frame(30, value=1), frame(40, width=25, value=2), frame(50, value=3)]
+    [(canvas, placements)] = stitch_frames(frames, gap=10, max_height=500)
+
+    assert canvas.shape == (30 + 40 + 50 + 2 * 10, 25, 3)
+    assert placements == [(0, 0, 30), (1, 40, 40), (2, 90, 50)]
+    for index, y, height in placements:
+        assert (canvas[y:y + height, :frames[index].shape[1]] == frames[index]).all()
+
+def test_stitch_frames_splits_at_max_height():
+    canvases = stitch_frames([frame(60), frame(60), frame(60)], gap=10, max_height=130)
+
+    assert [[index for index, _, _ in placements] for _, placements in canvases] == [[0, 1], [2]]
+    assert canvases[1][0].shape[0] == 60
+
+def test_stitch_frames_accepts_grayscale():
+    [(canvas, _)] = stitch_frames([np.zeros((10, 10), dtype=np.uint8)])
+    assert canvas.shape == (10, 10, 3)
+
+def test_split_results_returns_frame_coordinates():
+    placements = [(0, 0, 30), (1, 40, 40)]
+    items = [
+        ([[0, 5], [10, 5], [10, 15], [0, 15]], "first", 0.9),
+        ([[0, 50], [10, 50], [10, 60], [0, 60]], "second", 0.8),
+    ]
+    per_frame = split_results(items, placements, 2)
+
+    assert per_frame[0] == [([[0, 5], [10, 5], [10, 15], [0, 15]], "first", 0.9)]
+    assert per_frame[1] == [([[0, 10], [10, 10], [10, 20], [0, 20]], "second", 0.8)]
+
+def run_concurrently(batcher, items):
+    results = [None] * len(items)
+    errors = [None] * len(items)
+
+    def call(index):
+        try:
+            results[index] = batcher.submit(items[index])
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(len(items))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results, errors
+
+def test_micro_batcher_merges_concurrent_calls():
+    batches = []
+
+    def double(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(double, window=0.2, max_batch=4)
+    results, errors = run_concurrently(batcher, [1, 2, 3, 4])
+
+    assert results == [2, 4, 6, 8]
+    assert errors == [None] * 4
+    assert sorted(item for batch in batches for item in batch) == [1, 2, 3, 4]
+    assert batcher.requests == 4 and batcher.batches < 4
+
+def test_micro_batcher_hands_every_caller_the_error():
+    def broken(items):
+        raise ValueError("bad batch")
+
+    batcher = MicroBatcher(broken, window=0.05)
+    results, errors = run_concurrently(batcher, [1, 2])
+    assert all(isinstance(error, ValueError) for error in errors)
+
+def test_micro_batcher_rejects_a_short_result_list():
+    batcher = MicroBatcher(lambda items: [], window=0)
+    with pytest.raises(RuntimeError):
+        batcher.submit(1)
+
+def test_stack_crops_returns_each_crop_strip():
+    crops = [frame(10, width=30, value=1), frame(20, width=15, value=2)]
+    canvas, boxes = stack_crops(crops, gap=4)
+
+    assert canvas.shape == (34, 30, 3)
+    assert boxes == [(0, 0, 30, 10), (0, 14, 15, 34)]
+    for crop, (left, top, right, bottom) in zip(crops, boxes):
+        assert (canvas[top:bottom, left:right] == crop).all()
@@ -0,0 +1,82 @@
+from line_layout import LineLayout
+
+FRAME_SIZE = (200, 60)
+
+def item(left, top, right, text, confidence=0.95):
+    box = [[left, top], [right, top], [right, top + 12], [left, top + 12]]
+    return (box, text, confidence)
+
+def panel(value="+16%"):
+    return [item(5, 5, 90, "Crit. DMG"), item(120, 5, 160, value),
+            item(5, 30, 100, "Defense Rate"), item(120, 30, 160, "+400")]
+
+def test_value_slots_are_learned():
+    layout = LineLayout(calibration_frames=2)
+    layout.observe(panel(), FRAME_SIZE)
+    layout.observe(panel("+12%"), FRAME_SIZE)
+
+    assert layout.is_calibrated(FRAME_SIZE)
+    assert layout.value_slots == [False, True, False, True]
+
+    layout.invalidate()
+    assert layout.value_slots is None
+
+def test_layout_is_learned_after_agreeing_frames():
+    layout = LineLayout(calibration_frames=3, padding=3)
+    for _ in range(2):
+        layout.observe(panel(), FRAME_SIZE)
+        assert not layout.is_calibrated(FRAME_SIZE)
+    layout.observe(panel(), FRAME_SIZE)
+
+    assert layout.is_calibrated(FRAME_SIZE)
+    assert not layout.is_calibrated((400, 60))
+    assert layout.calibrations == 1
+    # Slots reach the midpoint to their neighbours and the region edges; rows are padded by 3 pixels
+    assert layout.line_boxes == [(0, 2, 105, 20), (105, 2, 200, 20), (0, 27, 110, 45), (110, 27, 200, 45)]
+
+def test_changed_row_structure_restarts_calibration():
+    layout = LineLayout(calibration_frames=2)
+    layout.observe(panel(), FRAME_SIZE)
+    layout.observe(panel()[:2], FRAME_SIZE)
+    assert not layout.is_calibrated(FRAME_SIZE)
+    layout.observe(panel()[:2], FRAME_SIZE)
+    assert layout.is_calibrated(FRAME_SIZE)
+    assert len(layout.line_boxes) == 2
+
+def test_resized_frame_restarts_calibration():
+    layout = LineLayout(calibration_frames=2)
+    layout.observe(panel(), FRAME_SIZE)
+    layout.observe(panel(), (220, 60))
+    assert not layout.is_calibrated((220, 60))
+
+def test_overlapping_rows_are_not_learned():
+    layout = LineLayout(calibration_frames=2)
+    layout.observe(panel(), FRAME_SIZE)
+    # Same structure, but the first row grew down into the second
+    taller = panel()
+    taller[0] = item(5, 5, 90, "Crit. DMG")
+    taller[0][0][2][1] = taller[0][0][3][1] = 32
+    layout.observe(taller, FRAME_SIZE)
+    assert not layout.is_calibrated(FRAME_SIZE)
+
+def test_accept_requires_every_line_confident():
+    layout = LineLayout(calibration_frames=1, min_confidence=0.8)
+    layout.observe(panel(), FRAME_SIZE)
+
+    assert layout.accept(panel())
+    assert not layout.accept(panel()[:3])
+    assert not layout.accept(panel()[:3] + [item(120, 30, 160, "+400", confidence=0.5)])
+    assert not layout.accept(panel()[:3] + [item(120, 30, 160, " ")])
+    assert layout.recognition_only_frames == 1
+
+def test_invalidate_forgets_the_layout():
+    layout = LineLayout(calibration_frames=1)
+    layout.observe(panel(), FRAME_SIZE)
+    layout.invalidate()
+    layout.invalidate()
+
+    assert not layout.is_calibrated(FRAME_SIZE)
+    assert layout.invalidations == 1
+    layout.observe(panel(), FRAME_SIZE)
+    assert layout.is_calibrated(FRAME_SIZE)
+    assert layout.calibrations == 2
@@ -0,0 +1,70 @@
+import ocr_autotuner
+from ocr_autotuner import thread_counts, throughput, tuning_grid, autotune, MAX_TUNING_THREADS
+
+def test_thread_counts_are_capped():
+    assert thread_counts(4) == [1, 2, 4]
+    assert thread_counts(6) == [1, 2, 4, 6]
+    assert thread_counts(64) == [1, 2, 4, MAX_TUNING_THREADS]
+
+def test_grid_is_small(monkeypatch):
+    monkeypatch.setattr(ocr_autotuner.os, "cpu_count", lambda: 64)
+    grid = tuning_grid("paddle")
+    assert len(grid) <= 8
+    assert all(options["enable_mkldnn"] for options in grid)
+    assert all("enable_mkldnn" not in options for options in tuning_grid("onnx"))
+
+def test_throughput_counts_workers_that_fit(monkeypatch):
+    monkeypatch.setattr(ocr_autotuner, "max_worker_count", lambda threads: max(1, 16 // threads))
+    # 16 threads is faster per frame but leaves room for a single worker
+    assert throughput(40, 4, workers=4) > throughput(25, 16, workers=4)
+    assert throughput(25, 16, workers=1) > throughput(40, 4, workers=1)
+
+def test_autotune_picks_the_best_throughput(monkeypatch):
+    monkeypatch.setattr(ocr_autotuner.os, "cpu_count", lambda: 16)
+    monkeypatch.setattr(ocr_autotuner, "max_worker_count", lambda threads: max(1, 16 // threads))
+    monkeypatch.setattr(ocr_autotuner, "synthetic_frames", lambda: [])
+    benchmarked = []
+
+    def fake_benchmark(backend, options, frames, runs, precision):
+        benchmarked.append(options)
+        # Latency falls with more threads, MKL-DNN off is slower
+        ms = 100.0 / options["cpu_threads"] ** 0.5 + (0 if options["enable_mkldnn"] else 5)
+        return ms - options["rec_batch_num"] * 0.1
+
+    monkeypatch.setattr(ocr_autotuner, "benchmark", fake_benchmark)
+    tuning = autotune("paddle", workers=4)
+
+    assert tuning["options"] == {"cpu_threads": 4, "rec_batch_num": 16, "enable_mkldnn": True}
+    assert tuning["workers"] == 4
+    # Phase 2 only tries MKL-DNN off for the best configuration
+    assert len(benchmarked) == len(tuning_grid("paddle")) + 1
+    assert benchmarked[-1] == {"cpu_threads": 4, "rec_batch_num": 16, "enable_mkldnn": False}
+
+def test_failures_are_recorded_per_machine(tmp_path, monkeypatch):
+    from ocr_autotuner import load_tuning, save_tuning, save_tuning_failure, tuning_failed
+    path = str(tmp_path / "ocr_tuning.json")
+    save_tuning_failure(path, "paddle", "no model")
+
+    assert tuning_failed(path, "paddle")
+    assert load_tuning(path, "paddle") is None
+    assert not tuning_failed(path, "onnx")
+
+    # Another machine tunes again
+    monkeypatch.setattr(ocr_autotuner, "hardware_fingerprint", lambda: "other")
+    assert not tuning_failed(path, "paddle")
+
+    # A later successful run (e.g. the script) replaces the failure
+    save_tuning(path, "paddle", {"options": {"cpu_threads": 4}})
+    assert load_tuning(path, "paddle") == {"cpu_threads": 4}
+    assert not tuning_failed(path, "paddle")
+
+def test_tuning_process_records_a_failure(tmp_path, monkeypatch):
+    from ocr_autotuner import run_tuning_process, tuning_failed
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("No OCR configuration could be benchmarked")
+
+    monkeypatch.setattr(ocr_autotuner, "autotune", broken)
+    path = str(tmp_path / "ocr_tuning.json")
+    run_tuning_process("paddle", "fp32", path)
+    assert tuning_failed(path, "paddle")
@@ -0,0 +1,60 @@
+import json
+from ocr_cache import OCRResultCache
+
+def test_lru_eviction():
+    cache = OCRResultCache(max_entries=2)
+    cache.put("a", "Defense", 0.9)
+    cache.put("b", "Crit. DMG", 0.9)
+    assert cache.get("a") == ("Defense", 0.9)
+    cache.put("c", "+400", 0.9)
+    assert cache.get("b") is None
+    assert cache.evictions == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_low_confidence_results_are_not_cached():
+    cache = OCRResultCache(min_confidence=0.8)
+    cache.put("a", "Defens", 0.5)
+    assert cache.get("a") is None
+
+def test_save_and_load_round_trip(tmp_path):
+    path = tmp_path / "ocr_cache.json"
+    cache = OCRResultCache(path=str(path), profile="paddle/fp32/raw")
+    cache.put("a", "Defense", 0.9)
+    cache.put("b", "+400", 0.95)
+    assert cache.save()
+
+    loaded = OCRResultCache(path=str(path), profile="paddle/fp32/raw")
+    assert loaded.load()
+    assert list(loaded.entries.items()) == [("a", ("Defense", 0.9)), ("b", ("+400", 0.95))]
+
+def test_corrupt_file_is_ignored(tmp_path):
+    path = tmp_path / "ocr_cache.json"
+    cache = OCRResultCache(path=str(path))
+    for content in ["{trunc", "[]", '{"profiles": []}', '{"entries": 5}']:
+        path.write_text(content, encoding="utf-8")
+        assert not cache.load()
+    assert not cache.entries
+
+def test_malformed_entries_are_skipped(tmp_path):
+    path = tmp_path / "ocr_cache.json"
+    entries = [["a", ["Defense", 0.9]], ["b"], "xy", ["c", ["+400"]], ["d", [3, 0.9]], 7, ["e", ["+12%", 1]]]
+    path.write_text(json.dumps({"profiles": {"default": entries, "other": "oops"}}), encoding="utf-8")
+    cache = OCRResultCache(path=str(path))
+    assert cache.load()
+    assert list(cache.entries.items()) == [("a", ("Defense", 0.9)), ("e", ("+12%", 1.0))]
+
+def test_profiles_are_kept_apart(tmp_path):
+    path = tmp_path / "ocr_cache.json"
+    cache = OCRResultCache(path=str(path), profile="paddle/fp32/raw")
+    cache.put("a", "Defense", 0.9)
+    cache.set_profile("onnx/int8/raw")
+    assert cache.get("a") is None
+    cache.put("a", "Defens", 0.85)
+    assert cache.save()
+
+    loaded = OCRResultCache(path=str(path), profile="paddle/fp32/raw")
+    assert loaded.load()
+    assert loaded.get("a") == ("Defense", 0.9)
+    loaded.set_profile("onnx/int8/raw")
+    assert loaded.get("a") == ("Defens", 0.85)
+    assert loaded.stored_entries() == 2
@@ -0,0 +1,79 @@
+import pytest
+from ocr_engine_manager import OCREngineManager
+
+def test_engine_is_not_switched_while_held():
+    manager = OCREngineManager(backend="paddle")
+    owner = object()
+    manager.hold(owner)
+    with pytest.raises(RuntimeError):
+        manager.set_backend("onnx")
+    with pytest.raises(RuntimeError):
+        manager.set_precision("int8")
+    assert (manager.backend, manager.precision) == ("paddle", None)
+
+    manager.release(owner)
+    manager.set_backend("onnx")
+    manager.set_precision("int8")
+    assert (manager.backend, manager.precision) == ("onnx", "int8")
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        OCREngineManager().set_backend("tesseract")
+
+@pytest.fixture
+def tuning_path(monkeypatch, tmp_path):
+    import ocr_engine_manager
+    path = str(tmp_path / "ocr_tuning.json")
+    monkeypatch.setattr(ocr_engine_manager, "TUNING_PATH", path)
+    return path
+
+def test_tuning_waits_for_a_loaded_engine_and_idle_automation(monkeypatch, tuning_path):
+    manager = OCREngineManager()
+    started = []
+    monkeypatch.setattr(manager, "start_tuning", started.append)
+
+    # Not tuned yet: the engine loads with the default settings
+    assert manager.tuned_options() is None
+    manager.maybe_start_tuning()
+    assert started == []
+
+    manager.engine = object()
+    manager.loaded_precision = "fp32"
+    owner = object()
+    manager.hold(owner)
+    manager.maybe_start_tuning()
+    assert started == []
+
+    manager.release(owner)
+    assert started == ["fp32"]
+
+def test_failed_tuning_is_not_restarted(monkeypatch, tuning_path):
+    from ocr_autotuner import save_tuning_failure
+    save_tuning_failure(tuning_path, "paddle", "out of memory")
+    manager = OCREngineManager(backend="paddle")
+    manager.engine = object()
+    started = []
+    monkeypatch.setattr(manager, "start_tuning", started.append)
+
+    manager.maybe_start_tuning()
+    assert started == []
+
+class FakeProcess:
+    def __init__(self):
+        self.alive = True
+
+    def is_alive(self):
+        return self.alive
+
+    def terminate(self):
+        self.alive = False
+
+def test_starting_automation_aborts_tuning(tuning_path):
+    import threading
+    manager = OCREngineManager()
+    manager.tuning_process = FakeProcess()
+    manager.tuning_aborted = threading.Event()
+
+    manager.hold(object())
+    assert not manager.tuning_process.is_alive()
+    assert manager.tuning_aborted.is_set()
@@ -0,0 +1,32 @@
+import threading
+from ocr_worker_pool import OCRWorkerPool
+
+class FakeWorker:
+    def is_alive(self):
+        return True
+
+class FakeBatcher:
+    def __init__(self):
+        self.items = []
+
+    def submit(self, item):
+        self.items.append(item)
+        return "merged"
+
+def pool_with_workers(count):
+    # Bypass __init__: no worker processes are started
+    pool = OCRWorkerPool.__new__(OCRWorkerPool)
+    pool._lock = threading.Lock()
+    pool.workers = [FakeWorker() for _ in range(count)]
+    pool.batcher = FakeBatcher()
+    pool.readtext = lambda image: "direct"
+    return pool
+
+def test_single_worker_merges_frames():
+    pool = pool_with_workers(1)
+    assert pool.readtext_merged("frame") == "merged"
+
+def test_several_workers_read_in_parallel():
+    pool = pool_with_workers(3)
+    assert pool.readtext_merged("frame") == "direct"
+    assert pool.batcher.items == []
@@ -0,0 +1,203 @@
+import asyncio
+import numpy as np
+from reroll_engine import (RerollEngine, StatePolicy, STATE_ORDER, APPLY, CAPTURE, RECOGNIZE, CHANGE,
+                           SUCCESS, STOPPED, FAILED)
+
+def panel(seed):
+    """Distinct BGR frame per seed"""
+    return np.full((24, 48, 3), seed * 40 % 256, dtype=np.uint8)
+
+class FakeDetector:
+    def __init__(self, session):
+        self.session = session
+        self.last_wait_changed = True
+
+    def reset(self):
+        pass
+
+    async def capture_baseline(self):
+        pass
+
+    async def wait_for_settle(self, timeout, keep_running):
+        self.last_wait_changed = self.session.panel_changes
+        return self.session.panel_changes, panel(self.session.shown), None
+
+class FakeReader:
+    def __init__(self, warm_p95_ms=None):
+        self.warm_p95_ms = warm_p95_ms
+
+    def latency_stats(self):
+        return {"warm_p95_ms": self.warm_p95_ms}
+
+class FakeStatsRecorder:
+    def __init__(self):
+        self.rolls = []
+
+    def submit(self, roll_number, results):
+        self.rolls.append(roll_number)
+
+class FakeSession:
+    def __init__(self, frames, results=None, stop_after=None, success_on=None):
+        """
+        Args:
+            frames: Frames the panel shows after each Apply, in order (the last one repeats)
+            results: OCR results returned for every frame
+            stop_after: Stop automation after this many decisions
+            success_on: Frame seed at which the desired stats are found
+        """
+        self.frames = list(frames)
+        self.results = results if results is not None else [([[0, 0], [1, 0], [1, 1], [0, 1]], "x", 0.9)]
+        self.stop_after = stop_after
+        self.success_on = success_on
+        self.running = True
+        self.panel_changes = True
+        self.apply_settle_timeout = 0.05
+        self.change_settle_timeout = 0.05
+        self.apply_button_coords = (1, 1)
+        self.change_button_coords = (2, 2)
+        self.settle_detector = FakeDetector(self)
+        self.stats_recorder = FakeStatsRecorder()
+        self.reader = FakeReader()
+        self.hang_clicks = 0
+        self.hang_ocr = 0
+        self.ocr_delay = 10
+        self.ocr_calls = 0
+        self.failing_clicks = 0
+        self.clicks = []
+        self.recognized = []
+        self.decisions = 0
+        self.shown = 0
+
+    def update_status(self, message):
+        pass
+
+    async def click(self, coords):
+        if self.hang_clicks:
+            self.hang_clicks -= 1
+            await asyncio.sleep(10)
+        self.clicks.append(coords)
+        if self.failing_clicks:
+            self.failing_clicks -= 1
+            return False
+        # Every Apply shows the next option (the last one repeats)
+        if coords == self.apply_button_coords:
+            self.shown = self.frames.pop(0) if len(self.frames) > 1 else self.frames[0]
+        return True
+
+    async def capture_frame(self):
+        return panel(self.shown)
+
+    async def recognize(self, frame):
+        self.ocr_calls += 1
+        if self.hang_ocr:
+            self.hang_ocr -= 1
+            await asyncio.sleep(self.ocr_delay)
+        self.recognized.append(int(frame[0, 0, 0]))
+        return self.results
+
+    def get_target_stat_names(self, desired_stats):
+        return {"Defense"}
+
+    def resolve_target_stats(self, results, target_stats):
+        return {}
+
+    def check_desired_stats(self, current_stats, desired_stats):
+        self.decisions += 1
+        if self.stop_after is not None and self.decisions >= self.stop_after:
+            self.running = False
+        return self.success_on is not None and self.shown == self.success_on
+
+def fast_policies(**overrides):
+    """Short budgets so hung calls time out quickly"""
+    policies = {state: StatePolicy(timeout=0.1, max_retries=1) for state in STATE_ORDER}
+    policies.update(overrides)
+    return policies
+
+def run(engine):
+    return asyncio.run(engine.run(None))
+
+def test_roll_until_success():
+    session = FakeSession([1, 2, 3], success_on=3)
+    engine = RerollEngine(session, fast_policies())
+    assert run(engine) == SUCCESS
+    assert engine.roll_count == 3
+    assert session.stats_recorder.rolls == [1, 2, 3]
+
+def test_hung_click_times_out_and_is_retried():
+    session = FakeSession([1, 2], success_on=2)
+    session.hang_clicks = 1
+    engine = RerollEngine(session, fast_policies())
+    assert run(engine) == SUCCESS
+    # The initial Change hung, timed out and was clicked again
+    assert engine.stats[CHANGE].timeouts == 1
+    assert engine.stats[CHANGE].retries == 1
+
+def test_slow_ocr_is_waited_for_on_the_same_frame():
+    session = FakeSession([1, 2], success_on=1)
+    session.hang_ocr = 1
+    session.ocr_delay = 0.35
+    engine = RerollEngine(session, fast_policies())
+    assert run(engine) == SUCCESS
+    # The call outlived several budgets; it was neither repeated nor given up on
+    assert engine.stats[RECOGNIZE].timeouts >= 3
+    assert session.ocr_calls == 1
+    assert session.recognized == [40]
+    assert engine.stats[CAPTURE].count == 1
+    # Only the initial Change, never a Change on the unread option
+    assert session.clicks.count(session.change_button_coords) == 1
+
+def test_ocr_that_never_answers_fails_without_changing_the_roll():
+    session = FakeSession([1, 2])
+    session.hang_ocr = 1
+    engine = RerollEngine(session, fast_policies(), max_consecutive_failures=2)
+    assert run(engine) == FAILED
+    assert session.ocr_calls == 1
+    assert session.clicks.count(session.change_button_coords) == 1
+
+def test_recognize_budget_follows_warm_latency():
+    session = FakeSession([1])
+    engine = RerollEngine(session, fast_policies())
+    assert engine.state_timeout(RECOGNIZE) == 0.1
+    session.reader.warm_p95_ms = 100.0
+    assert abs(engine.state_timeout(RECOGNIZE) - 0.4) < 1e-9
+    assert engine.state_timeout(CAPTURE) == 0.1
+
+def test_clicks_that_keep_failing_give_up():
+    session = FakeSession([1])
+    session.failing_clicks = 1000
+    engine = RerollEngine(session, fast_policies(**{CHANGE: StatePolicy(timeout=0.1, max_retries=1)}),
+                          max_consecutive_failures=3)
+    assert run(engine) == FAILED
+    assert engine.stats[CHANGE].failures == 3
+    assert engine.stats[APPLY].count == 0
+
+def test_repeated_result_after_a_redraw_is_recognized():
+    # The panel redrew but showed the same option twice - both rolls count
+    session = FakeSession([1, 1, 2], success_on=2)
+    engine = RerollEngine(session, fast_policies())
+    assert run(engine) == SUCCESS
+    assert engine.duplicate_frames == 0
+    assert session.recognized == [40, 40, 80]
+    assert session.stats_recorder.rolls == [1, 2, 3]
+
+def stale_after_first_roll(session):
+    """Render wait that only sees a change the first time the panel is shown"""
+    seen = set()
+
+    async def wait_for_settle(timeout, keep_running):
+        changed = session.shown not in seen
+        seen.add(session.shown)
+        session.settle_detector.last_wait_changed = changed
+        return changed, panel(session.shown), None
+    return wait_for_settle
+
+def test_stale_frame_is_reclicked_without_ocr():
+    # The render wait never saw the panel change, so the frame is the previous roll's
+    session = FakeSession([1], stop_after=2)
+    engine = RerollEngine(session, fast_policies(**{APPLY: StatePolicy(timeout=0.1)}),
+                          max_duplicate_reclicks=1)
+    session.settle_detector.wait_for_settle = stale_after_first_roll(session)
+    assert run(engine) == STOPPED
+    assert engine.duplicate_frames == 1
+    # Recognized on the first roll, skipped once, then recognized anyway
+    assert session.recognized == [40, 40]
@@ -0,0 +1,50 @@
+import asyncio
+import numpy as np
+import reroll_session
+from reroll_engine import STOPPED
+from reroll_session import RerollSession
+
+class FakeAutomator:
+    def __init__(self):
+        self.finished = []
+
+    def update_status(self, message):
+        pass
+
+    def on_session_finished(self, session, result):
+        self.finished.append(result)
+
+def engine_ending_with(ocr_pending):
+    class FakeEngine:
+        def __init__(self, session):
+            pass
+
+        async def run(self, desired_stats):
+            return STOPPED
+
+        def ocr_pending(self):
+            return ocr_pending
+    return FakeEngine
+
+def session_with_frames():
+    session = RerollSession(FakeAutomator(), None, (1, 1), (2, 2))
+    session.screen_capture.frames = [np.zeros((4, 4, 3), dtype=np.uint8) for _ in range(2)]
+    return session
+
+def test_capture_buffers_read_by_running_ocr_are_not_reused(monkeypatch):
+    monkeypatch.setattr(reroll_session, "RerollEngine", engine_ending_with(ocr_pending=True))
+    session = session_with_frames()
+    frames = list(session.screen_capture.frames)
+
+    asyncio.run(session.run())
+    assert session.automator.finished == [STOPPED]
+    assert all(new is not old for new, old in zip(session.screen_capture.frames, frames))
+    assert [frame.shape for frame in session.screen_capture.frames] == [(4, 4, 3), (4, 4, 3)]
+
+def test_capture_buffers_are_kept_when_ocr_is_done(monkeypatch):
+    monkeypatch.setattr(reroll_session, "RerollEngine", engine_ending_with(ocr_pending=False))
+    session = session_with_frames()
+    frames = list(session.screen_capture.frames)
+
+    asyncio.run(session.run())
+    assert all(new is old for new, old in zip(session.screen_capture.frames, frames))
@@ -0,0 +1,53 @@
+import numpy as np
+from paddle_ocr_implementation import SelectiveReOCR, PaddleOCRWrapper
+
+def item(top, text, confidence, left=0, right=40):
+    box = [[left, top], [right, top], [right, top + 10], [left, top + 10]]
+    return (box, text, confidence)
+
+def test_only_middle_confidence_lines_are_reread_enlarged():
+    image = np.zeros((60, 50, 3), dtype=np.uint8)
+    items = [item(0, "Crit. DMG", 0.9), item(15, "Defense Rte", 0.4), item(30, "noise", 0.1)]
+    seen = []
+
+    def recognize_crops(crops):
+        seen.extend(crops)
+        return [("Defense Rate", 0.8)]
+
+    reocr = SelectiveReOCR(upscale=2.0)
+    result = reocr.apply(image, items, recognize_crops)
+
+    # The crop list goes to the recognizer as-is, no canvas
+    assert [crop.shape for crop in seen] == [(20, 80, 3)]
+    assert [text for _, text, _ in result] == ["Crit. DMG", "Defense Rate", "noise"]
+    assert (reocr.rescued_lines, reocr.frames_with_rescues, reocr.frames) == (1, 1, 1)
+
+def test_weaker_second_reading_is_ignored():
+    image = np.zeros((30, 50, 3), dtype=np.uint8)
+    reocr = SelectiveReOCR()
+    result = reocr.apply(image, [item(0, "HP", 0.45)], lambda crops: [("H", 0.4)])
+
+    assert result[0][1:] == ("HP", 0.45)
+    assert (reocr.lines, reocr.rescued_lines, reocr.frames_with_rescues) == (1, 0, 0)
+
+def test_frame_without_candidates_skips_the_recognizer():
+    reocr = SelectiveReOCR()
+    items = [item(0, "HP", 0.9)]
+
+    def recognize_crops(crops):
+        raise AssertionError("nothing to re-read")
+
+    assert reocr.apply(np.zeros((20, 50, 3), dtype=np.uint8), items, recognize_crops) == items
+    assert (reocr.frames, reocr.frames_with_candidates) == (1, 0)
+
+def test_warm_up_frames_are_not_counted():
+    wrapper = PaddleOCRWrapper.__new__(PaddleOCRWrapper)
+    wrapper.reocr = SelectiveReOCR()
+    wrapper.is_healthy = lambda: True
+
+    def readtext(frame):
+        wrapper.reocr.apply(frame, [item(0, "HP", 0.45)], lambda crops: [("HP", 0.9)])
+
+    wrapper.readtext = readtext
+    assert wrapper.warm_up(runs=2)
+    assert (wrapper.reocr.frames, wrapper.reocr.lines, wrapper.reocr.rescued_lines) == (0, 0, 0)
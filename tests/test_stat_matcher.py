@@ -0,0 +1,136 @@
+from conftest import box
+from stat_matcher import StatMatcher, pair_rows
+
+def brute_force_pairs(stat_ys, value_ys, max_distance):
+    """Closest-first one-to-one assignment over every (stat, value) pair"""
+    candidates = sorted((abs(stat_y - value_y), stat_index, value_index)
+                        for stat_index, stat_y in enumerate(stat_ys)
+                        for value_index, value_y in enumerate(value_ys)
+                        if abs(stat_y - value_y) < max_distance)
+    pairs = []
+    paired_stats, paired_values = set(), set()
+    for distance, stat_index, value_index in candidates:
+        if stat_index in paired_stats or value_index in paired_values:
+            continue
+        paired_stats.add(stat_index)
+        paired_values.add(value_index)
+        pairs.append((stat_index, value_index, distance))
+    return pairs
+
+def test_pair_rows_is_one_to_one():
+    # Two stats around a single value: only the closer one gets it
+    assert pair_rows([0, 20], [18]) == [(1, 0, 2)]
+
+def test_pair_rows_respects_the_window():
+    assert pair_rows([0], [50]) == []
+    assert pair_rows([0], [49]) == [(0, 0, 49)]
+
+def test_pair_rows_matches_brute_force():
+    import random
+    rng = random.Random(7)
+    for _ in range(300):
+        stat_ys = [rng.uniform(0, 300) for _ in range(rng.randint(0, 6))]
+        value_ys = [rng.uniform(0, 300) for _ in range(rng.randint(0, 6))]
+        expected = brute_force_pairs(stat_ys, value_ys, 50)
+        assert sorted(pair_rows(stat_ys, value_ys)) == sorted(expected)
+
+def test_parse_pairs_each_row():
+    matcher = StatMatcher()
+    items = [
+        (box(20), "Defense Rate", 0.9), (box(21), "+400", 0.9),
+        (box(60), "Crit. DMG", 0.9), (box(61), "+12%", 0.9),
+        (box(100), "Arrival Skill Cool Time decreased. 12s", 0.9),
+    ]
+    assert matcher.parse(items) == {"Defense Rate": 400, "Crit. DMG": 12,
+                                    "Arrival Skill Cool Time decreased.": 12}
+
+def test_target_does_not_take_a_neighbouring_value():
+    # Defense lost its value to OCR; the value below belongs to Defense Rate
+    matcher = StatMatcher()
+    items = [(box(20), "Defense", 0.9), (box(50), "Defense Rate", 0.9), (box(50), "+400", 0.9)]
+    assert matcher.parse(items) == {"Defense Rate": 400}
+    assert matcher.parse(items, target_stats={"Defense"}) == {}
+    assert matcher.parse(items, target_stats={"Defense Rate"}) == {"Defense Rate": 400}
+
+def test_rows_carry_a_confidence():
+    matcher = StatMatcher()
+    rows = matcher.parse_rows([(box(20), "Defense Rate", 0.9), (box(22), "+400", 0.8)])
+    assert len(rows) == 1
+    stat_name, value, confidence = rows[0]
+    assert (stat_name, value) == ("Defense Rate", 400)
+    assert 0 < confidence < 0.9 * 0.8
+
+def test_char_count_matrix_matches_calculate_string_similarity():
+    import random
+    from stat_matcher import CharCountMatrix, calculate_string_similarity, normalize_text
+    from stats_data import get_all_skills
+
+    names = [normalize_text(name) for name in get_all_skills()]
+    rng = random.Random(11)
+    alphabet = "abcdefghijklmnoprstuvwxyz+%0123456789#"
+    texts = ["", "x", names[0], names[3] + "+16%"]
+    for _ in range(100):
+        name = rng.choice(names)
+        chars = list(name)
+        for _ in range(rng.randint(0, 4)):
+            position = rng.randrange(len(chars) + 1)
+            if chars and rng.random() < 0.5:
+                del chars[min(position, len(chars) - 1)]
+            else:
+                chars.insert(position, rng.choice(alphabet))
+        texts.append("".join(chars))
+
+    matrix = CharCountMatrix(names)
+    scores = matrix.similarity(texts)
+    for row, text in enumerate(texts):
+        for column, name in enumerate(names):
+            assert abs(scores[row, column] - calculate_string_similarity(text, name)) < 1e-9, (text, name)
+
+def test_charcount_scoring_picks_the_first_best_name():
+    from stat_matcher import calculate_string_similarity, normalize_text
+    matcher = StatMatcher(scoring="charcount")
+    names = list(matcher.normalized_stats)
+    for text in ["Crit. DMG", "Defense Rte", "lgnore Penetraton", "+16%", "HP Auto Hea1"]:
+        norm_text = normalize_text(text)
+        scores = [calculate_string_similarity(norm_text, name) for name in names]
+        best = max(scores)
+        expected = (matcher.normalized_stats[names[scores.index(best)]], best) if best > 0 else (None, 0.0)
+        stat_name, similarity = matcher.resolve(text)
+        assert stat_name == expected[0] and abs(similarity - expected[1]) < 1e-9
+
+def full_scan(matcher, norm_text):
+    """Edit similarity of a normalized line against every catalog name, the first best name winning ties"""
+    from stat_matcher import edit_similarity
+    best_match, best_similarity = None, 0.0
+    for norm_stat, stat_name in matcher.normalized_stats.items():
+        similarity = 1.0 if norm_text == norm_stat else edit_similarity(norm_text, norm_stat, matcher.threshold)
+        if similarity > best_similarity:
+            best_match, best_similarity = stat_name, similarity
+    return best_match, best_similarity
+
+def test_trigram_resolver_matches_a_full_scan():
+    import random
+    from stat_matcher import normalize_text
+    matcher = StatMatcher()
+    names = list(matcher.normalized_stats)
+    rng = random.Random(23)
+    confusions = "il1o0rnmae5s"
+    for _ in range(300):
+        chars = list(rng.choice(names))
+        for _ in range(rng.randint(0, 3)):
+            position = rng.randrange(len(chars))
+            edit = rng.random()
+            if edit < 0.4:
+                chars[position] = rng.choice(confusions)
+            elif edit < 0.7:
+                del chars[position]
+            else:
+                chars.insert(position, rng.choice(confusions))
+        norm_text = normalize_text("".join(chars))
+        assert matcher.resolve_indexed(norm_text) == full_scan(matcher, norm_text), norm_text
+
+def test_trigram_resolver_rejects_values():
+    matcher = StatMatcher()
+    for text in ["+16%", "1,200", "12s"]:
+        stat_name, similarity = matcher.resolve(text)
+        assert stat_name is None or similarity < matcher.threshold
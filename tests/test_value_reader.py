@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from value_reader import parse_value
+from paddle_ocr_implementation import recognize_line_crops
+
+@pytest.mark.parametrize("text, value", [
+    ("+16%", 16),
+    ("12s", 12),
+    ("+400", 400),
+    ("1,200", 1200),
+    ("+1.200", 1200),
+    ("+1,234,567", 1234567),
+    ("Defense Rate +60", 60),
+])
+def test_parse_value(text, value):
+    assert parse_value(text) == value
+
+@pytest.mark.parametrize("text, value", [
+    ("1.2345", 1),
+    ("1.20", 1),
+    ("+16 20", 16),
+])
+def test_separator_needs_exactly_three_digits(text, value):
+    assert parse_value(text) == value
+
+@pytest.mark.parametrize("text, value", [
+    ("15 120s", 15),
+    ("Crit DMG 12 400", 12),
+    ("1 200", 1),
+])
+def test_space_split_numbers_stay_apart(text, value):
+    assert parse_value(text) == value
+
+def test_text_without_a_number():
+    assert parse_value("Crit. DMG") is None
+
+class FakeValueReader:
+    def __init__(self):
+        self.read_counts = []
+
+    def __len__(self):
+        return 1
+
+    def read(self, crops):
+        self.read_counts.append(len(crops))
+        return [("+16%", 0.99) for _ in crops]
+
+    def learn(self, crop, text, confidence):
+        pass
+
+def test_glyph_reader_only_reads_value_slots():
+    image = np.zeros((20, 100, 3), dtype=np.uint8)
+    line_boxes = [(0, 0, 60, 20), (60, 0, 100, 20)]
+    value_reader = FakeValueReader()
+
+    def recognize_boxes(image, boxes):
+        return [("Crit. DMG", 0.97) for _ in boxes]
+
+    items = recognize_line_crops(image, line_boxes, recognize_boxes, value_reader=value_reader,
+                                 value_slots=[False, True])
+
+    assert [text for _, text, _ in items] == ["Crit. DMG", "+16%"]
+    assert value_reader.read_counts == [1]
@@ -1,6 +1,8 @@
 """
 UI module for the Skill Reroll Automation tool.
 Simplified version with single offensive and defensive stat fields.
+Several game clients can be configured (each with its own window, coordinates, region and targets)
+and rolled at once.
 """
 
 import tkinter as tk
@@ -8,10 +10,10 @@ from tkinter import ttk, messagebox
 import keyboard
 import mouse
 import threading
-import re
 import stats_data
 from game_connector import GameConnector
 from automation import SkillRerollAutomator
+from value_reader import parse_value
 
 class SkillRerollUI:
     def __init__(self, root):
@@ -31,15 +33,23 @@ class SkillRerollUI:
         self.status_var = None
         self.running = False
 
+        # Game windows found by the last refresh as (handle, title), and the configured clients
+        self.game_windows = []
+        self.clients = []
+
         # Create game connector and automator
         self.game_connector = GameConnector(self.update_status)
-        self.automator = SkillRerollAutomator(self.game_connector, self.update_status)
+        self.automator = SkillRerollAutomator(self.game_connector, self.update_status, self.show_dialog)
 
         # Set up kill switch (Escape key)
         self.setup_kill_switch()
 
         # Create UI
         self.create_ui()
+        self.refresh_game_windows()
+
+        # Load and warm the OCR engine in the background while the user sets things up
+        self.automator.preload_ocr()
 
     def update_status(self, message):
         """Update the status display and log"""
@@ -62,6 +72,10 @@ class SkillRerollUI:
             self.log_text.see(tk.END)  # Auto-scroll to the end
             self.log_text.config(state=tk.DISABLED)
 
+    def show_dialog(self, kind, title, message):
+        """Show a message box on the Tk main thread (safe to call from any thread)"""
+        self.root.after(0, lambda: getattr(messagebox, kind)(title, message))
+
     def setup_kill_switch(self):
         """Set up a global hotkey (ESC) to stop the automation"""
         # Register the ESC key as a kill switch
@@ -98,23 +112,31 @@ class SkillRerollUI:
         coord_frame = ttk.Frame(main_frame)
         coord_frame.grid(row=1, column=0, columnspan=4, sticky=tk.W, pady=5)
 
+        # Game window the coordinates below are set for
+        ttk.Label(coord_frame, text="Game Window:").grid(row=0, column=0, sticky=tk.W)
+        self.window_var = tk.StringVar()
+        self.window_dropdown = ttk.Combobox(coord_frame, width=24, textvariable=self.window_var, state="readonly")
+        self.window_dropdown.grid(row=0, column=1, sticky=tk.W, padx=5)
+        self.window_dropdown.bind("<<ComboboxSelected>>", self.select_game_window)
+        ttk.Button(coord_frame, text="Refresh", command=self.refresh_game_windows).grid(row=0, column=2, padx=5)
+
         # Apply button coordinates
-        ttk.Label(coord_frame, text="Apply Button:").grid(row=0, column=0, sticky=tk.W)
+        ttk.Label(coord_frame, text="Apply Button:").grid(row=1, column=0, sticky=tk.W)
         self.apply_coord_var = tk.StringVar(value="Not set")
-        ttk.Label(coord_frame, textvariable=self.apply_coord_var).grid(row=0, column=1, sticky=tk.W, padx=5)
-        ttk.Button(coord_frame, text="Set", command=self.set_apply_button).grid(row=0, column=2, padx=5)
+        ttk.Label(coord_frame, textvariable=self.apply_coord_var).grid(row=1, column=1, sticky=tk.W, padx=5)
+        ttk.Button(coord_frame, text="Set", command=self.set_apply_button).grid(row=1, column=2, padx=5)
 
         # Change button coordinates
-        ttk.Label(coord_frame, text="Change Button:").grid(row=1, column=0, sticky=tk.W)
+        ttk.Label(coord_frame, text="Change Button:").grid(row=2, column=0, sticky=tk.W)
         self.change_coord_var = tk.StringVar(value="Not set")
-        ttk.Label(coord_frame, textvariable=self.change_coord_var).grid(row=1, column=1, sticky=tk.W, padx=5)
-        ttk.Button(coord_frame, text="Set", command=self.set_change_button).grid(row=1, column=2, padx=5)
+        ttk.Label(coord_frame, textvariable=self.change_coord_var).grid(row=2, column=1, sticky=tk.W, padx=5)
+        ttk.Button(coord_frame, text="Set", command=self.set_change_button).grid(row=2, column=2, padx=5)
 
         # Detection region coordinates
-        ttk.Label(coord_frame, text="Detection Region:").grid(row=2, column=0, sticky=tk.W)
+        ttk.Label(coord_frame, text="Detection Region:").grid(row=3, column=0, sticky=tk.W)
         self.detection_region_var = tk.StringVar(value="Not set")
-        ttk.Label(coord_frame, textvariable=self.detection_region_var).grid(row=2, column=1, sticky=tk.W, padx=5)
-        ttk.Button(coord_frame, text="Set", command=self.set_detection_region).grid(row=2, column=2, padx=5)
+        ttk.Label(coord_frame, textvariable=self.detection_region_var).grid(row=3, column=1, sticky=tk.W, padx=5)
+        ttk.Button(coord_frame, text="Set", command=self.set_detection_region).grid(row=3, column=2, padx=5)
 
         # Offensive stats section
         ttk.Label(main_frame, text="Offensive Stat", font=("Arial", 10, "bold")).grid(
@@ -168,21 +190,33 @@ class SkillRerollUI:
         self.def_var_dropdown = ttk.Combobox(main_frame, width=8, textvariable=self.def_var, state="readonly")
         self.def_var_dropdown.grid(row=5, column=3, padx=5)
 
+        # Game clients section: the window, coordinates, region and stats above, saved per client
+        ttk.Label(main_frame, text="Game Clients (rolled together)", font=("Arial", 10, "bold")).grid(
+            row=6, column=0, columnspan=4, sticky=tk.W, pady=(10, 5))
+
+        clients_frame = ttk.Frame(main_frame)
+        clients_frame.grid(row=7, column=0, columnspan=4, sticky=(tk.W, tk.E))
+        self.clients_list = tk.Listbox(clients_frame, height=3, width=48, font=("Consolas", 9))
+        self.clients_list.grid(row=0, column=0, rowspan=2, sticky=(tk.W, tk.E))
+        clients_frame.columnconfigure(0, weight=1)
+        ttk.Button(clients_frame, text="Add Client", command=self.add_client).grid(row=0, column=1, padx=5)
+        ttk.Button(clients_frame, text="Remove", command=self.remove_client).grid(row=1, column=1, padx=5)
+
         # Status section
         self.status_var = tk.StringVar(value="Ready")
         ttk.Label(main_frame, textvariable=self.status_var, font=("Arial", 9)).grid(
-            row=6, column=0, columnspan=4, sticky=tk.W, pady=(10, 5))
+            row=8, column=0, columnspan=4, sticky=tk.W, pady=(10, 5))
 
         # Log section
         ttk.Label(main_frame, text="Session Log", font=("Arial", 10, "bold")).grid(
-            row=7, column=0, columnspan=4, sticky=tk.W, pady=(10, 5))
+            row=9, column=0, columnspan=4, sticky=tk.W, pady=(10, 5))
 
         # Create a frame for the log with scrollbar
         log_frame = ttk.Frame(main_frame)
-        log_frame.grid(row=8, column=0, columnspan=4, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
+        log_frame.grid(row=10, column=0, columnspan=4, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
 
         # Configure the log frame to expand
-        main_frame.rowconfigure(8, weight=1)
+        main_frame.rowconfigure(10, weight=1)
         main_frame.columnconfigure(0, weight=1)
 
         # Create scrollbar
@@ -207,16 +241,16 @@ class SkillRerollUI:
         self.detailed_logging = tk.BooleanVar(value=False)
         detailed_check = ttk.Checkbutton(main_frame, text="Detailed logging",
                                         variable=self.detailed_logging)
-        detailed_check.grid(row=9, column=0, columnspan=2, sticky=tk.W)
+        detailed_check.grid(row=11, column=0, columnspan=2, sticky=tk.W)
 
         # Kill switch info
         kill_switch_label = ttk.Label(main_frame, text="Emergency Stop: Press ESC key anytime",
                                      foreground="red", font=("Arial", 9, "bold"))
-        kill_switch_label.grid(row=9, column=2, columnspan=2, sticky=tk.W)
+        kill_switch_label.grid(row=11, column=2, columnspan=2, sticky=tk.W)
 
         # Buttons
         button_frame = ttk.Frame(main_frame)
-        button_frame.grid(row=10, column=0, columnspan=4, pady=10)
+        button_frame.grid(row=12, column=0, columnspan=4, pady=10)
 
         # Start/Stop buttons
         self.start_button = ttk.Button(button_frame, text="Start", command=self.start_automation)
@@ -229,6 +263,44 @@ class SkillRerollUI:
         for child in main_frame.winfo_children():
             child.grid_configure(padx=5, pady=2)
 
+    def refresh_game_windows(self):
+        """List the open game windows so coordinates can be set for a specific client"""
+        try:
+            windows = GameConnector.find_game_windows()
+        except Exception as e:
+            self.update_status(f"Could not list game windows: {str(e)}")
+            windows = []
+
+        self.game_windows = []
+        for window in windows:
+            try:
+                self.game_windows.append((window.handle, window.window_text()))
+            except Exception:
+                continue
+        self.window_dropdown['values'] = [f"{title or 'Game'} ({handle})" for handle, title in self.game_windows]
+
+        # Keep the selected window if it is still open, otherwise take the only one there is
+        handles = [handle for handle, _ in self.game_windows]
+        if self.game_connector.window_handle in handles:
+            self.window_dropdown.current(handles.index(self.game_connector.window_handle))
+        elif len(self.game_windows) == 1:
+            self.window_dropdown.current(0)
+            self.select_game_window()
+        else:
+            self.window_var.set("")
+        self.update_status(f"Found {len(self.game_windows)} game window(s)")
+
+    def select_game_window(self, event=None):
+        """Attach the connector to the selected game window; coordinates and regions are set for it"""
+        index = self.window_dropdown.current()
+        if index < 0:
+            return
+        handle, title = self.game_windows[index]
+        if self.game_connector.connect_to_handle(handle):
+            self.update_status(f"Using game window {title or 'Game'} ({handle})")
+        else:
+            self.update_status("The selected game window is no longer available, press Refresh")
+
     def set_button_coords(self, button_type):
         """Record the coordinates of a game button"""
         self.update_status(f"Click on the {button_type} button in the game")
@@ -294,12 +366,12 @@ class SkillRerollUI:
 
 
 
-    def start_automation(self):
-        """Start the automation process"""
+    def collect_desired_stats(self):
+        """Desired stats dictionary from the stat fields, or None (after showing why) if they are incomplete"""
         # Check if at least one stat is specified
         if not self.off_stat.get() and not self.def_stat.get():
             messagebox.showerror("Error", "Please specify at least one stat to look for.")
-            return
+            return None
 
         # Prepare desired stats
         desired_stats = {
@@ -313,12 +385,11 @@ class SkillRerollUI:
             variation = self.off_var.get()
             if not variation:
                 messagebox.showerror("Error", f"Please select a variation for {stat_name}.")
-                return
+                return None
 
-            # Extract numeric value from the variation
-            value_match = re.search(r'(\d+)', variation)
-            if value_match:
-                off_val = int(value_match.group(1))
+            # Extract numeric value from the variation ("1,200" is 1200)
+            off_val = parse_value(variation)
+            if off_val is not None:
                 desired_stats['offensive'].append((stat_name, off_val, variation))
                 self.update_status(f"Looking for {stat_name} with variation {variation}")
 
@@ -328,18 +399,87 @@ class SkillRerollUI:
             variation = self.def_var.get()
             if not variation:
                 messagebox.showerror("Error", f"Please select a variation for {stat_name}.")
-                return
+                return None
 
-            # Extract numeric value from the variation
-            value_match = re.search(r'(\d+)', variation)
-            if value_match:
-                def_val = int(value_match.group(1))
+            # Extract numeric value from the variation ("1,200" is 1200)
+            def_val = parse_value(variation)
+            if def_val is not None:
                 desired_stats['defensive'].append((stat_name, def_val, variation))
                 self.update_status(f"Looking for {stat_name} with variation {variation}")
 
-        # Start the automation with detailed logging setting
+        return desired_stats
+
+    def add_client(self):
+        """Save the selected window with the current coordinates, region and stats as one game client"""
+        handle = self.game_connector.window_handle
+        if handle is None or not self.game_connector.is_connected():
+            messagebox.showerror("Error", "Please select the game window of this client first.")
+            return
+        if any(client['handle'] == handle for client in self.clients):
+            messagebox.showerror("Error", "This game window has already been added.")
+            return
+        if not self.apply_button_coords or not self.change_button_coords:
+            messagebox.showerror("Error", "Please set both Apply and Change button coordinates.")
+            return
+        desired_stats = self.collect_desired_stats()
+        if desired_stats is None:
+            return
+
+        client = {
+            'name': f"Client {len(self.clients) + 1}",
+            'handle': handle,
+            'apply': self.apply_button_coords,
+            'change': self.change_button_coords,
+            'region': self.detection_region,
+            'desired_stats': desired_stats,
+        }
+        self.clients.append(client)
+
+        targets = ", ".join(f"{name} {variation}" for kind in ('offensive', 'defensive')
+                            for name, _, variation in desired_stats[kind])
+        self.clients_list.insert(tk.END, f"{client['name']} ({handle}): {targets}")
+        self.update_status(f"Added {client['name']}: Apply {client['apply']}, Change {client['change']}, "
+                           f"region {client['region'] or 'whole window'}")
+
+    def remove_client(self):
+        """Remove the selected game client"""
+        selection = self.clients_list.curselection()
+        if not selection:
+            return
+        index = selection[0]
+        self.clients_list.delete(index)
+        client = self.clients.pop(index)
+        self.update_status(f"Removed {client['name']}")
+
+    def start_clients(self, detailed_mode):
+        """Start one session per configured game client, each on its own window"""
+        if not self.automator.clear_sessions():
+            return False
+        for client in self.clients:
+            connector = GameConnector(self.update_status)
+            if not connector.connect_to_handle(client['handle']):
+                messagebox.showerror("Error", f"The game window of {client['name']} is no longer available.")
+                self.automator.clear_sessions()
+                return False
+            self.automator.add_session(connector, client['apply'], client['change'], client['region'],
+                                       client['desired_stats'], client['name'])
+        return self.automator.start_sessions(detailed_mode)
+
+    def start_automation(self):
+        """Start the automation process: every configured client, or the current window alone"""
         detailed_mode = self.detailed_logging.get()
-        if self.automator.start(self.apply_button_coords, self.change_button_coords, desired_stats, detailed_mode):
+        if self.clients:
+            started = self.start_clients(detailed_mode)
+        else:
+            desired_stats = self.collect_desired_stats()
+            if desired_stats is None:
+                return
+
+            # Start the automation with detailed logging setting
+            started = self.automator.start(self.apply_button_coords, self.change_button_coords,
+                                           desired_stats, detailed_mode)
+
+        if started:
             self.running = True
             self.start_button.config(state=tk.DISABLED)
             self.stop_button.config(state=tk.NORMAL)
@@ -447,4 +587,13 @@ class SkillRerollUI:
         """Clean up resources when the window is closed"""
         # Unregister the hotkey to prevent it from persisting after the app closes
         keyboard.unhook_all()
+
+        # Stop the automation event loop
+        if self.automator.running:
+            self.automator.stop()
+        self.automator.core.shutdown()
+
+        # Keep the OCR result cache warm for the next launch, then stop the OCR worker processes
+        self.automator.ocr_manager.save_cache()
+        self.automator.ocr_manager.shutdown()
         self.root.destroy()
\ No newline at end of file
@@ -0,0 +1,181 @@
+"""
+Numeric value reader for the Skill Reroll Automation tool.
+Stat values only use a tiny alphabet (digits, '+', ',', '%' and 's'), so the value column can be
+read by a per-glyph template classifier instead of the general English recognizer: a line is cut
+into glyphs at blank columns and every glyph is matched against learned glyph bitmaps in one
+matrix product. Glyph templates are learned from values the recognizer read with high confidence.
+"""
+
+import re
+import threading
+import numpy as np
+from PIL import Image
+from template_library import normalize_vector
+
+# Characters that can appear in a stat value
+VALUE_ALPHABET = "0123456789+,%s"
+
+# Every glyph is resampled to this canvas (width, height) before correlation
+GLYPH_SIZE = (8, 12)
+
+# A value such as "+16%", "1,200" or "12s"; thousands separators are part of the number.
+# OCR also reads the ',' as '.', so that counts too when exactly 3 digits follow. A space does not:
+# it separates two numbers on the same line.
+VALUE_PATTERN = re.compile(r'[+]?(\d{1,3}(?:[,.]\d{3})+(?!\d)|\d+)(?:[%s])?')
+
+def parse_value(text):
+    """Numeric value in a text ("1,200" or "1.200" -> 1200, "+16%" -> 16), or None if there is none"""
+    match = VALUE_PATTERN.search(text)
+    if not match:
+        return None
+    return int(re.sub(r'[,.]', "", match.group(1)))
+
+def is_value_text(text):
+    """Check if a text only uses the value alphabet and contains a digit"""
+    text = text.replace(" ", "")
+    return bool(text) and all(char in VALUE_ALPHABET for char in text) and any(char.isdigit() for char in text)
+
+def segment_glyphs(crop):
+    """
+    Binarize a line crop and cut it into glyphs at blank columns.
+    Returns a list of (bitmap, width) per glyph, left to right, with bitmap a float32 array of GLYPH_SIZE.
+    Every glyph spans the text rows of the whole line, so ',' keeps its low position.
+    """
+    crop = np.asarray(crop)
+    gray = crop.mean(axis=2) if crop.ndim == 3 else crop.astype(np.float32)
+
+    # Threshold halfway between the background and the brightest text pixels
+    low, high = np.percentile(gray, 5), gray.max()
+    if high - low < 30:
+        return []
+    mask = gray > (low + high) / 2
+
+    rows = np.flatnonzero(mask.any(axis=1))
+    if len(rows) == 0:
+        return []
+    mask = mask[rows[0]:rows[-1] + 1]
+
+    # Runs of non-empty columns are glyphs
+    filled = np.concatenate([[False], mask.any(axis=0), [False]])
+    edges = np.flatnonzero(filled[1:] != filled[:-1])
+    glyphs = []
+    for start, end in zip(edges[::2], edges[1::2]):
+        glyph = mask[:, start:end]
+        bitmap = Image.fromarray((glyph * 255).astype(np.uint8)).resize(GLYPH_SIZE, Image.BILINEAR)
+        glyphs.append((np.asarray(bitmap, dtype=np.float32) / 255.0, end - start))
+    return glyphs
+
+class ValueReader:
+    def __init__(self, learn_confidence=0.95, match_threshold=0.9, min_margin=0.05, width_tolerance=1,
+                 variants_per_glyph=4):
+        """
+        Initialize the value reader with no glyphs learned
+
+        Args:
+            learn_confidence: Minimum recognizer confidence for a value line to teach its glyphs
+            match_threshold: Minimum correlation for every glyph of a line
+            min_margin: Required correlation lead over the best template of a different character
+            width_tolerance: Maximum difference (pixels) between glyph widths
+            variants_per_glyph: Maximum number of bitmaps kept per character
+        """
+        self.learn_confidence = learn_confidence
+        self.match_threshold = match_threshold
+        self.min_margin = min_margin
+        self.width_tolerance = width_tolerance
+        self.variants_per_glyph = variants_per_glyph
+
+        # Parallel glyph arrays: characters, correlation vectors (K x D) and glyph widths (K)
+        self.chars = []
+        self.vectors = np.zeros((0, GLYPH_SIZE[0] * GLYPH_SIZE[1]), dtype=np.float32)
+        self.widths = np.zeros(0, dtype=np.int32)
+        self._lock = threading.Lock()
+
+        # Counters for reporting
+        self.reads = 0
+        self.rejects = 0
+
+    def __len__(self):
+        return len(self.chars)
+
+    def learn(self, crop, text, confidence):
+        """Learn the glyphs of a confidently recognized value line"""
+        text = text.replace(" ", "")
+        if confidence < self.learn_confidence or not is_value_text(text):
+            return False
+
+        # Only learn when the line splits into exactly one glyph per character
+        glyphs = segment_glyphs(crop)
+        if len(glyphs) != len(text):
+            return False
+
+        learned = False
+        with self._lock:
+            for char, (bitmap, width) in zip(text, glyphs):
+                if self.chars.count(char) >= self.variants_per_glyph:
+                    continue
+                vector = normalize_vector(bitmap)
+                # Skip near-identical variants of a glyph we already know
+                if any(known == char and float(self.vectors[index] @ vector) > 0.99
+                       for index, known in enumerate(self.chars)):
+                    continue
+                self.chars.append(char)
+                self.vectors = np.vstack([self.vectors, vector[np.newaxis, :]])
+                self.widths = np.append(self.widths, np.int32(width))
+                learned = True
+        return learned
+
+    def read(self, crops):
+        """
+        Read value lines glyph by glyph.
+        Returns a list with (text, score) for lines whose every glyph matched confidently
+        (score is the weakest glyph's correlation) and None for the rest.
+        """
+        results = [None] * len(crops)
+        with self._lock:
+            chars = list(self.chars)
+            vectors = self.vectors
+            widths = self.widths
+        if not chars or not crops:
+            self.rejects += len(crops)
+            return results
+
+        # Segment every line, then classify all glyphs of all lines at once
+        line_glyphs = [segment_glyphs(crop) for crop in crops]
+        bitmaps = [normalize_vector(bitmap) for glyphs in line_glyphs for bitmap, _ in glyphs]
+        if bitmaps:
+            glyph_widths = np.array([width for glyphs in line_glyphs for _, width in glyphs], dtype=np.int32)
+
+            # Correlation of every glyph with every template (G x K); templates of another width cannot match
+            scores = np.stack(bitmaps) @ vectors.T
+            scores[np.abs(glyph_widths[:, np.newaxis] - widths[np.newaxis, :]) > self.width_tolerance] = -1.0
+
+            best = scores.argmax(axis=1)
+            best_scores = scores[np.arange(len(best)), best]
+            char_array = np.array(chars)
+            best_chars = char_array[best]
+
+            # Lead of the best template over the best template of any other character
+            other_scores = np.where(char_array[np.newaxis, :] != best_chars[:, np.newaxis], scores, -1.0)
+            margins = best_scores - other_scores.max(axis=1)
+            confident = (best_scores >= self.match_threshold) & (margins >= self.min_margin)
+
+            offset = 0
+            for index, glyphs in enumerate(line_glyphs):
+                count = len(glyphs)
+                if count and confident[offset:offset + count].all():
+                    text = "".join(best_chars[offset:offset + count])
+                    if is_value_text(text):
+                        results[index] = (text, float(best_scores[offset:offset + count].min()))
+                offset += count
+
+        read = sum(1 for result in results if result is not None)
+        self.reads += read
+        self.rejects += len(crops) - read
+        return results
+
+    def summary(self):
+        """One-line description of the reader counters"""
+        total = self.reads + self.rejects
+        rate = self.reads / total * 100 if total else 0.0
+        return (f"Value reader: {rate:.1f}% of remaining lines ({self.reads} read, {self.rejects} passed on), "
+                f"{len(self.chars)} glyphs")